@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Web search benchmark against the local Serper stand-in.
+
+Compares issuing a research-style batch of queries one at a time with a new
+connection each (the old web_search behaviour) against SearchEngine's
+concurrent fan-out over the pooled transport, cold and with a warm cache.
+
+Usage: python benchmarks/bench_search.py [--queries 8] [--latency 0.3]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+)
+
+from serper_stub import serve  # noqa: E402
+
+from llm_chat.cache import DiskCache  # noqa: E402
+from llm_chat.search import SearchEngine  # noqa: E402
+from llm_chat.transport import default_http_module  # noqa: E402
+
+
+def sequential(url, queries, count):
+    httpx = default_http_module()
+    links = []
+    for query in queries:
+        with httpx.Client() as http:  # Fresh connection per query
+            response = http.post(url, json={"q": query, "num": count})
+            links += [r["link"] for r in response.json()["organic"]]
+    return links
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", type=int, default=8)
+    parser.add_argument("--results", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    server, url = serve(latency=args.latency)
+    queries = [f"benchmark query {i}" for i in range(args.queries)]
+
+    start = time.perf_counter()
+    links = sequential(url, queries, args.results)
+    seq_time = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = SearchEngine("stub", endpoint=url, cache=DiskCache(Path(tmp)))
+        start = time.perf_counter()
+        merged, errors = engine.search_many(queries, args.results)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        engine.search_many(queries, args.results)
+        warm = time.perf_counter() - start
+    server.shutdown()
+
+    if errors:
+        raise RuntimeError(errors)
+    print(f"sequential, no reuse:  {seq_time * 1000:8.1f} ms  ({len(links)} links)")
+    print(f"concurrent, cold:      {cold * 1000:8.1f} ms  ({len(merged)} unique links)")
+    print(f"concurrent, cached:    {warm * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for client creation.
+
+Compares the import cost of creating the client registry (lazy SDK imports)
+against eagerly importing every provider SDK, as the CLI used to do. Each
+measurement runs in a fresh interpreter so module caches don't skew results.
+
+Usage: python benchmarks/bench_startup.py [--runs N]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"
+)
+
+LAZY = """
+import time
+t = time.perf_counter()
+from llm_chat.clients import create_clients
+create_clients({"OPENAI_API_KEY": "x", "GROQ_API_KEY": "x", "ANTHROPIC_API_KEY": "x"})
+print(time.perf_counter() - t)
+"""
+
+EAGER = """
+import time
+t = time.perf_counter()
+from groq import Groq
+from openai import OpenAI
+from anthropic import Anthropic
+from cerebras.cloud.sdk import Cerebras
+print(time.perf_counter() - t)
+"""
+
+FIRST_USE = """
+import time
+t = time.perf_counter()
+from llm_chat.clients import create_clients
+clients = create_clients({"OPENAI_API_KEY": "x"})
+clients["openai"]
+print(time.perf_counter() - t)
+"""
+
+
+def time_snippet(code, runs):
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", code], env=env, capture_output=True, text=True
+        )
+        if out.returncode != 0:
+            raise RuntimeError(out.stderr.strip())
+        samples.append(float(out.stdout.strip()))
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    eager = time_snippet(EAGER, args.runs)
+    lazy = time_snippet(LAZY, args.runs)
+    first_use = time_snippet(FIRST_USE, args.runs)
+
+    print(f"eager SDK imports:          {eager * 1000:8.1f} ms")
+    print(f"lazy create_clients:        {lazy * 1000:8.1f} ms")
+    print(f"lazy + first openai client: {first_use * 1000:8.1f} ms")
+    print(f"startup saving:             {(eager - lazy) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
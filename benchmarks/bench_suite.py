@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite run against the local provider stub, with stored baselines.
+
+Measures, without a network or API keys:
+
+- TTFT overhead: time to the first text chunk through chat_with_ai minus the
+  time to the first content event read straight off the socket, for the
+  OpenAI- and Anthropic-compatible endpoints
+- Stream throughput: tokens/sec through chat_with_ai with an unthrottled stub
+- Renderer throughput: chars/sec and CPU microseconds per token of
+  stream_with_markdown_chunks, rendering to an in-memory terminal
+- Startup: import time and peak RSS of ``llm_chat.cli`` in a fresh interpreter
+
+Results are compared with benchmarks/baselines.json and any metric worse
+than its baseline by more than the tolerance is reported as a regression
+(exit status 1). Baselines are machine-specific: after a deliberate change,
+or on a new machine, record new ones with --update-baseline.
+
+Usage: python benchmarks/bench_suite.py [--runs 20] [--tolerance 0.25]
+       [--cassette FILE] [--update-baseline]
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), "src")
+BASELINE_FILE = os.path.join(BENCH_DIR, "baselines.json")
+sys.path.insert(0, SRC_DIR)
+
+from provider_stub import synthetic_tokens  # noqa: E402
+
+# metric name -> (unit, whether higher values are better, noise floor): a
+# change smaller than the noise floor, in the metric's unit, is never a
+# regression, so a 1 ms overhead turning into 1.5 ms doesn't fail the suite.
+METRICS = {
+    "ttft_overhead_openai": ("ms", False, 2.0),
+    "ttft_overhead_anthropic": ("ms", False, 2.0),
+    "stream_throughput_openai": ("tok/s", True, 0.0),
+    "stream_throughput_anthropic": ("tok/s", True, 0.0),
+    "render_throughput": ("chars/s", True, 0.0),
+    "render_cpu_per_token": ("us", False, 2.0),
+    "startup_import": ("ms", False, 20.0),
+    "startup_import_oneshot": ("ms", False, 10.0),
+    "startup_rss": ("MB", False, 5.0),
+}
+
+STARTUP = """
+import resource, sys, time
+t = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(elapsed, rss / (1024 * 1024 if sys.platform == "darwin" else 1024))
+"""
+
+
+def start_stub(**options):
+    """Run the provider stub in its own process; return (process, base URL)."""
+    args = [sys.executable, os.path.join(BENCH_DIR, "provider_stub.py"), "--port", "0"]
+    for name, value in options.items():
+        args += [f"--{name.replace('_', '-')}", str(value)]
+    process = subprocess.Popen(args, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    return process, line.rsplit(" ", 1)[-1].strip()
+
+
+def raw_first_token(http, url, payload, marker):
+    """Seconds until the first line containing marker arrives on the socket."""
+    start = time.perf_counter()
+    elapsed = None
+    with http.stream("POST", url, json=payload) as response:
+        for line in response.iter_lines():
+            if elapsed is None and marker in line:
+                elapsed = time.perf_counter() - start
+    return elapsed
+
+
+def client_first_token(clients, provider, model, messages):
+    """Return (seconds to the first text chunk, total seconds) via chat_with_ai."""
+    from llm_chat.chat import chat_with_ai
+
+    start = time.perf_counter()
+    first = None
+    for _ in chat_with_ai(clients[provider], provider, model, messages, stream=True):
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def bench_providers(runs):
+    """TTFT overhead and stream throughput for both API flavours."""
+    from llm_chat.clients import create_clients
+    from llm_chat.transport import default_http_module
+
+    results = {}
+    stub, url = start_stub(tokens=1000, ttft=0.005, rate=0, chunk_tokens=1)
+    try:
+        os.environ["OPENAI_BASE_URL"] = f"{url}/v1"
+        os.environ["ANTHROPIC_BASE_URL"] = url
+        clients = create_clients(
+            {"OPENAI_API_KEY": "stub", "ANTHROPIC_API_KEY": "stub"}
+        )
+        http = default_http_module().Client(timeout=30)
+        messages = [{"role": "user", "content": "Explain streaming."}]
+        flavours = {
+            "openai": (f"{url}/v1/chat/completions", '"content"', "gpt-4o-mini"),
+            "anthropic": (f"{url}/v1/messages", "content_block_delta", "claude-stub"),
+        }
+        for provider, (endpoint, marker, model) in flavours.items():
+            payload = {
+                "model": model,
+                "messages": messages,
+                "stream": True,
+                "max_tokens": 4096,
+            }
+            raw, ttft, totals = [], [], []
+            for i in range(runs + 2):
+                sample_raw = raw_first_token(http, endpoint, payload, marker)
+                sample_ttft, total = client_first_token(
+                    clients, provider, model, messages
+                )
+                if i >= 2:  # The first runs warm up connections and imports
+                    raw.append(sample_raw)
+                    ttft.append(sample_ttft)
+                    totals.append(total)
+            # Clamped: a negative difference is only measurement noise
+            overhead = max(statistics.median(ttft) - statistics.median(raw), 0.0)
+            results[f"ttft_overhead_{provider}"] = overhead * 1000
+            results[f"stream_throughput_{provider}"] = 1000 / statistics.median(totals)
+        http.close()
+    finally:
+        stub.terminate()
+        stub.wait()
+    return results
+
+
+def cassette_replies(path):
+    """
+    Return the text chunks of each response in a cassette, and the tokens.
+
+    Output tokens come from the recorded usage, or else count one per chunk.
+    """
+    from llm_chat.providers import TextDelta, Usage
+    from llm_chat.providers.replay import Cassette, decode_chunk
+
+    replies, tokens = [], 0
+    for response in Cassette(path).responses:
+        chunks = [decode_chunk(entry)[1] for entry in response["chunks"]]
+        texts = [c.text for c in chunks if isinstance(c, TextDelta)]
+        usage = next((c for c in chunks if isinstance(c, Usage)), None)
+        replies.append(texts)
+        tokens += (usage and usage.output_tokens) or len(texts)
+    return replies, tokens
+
+
+def bench_renderer(runs, tokens=4000, chunk_tokens=3, cassette=None):
+    """
+    Chars/sec and CPU per token of the streaming markdown renderer.
+
+    Renders synthetic markdown, or the responses recorded in a cassette with
+    their real chunk boundaries.
+    """
+    from rich.console import Console
+
+    from llm_chat.utils import stream_with_markdown_chunks
+
+    if cassette:
+        replies, tokens = cassette_replies(cassette)
+    else:
+        reply = synthetic_tokens(tokens)
+        replies = [
+            [
+                "".join(reply[i : i + chunk_tokens])
+                for i in range(0, len(reply), chunk_tokens)
+            ]
+        ]
+    chars = sum(len(chunk) for chunks in replies for chunk in chunks)
+    walls, cpus = [], []
+    for _ in range(runs):
+        console = Console(
+            file=io.StringIO(), force_terminal=True, width=100, color_system="truecolor"
+        )
+        wall, cpu = time.perf_counter(), time.process_time()
+        for chunks in replies:
+            stream_with_markdown_chunks(iter(chunks), console=console)
+        walls.append(time.perf_counter() - wall)
+        cpus.append(time.process_time() - cpu)
+    return {
+        "render_throughput": chars / statistics.median(walls),
+        "render_cpu_per_token": statistics.median(cpus) / tokens * 1e6,
+    }
+
+
+def bench_startup(runs):
+    """Import time and peak RSS of the CLI modules in fresh interpreters."""
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    results = {}
+    for module, suffix in (("llm_chat.cli", ""), ("llm_chat.oneshot", "_oneshot")):
+        code = STARTUP.replace("{module}", module)
+        times, rss = [], []
+        for _ in range(runs):
+            out = subprocess.run(
+                [sys.executable, "-c", code], env=env, capture_output=True, text=True
+            )
+            if out.returncode != 0:
+                raise RuntimeError(out.stderr.strip())
+            elapsed, peak = out.stdout.split()
+            times.append(float(elapsed))
+            rss.append(float(peak))
+        results[f"startup_import{suffix}"] = statistics.median(times) * 1000
+        if not suffix:
+            results["startup_rss"] = statistics.median(rss)
+    return results
+
+
+def load_baselines(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def compare(results, baselines, tolerance):
+    """
+    Print each metric against its baseline.
+
+    Returns:
+        list: Names of metrics that regressed by more than tolerance
+    """
+    regressions = []
+    stored = baselines.get("metrics", {})
+    print(f"{'metric':<28} {'value':>12} {'':<7} {'baseline':>12} {'change':>8}")
+    for name, value in results.items():
+        unit, higher_is_better, noise = METRICS[name]
+        baseline = stored.get(name)
+        line = f"{name:<28} {value:>12.1f} {unit:<7}"
+        if baseline is not None:
+            worse = baseline - value if higher_is_better else value - baseline
+            relative = worse / baseline if baseline else float("inf")
+            change = f"{(value - baseline) / baseline:+.0%}" if baseline else "n/a"
+            line += f" {baseline:>12.1f} {change:>8}"
+            if worse > noise and relative > tolerance:
+                line += "  REGRESSION"
+                regressions.append(name)
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--startup-runs", type=int, default=5)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="relative change counted as a regression (default: 0.25)",
+    )
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument(
+        "--cassette",
+        help="render the responses recorded in this cassette (lmci --record) "
+        "instead of synthetic markdown",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="store these results as the new baseline",
+    )
+    args = parser.parse_args()
+
+    results = {}
+    results.update(bench_providers(args.runs))
+    results.update(bench_renderer(args.runs, cassette=args.cassette))
+    results.update(bench_startup(args.startup_runs))
+
+    baselines = load_baselines(args.baseline)
+    machine = (
+        f"{platform.system()} {platform.machine()}, Python {platform.python_version()}"
+    )
+    if baselines.get("machine") and baselines["machine"] != machine:
+        print(f"Note: baselines were recorded on {baselines['machine']}\n")
+    regressions = compare(results, baselines, args.tolerance)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(
+                {
+                    "machine": machine,
+                    "metrics": {k: round(v, 2) for k, v in results.items()},
+                },
+                f,
+                indent=2,
+            )
+            f.write("\n")
+        print(f"\nBaseline saved to {args.baseline}")
+    elif regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI and Anthropic streaming APIs.
+
+Serves ``POST /v1/chat/completions`` (OpenAI-compatible) and
+``POST /v1/messages`` (Anthropic-compatible), streamed as server-sent events
+or as a single JSON response. The reply is deterministic synthetic markdown
+(prose, lists and a fenced code block), sent after a configurable time to
+first token, at a configurable token rate and chunk size, with optional
+jitter between chunks. Point the SDKs at it with OPENAI_BASE_URL=<url>/v1
+and ANTHROPIC_BASE_URL=<url>.
+
+Usage: python benchmarks/provider_stub.py [--port 8766] [--tokens 400]
+       [--rate 0] [--chunk-tokens 3] [--jitter 0] [--ttft 0.02]
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "the stream renderer writes prose directly while code blocks are shown live "
+    "with syntax highlighting so each token reaches the terminal as soon as it "
+    "arrives and latency stays low even for long answers with many paragraphs"
+).split()
+
+CODE = [
+    "def fibonacci(n):",
+    '    """Return the first n Fibonacci numbers."""',
+    "    values = [0, 1]",
+    "    while len(values) < n:",
+    "        values.append(values[-1] + values[-2])",
+    "    return values[:n]",
+]
+
+
+def synthetic_tokens(count, seed=0):
+    """
+    Return count deterministic tokens that join into a markdown answer.
+
+    Every few paragraphs include a bullet list or a fenced Python block, so
+    both the prose and the code paths of the renderer are exercised.
+    """
+    rng = random.Random(seed)
+    tokens = ["## Answer\n\n"]
+    paragraph = 0
+    while len(tokens) < count:
+        for _ in range(rng.randint(20, 40)):
+            tokens.append(rng.choice(WORDS) + " ")
+        tokens.append("\n\n")
+        paragraph += 1
+        if paragraph % 3 == 1:
+            for _ in range(3):
+                tokens += ["- ", rng.choice(WORDS) + " ", rng.choice(WORDS) + "\n"]
+            tokens.append("\n")
+        elif paragraph % 3 == 2:
+            tokens.append("```python\n")
+            for line in CODE:
+                tokens += [part + " " for part in line.split(" ")[:-1]]
+                tokens.append(line.split(" ")[-1] + "\n")
+            tokens.append("```\n\n")
+    return tokens[:count]
+
+
+def _sse(data, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+def openai_events(model, pieces, prompt_tokens, completion_tokens, include_usage):
+    created = int(time.time())
+    base = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "model": model}
+    for i, text in enumerate(pieces):
+        delta = {"content": text}
+        if i == 0:
+            delta["role"] = "assistant"
+        yield _sse(
+            dict(
+                base,
+                created=created,
+                choices=[{"index": 0, "delta": delta, "finish_reason": None}],
+            )
+        )
+    yield _sse(
+        dict(
+            base,
+            created=created,
+            choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        )
+    )
+    if include_usage:
+        yield _sse(
+            dict(
+                base,
+                created=created,
+                choices=[],
+                usage={
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            )
+        )
+    yield b"data: [DONE]\n\n"
+
+
+def openai_completion(model, text, prompt_tokens, completion_tokens):
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def anthropic_events(model, pieces, input_tokens, output_tokens):
+    yield _sse(
+        {
+            "type": "message_start",
+            "message": {
+                "id": "msg_stub",
+                "type": "message",
+                "role": "assistant",
+                "model": model,
+                "content": [],
+                "stop_reason": None,
+                "stop_sequence": None,
+                "usage": {"input_tokens": input_tokens, "output_tokens": 1},
+            },
+        },
+        "message_start",
+    )
+    yield _sse(
+        {
+            "type": "content_block_start",
+            "index": 0,
+            "content_block": {"type": "text", "text": ""},
+        },
+        "content_block_start",
+    )
+    for text in pieces:
+        yield _sse(
+            {
+                "type": "content_block_delta",
+                "index": 0,
+                "delta": {"type": "text_delta", "text": text},
+            },
+            "content_block_delta",
+        )
+    yield _sse({"type": "content_block_stop", "index": 0}, "content_block_stop")
+    yield _sse(
+        {
+            "type": "message_delta",
+            "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+            "usage": {"output_tokens": output_tokens},
+        },
+        "message_delta",
+    )
+    yield _sse({"type": "message_stop"}, "message_stop")
+
+
+def anthropic_message(model, text, input_tokens, output_tokens):
+    return {
+        "id": "msg_stub",
+        "type": "message",
+        "role": "assistant",
+        "model": model,
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens},
+    }
+
+
+def make_handler(tokens=400, rate=0.0, chunk_tokens=3, jitter=0.0, ttft=0.02):
+    """
+    Build the request handler.
+
+    Args:
+        tokens (int): Tokens in each reply
+        rate (float): Tokens per second after the first chunk (0: unthrottled)
+        chunk_tokens (int): Tokens per streamed event
+        jitter (float): Random extra delay between chunks, as a fraction of
+            the nominal interval (0.5: up to 50% longer)
+        ttft (float): Seconds before the first chunk is sent
+    """
+    reply = synthetic_tokens(tokens)
+    pieces = [
+        "".join(reply[i : i + chunk_tokens]) for i in range(0, len(reply), chunk_tokens)
+    ]
+    interval = chunk_tokens / rate if rate else 0.0
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive, like the real APIs
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            model = payload.get("model", "stub")
+            prompt_tokens = sum(
+                len(str(m.get("content", "")).split())
+                for m in payload.get("messages", [])
+            )
+            if self.path.endswith("/chat/completions"):
+                if payload.get("stream"):
+                    include_usage = bool(
+                        (payload.get("stream_options") or {}).get("include_usage")
+                    )
+                    events = openai_events(
+                        model, pieces, prompt_tokens, len(reply), include_usage
+                    )
+                    return self._stream(events)
+                return self._json(
+                    openai_completion(model, "".join(reply), prompt_tokens, len(reply))
+                )
+            if self.path.endswith("/messages"):
+                if payload.get("stream"):
+                    return self._stream(
+                        anthropic_events(model, pieces, prompt_tokens, len(reply))
+                    )
+                return self._json(
+                    anthropic_message(model, "".join(reply), prompt_tokens, len(reply))
+                )
+            self.send_error(404)
+
+        def _json(self, data):
+            time.sleep(ttft)
+            body = json.dumps(data).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _stream(self, events):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            time.sleep(ttft)
+            rng = random.Random()
+            next_time = time.monotonic()
+            for event in events:
+                if interval:
+                    next_time += interval * (1 + rng.random() * jitter)
+                    delay = next_time - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(event), event))
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # Clients hanging up mid-stream is expected, not worth a traceback
+
+
+def serve(port=0, **options):
+    """
+    Start the stub on a background thread.
+
+    Args:
+        port (int): Port to listen on (0: any free port)
+        **options: Reply shape, as for make_handler
+
+    Returns:
+        tuple: (server, base URL)
+    """
+    server = StubServer(("127.0.0.1", port), make_handler(**options))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--tokens", type=int, default=400)
+    parser.add_argument("--rate", type=float, default=0.0, help="tokens per second")
+    parser.add_argument("--chunk-tokens", type=int, default=3)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--ttft", type=float, default=0.02)
+    args = parser.parse_args()
+    server, url = serve(
+        args.port,
+        tokens=args.tokens,
+        rate=args.rate,
+        chunk_tokens=args.chunk_tokens,
+        jitter=args.jitter,
+        ttft=args.ttft,
+    )
+    print(f"Provider stub listening on {url}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
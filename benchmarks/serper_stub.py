@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Serper search API.
+
+Answers POST requests with deterministic "organic" results for the query,
+after an optional artificial latency, so web search can be exercised without
+a network or an API key. Point the CLI at it with SERPER_API_URL.
+
+Usage: python benchmarks/serper_stub.py [--port 8765] [--latency 0.3]
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SHARED_DOMAINS = ("docs.python.org", "en.wikipedia.org", "stackoverflow.com")
+
+
+def fake_results(query, count):
+    """Return count deterministic results; some links are shared across queries."""
+    digest = hashlib.sha1(query.encode("utf-8")).hexdigest()
+    results = []
+    for i in range(count):
+        if i % 3 == 2:
+            link = f"https://{SHARED_DOMAINS[i % len(SHARED_DOMAINS)]}/page{i}"
+        else:
+            link = f"https://example.com/{digest[:8]}/{i}"
+        results.append(
+            {
+                "title": f"{query} - result {i + 1}",
+                "link": link,
+                "snippet": f"Snippet {i + 1} about {query}.",
+                "position": i + 1,
+            }
+        )
+    return results
+
+
+def make_handler(latency):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            time.sleep(latency)
+            body = json.dumps(
+                {"organic": fake_results(payload.get("q", ""), payload.get("num", 5))}
+            ).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def serve(port=0, latency=0.3):
+    """
+    Start the stub on a background thread.
+
+    Returns:
+        tuple: (server, endpoint URL)
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(latency))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/search"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.3)
+    args = parser.parse_args()
+    server, url = serve(args.port, args.latency)
+    print(f"Serper stub listening on {url} (export SERPER_API_URL={url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,30 @@
-from .cli import main
-from .chat import chat_with_ai
-from .config import initialize
-from .clients import create_clients
+import importlib
 
 __version__ = "0.1.0"
-__all__ = ["main", "chat_with_ai", "initialize", "create_clients"]
+
+# Public names are imported on first access, so importing one module of the
+# package (e.g. for single-shot mode) doesn't pull in the interactive CLI
+_EXPORTS = {
+    "main": "cli",
+    "chat_with_ai": "chat",
+    "achat_with_ai": "chat",
+    "astream_chat_with_ai": "chat",
+    "stream_chunks": "chat",
+    "initialize": "config",
+    "create_clients": "clients",
+    "create_async_clients": "clients",
+}
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
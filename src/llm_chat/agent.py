@@ -0,0 +1,240 @@
+"""
+Model-driven tool calling: tool definitions and parallel execution
+
+The model is offered tools through its provider's native function-calling
+API. When a response requests several tool calls they are independent by
+construction, so they run concurrently and each result is reported as soon
+as it is ready; the whole step costs one round trip instead of one per tool.
+"""
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from termcolor import colored
+
+from .tools import (
+    DEFAULT_COMMAND_TIMEOUT,
+    DEFAULT_SEARCH_COUNT,
+    cancel_running_commands,
+    execute_terminal_command,
+    format_command_context,
+    web_search_many,
+)
+
+MAX_TOOL_STEPS = 6  # Model round trips per user message
+MAX_TOOL_WORKERS = 8
+MAX_RESULT_CHARS = 12000  # Tool output sent back to the model, per call
+
+
+@dataclass
+class Tool:
+    """A tool the model can call."""
+
+    name: str
+    description: str
+    parameters: Dict[str, Any]  # JSON schema of the arguments
+    handler: Callable[..., str]
+    needs_confirmation: bool = False
+    # The handler takes a `live` keyword: whether it may write to the
+    # terminal as it runs (False while other calls run at the same time)
+    streams_output: bool = False
+
+    def spec(self):
+        """Return the provider-neutral spec sent to the adapters."""
+        return {
+            "name": self.name,
+            "description": self.description,
+            "parameters": self.parameters,
+        }
+
+
+def default_tools(serper_api_key=None, command_timeout=DEFAULT_COMMAND_TIMEOUT):
+    """
+    Build the standard tool set: web search (if a Serper key is set) and shell.
+
+    Args:
+        serper_api_key (str): The Serper API key, or None to leave search out
+        command_timeout (float): Seconds before a model-requested command is killed
+
+    Returns:
+        list: Tool instances
+    """
+    tools = []
+    if serper_api_key:
+
+        def search(queries):
+            if isinstance(queries, str):
+                queries = [queries]
+            results = web_search_many(queries, serper_api_key, DEFAULT_SEARCH_COUNT)
+            return json.dumps(
+                [
+                    {k: r.get(k) for k in ("title", "link", "snippet", "query")}
+                    for r in results
+                ],
+                ensure_ascii=False,
+            )
+
+        tools.append(
+            Tool(
+                name="web_search",
+                description=(
+                    "Search the web. Pass several queries at once to search them "
+                    "in parallel. Returns titles, links and snippets."
+                ),
+                parameters={
+                    "type": "object",
+                    "properties": {
+                        "queries": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "One or more search queries",
+                        }
+                    },
+                    "required": ["queries"],
+                },
+                handler=search,
+            )
+        )
+
+    def run_command(command, live=True):
+        result = execute_terminal_command(command, timeout=command_timeout, live=live)
+        return format_command_context(command, result)
+
+    tools.append(
+        Tool(
+            name="run_command",
+            description=(
+                "Run a shell command on the user's machine and return its output. "
+                "The user must approve every command."
+            ),
+            parameters={
+                "type": "object",
+                "properties": {
+                    "command": {"type": "string", "description": "The shell command"}
+                },
+                "required": ["command"],
+            },
+            handler=run_command,
+            needs_confirmation=True,
+            streams_output=True,
+        )
+    )
+    return tools
+
+
+def _parse_arguments(call):
+    try:
+        arguments = json.loads(call.arguments or "{}")
+    except json.JSONDecodeError as e:
+        raise ValueError(f"invalid JSON arguments: {e}")
+    if not isinstance(arguments, dict):
+        raise ValueError("arguments must be a JSON object")
+    return arguments
+
+
+def _describe(call, arguments):
+    summary = ", ".join(f"{k}={v!r}" for k, v in arguments.items())
+    if len(summary) > 80:
+        summary = summary[:77] + "..."
+    return f"{call.name}({summary})"
+
+
+def run_tool_calls(
+    tool_calls,
+    tools,
+    confirm: Optional[Callable[[str, Dict[str, Any]], bool]] = None,
+    max_workers=MAX_TOOL_WORKERS,
+    tracer=None,
+):
+    """
+    Execute the tool calls from one model response.
+
+    Calls that need the user's approval are confirmed first, one at a time;
+    then every approved call runs concurrently, and each is reported as it
+    finishes. When several calls run, their output is shown per call as each
+    finishes rather than streamed. Ctrl-C kills the commands still running.
+
+    Args:
+        tool_calls (list): ToolCalls requested by the model
+        tools (list): Available Tool instances
+        confirm (callable): Asks the user to approve a call, given the tool
+            name and arguments; calls needing approval are refused without it
+        max_workers (int): Maximum number of tools run at once
+        tracer (TraceWriter): Records each executed call as a span, if given
+
+    Returns:
+        list: Result text for each call, in the order of tool_calls
+    """
+    by_name = {tool.name: tool for tool in tools}
+    results = [None] * len(tool_calls)
+    runnable = []
+    for i, call in enumerate(tool_calls):
+        tool = by_name.get(call.name)
+        if tool is None:
+            results[i] = f"Error: unknown tool '{call.name}'"
+            continue
+        try:
+            arguments = _parse_arguments(call)
+        except ValueError as e:
+            results[i] = f"Error: {e}"
+            continue
+        if tool.needs_confirmation and not (confirm and confirm(call.name, arguments)):
+            results[i] = "The user declined to run this."
+            print(colored(f"  Skipped {_describe(call, arguments)}", "yellow"))
+            continue
+        runnable.append((i, call, tool, arguments))
+
+    live = len(runnable) == 1
+
+    def run(call, tool, arguments):
+        span = (
+            tracer.span(call.name, call_id=call.id, arguments=arguments)
+            if tracer is not None
+            else nullcontext({})
+        )
+        with span as record:
+            start = time.perf_counter()
+            try:
+                if tool.streams_output:
+                    output = str(tool.handler(live=live, **arguments))
+                else:
+                    output = str(tool.handler(**arguments))
+            except Exception as e:
+                output = f"Error: {e}"
+            if output.startswith("Error:"):
+                record["error"] = output[len("Error:") :].strip()
+        return output, time.perf_counter() - start
+
+    if runnable:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(runnable))) as pool:
+            futures = {
+                pool.submit(run, call, tool, arguments): (i, call, arguments)
+                for i, call, tool, arguments in runnable
+            }
+            try:
+                for future in as_completed(futures):
+                    i, call, arguments = futures[future]
+                    output, elapsed = future.result()
+                    if len(output) > MAX_RESULT_CHARS:
+                        output = output[:MAX_RESULT_CHARS] + "\n... [truncated]"
+                    results[i] = output
+                    failed = output.startswith("Error:")
+                    print(
+                        colored(
+                            f"  {'✗' if failed else '✓'} {_describe(call, arguments)} "
+                            f"({elapsed:.1f}s)",
+                            "red" if failed else "green",
+                        )
+                    )
+            except KeyboardInterrupt:
+                # Workers don't see the interrupt; stop them so the pool
+                # doesn't wait for them on exit
+                for future in futures:
+                    future.cancel()
+                cancel_running_commands()
+                raise
+    return results
@@ -0,0 +1,326 @@
+"""
+Non-interactive batch mode: run JSONL conversations concurrently.
+
+Each input line is a JSON object with an ``id`` and either ``messages`` (a
+conversation history) or ``prompt`` (a single user message), plus optional
+``provider`` and ``model`` overrides; ``auto/`` models are sent to the
+backend the router picks when the run starts. Results are appended to the output file
+in completion order as ``{"id", "provider", "model", "response"}`` (or
+``"error"``). A line that can't be parsed gets an error record with its line
+number instead of stopping the run. The output file doubles as the
+checkpoint: rerunning the same command skips every id that already has a
+successful result.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from .chat import achat_with_ai
+from .clients import create_async_clients
+from .config import initialize, load_config
+from .routing import AUTO_PROVIDER, create_router
+from .transport import configure_transport
+
+DEFAULT_WORKERS = 8
+
+
+def parse_worker_overrides(values):
+    """
+    Parse ``provider=N`` worker pool overrides.
+
+    Args:
+        values (list): Strings of the form "provider=N"
+
+    Returns:
+        dict: Mapping of provider name to worker count
+    """
+    overrides = {}
+    for value in values or []:
+        provider, _, count = value.partition("=")
+        if not count.isdigit() or int(count) < 1:
+            raise ValueError(f"Invalid worker override '{value}', expected provider=N")
+        overrides[provider.strip()] = int(count)
+    return overrides
+
+
+def load_completed_ids(output_path):
+    """
+    Read the ids that already have a successful result in the output file.
+
+    Args:
+        output_path (str): Path to the output JSONL file
+
+    Returns:
+        set: Ids that can be skipped on resume
+    """
+    done = set()
+    try:
+        with open(output_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Partial line from an interrupted run
+                if "error" not in record:
+                    done.add(record.get("id"))
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def iter_requests(input_path, default_provider, default_model):
+    """
+    Yield normalized batch requests from the input JSONL file.
+
+    Args:
+        input_path (str): Path to the input JSONL file
+        default_provider (str): Provider used when a row doesn't name one
+        default_model (str): Model used when a row doesn't name one
+
+    Yields:
+        dict: Request with id, provider, model and messages, or for a line
+        that isn't a valid request, an error record with its id and line
+    """
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+                messages = row.get("messages")
+                if messages is None:
+                    messages = [{"role": "user", "content": row["prompt"]}]
+            except json.JSONDecodeError as e:
+                yield _line_error(line_number, f"invalid JSON: {e}")
+                continue
+            except (AttributeError, KeyError):
+                yield _line_error(
+                    line_number, "expected an object with 'messages' or 'prompt'"
+                )
+                continue
+            yield {
+                "id": row.get("id", line_number),
+                "provider": row.get("provider", default_provider),
+                "model": row.get("model", default_model),
+                "messages": messages,
+            }
+
+
+def _line_error(line_number, message):
+    return {
+        "id": line_number,
+        "line": line_number,
+        "error": f"Line {line_number}: {message}",
+    }
+
+
+class BatchWriter:
+    """Append results to the output file, one flushed line per completion."""
+
+    def __init__(self, output_path):
+        self._file = open(output_path, "a+", encoding="utf-8")
+        # Terminate a partial line left behind by a crash before appending
+        self._file.seek(0, 2)
+        if self._file.tell() > 0:
+            self._file.seek(self._file.tell() - 1)
+            if self._file.read(1) != "\n":
+                self._file.write("\n")
+        self.succeeded = 0
+        self.failed = 0
+
+    def write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        if "error" in record:
+            self.failed += 1
+        else:
+            self.succeeded += 1
+
+    def close(self):
+        self._file.close()
+
+
+async def _worker(queue, clients, writer):
+    while True:
+        request = await queue.get()
+        try:
+            if request is None:
+                return
+            record = {
+                "id": request["id"],
+                "provider": request["provider"],
+                "model": request["model"],
+            }
+            provider = request["provider"]
+            if provider not in clients:
+                record["error"] = f"No API key available for {provider}"
+            else:
+                response = await achat_with_ai(
+                    clients[provider], provider, request["model"], request["messages"]
+                )
+                if response is None:
+                    record["error"] = f"Request to {provider} failed"
+                else:
+                    record["response"] = response
+            writer.write(record)
+        finally:
+            queue.task_done()
+
+
+async def run_batch(
+    input_path,
+    output_path,
+    clients,
+    default_provider,
+    default_model,
+    workers=DEFAULT_WORKERS,
+    provider_workers=None,
+    router=None,
+):
+    """
+    Run every pending request in the input file and append results to output.
+
+    A first pass over the input finds the providers it uses. Then each
+    provider gets its own feeder, bounded queue and worker pool, so a slow
+    provider only holds back its own rows and memory stays flat on large
+    inputs. Every feeder reads the input again and keeps only its own
+    provider's rows. Each ``auto/`` model is resolved through the router
+    once, so all its rows go to the same backend.
+
+    Args:
+        input_path (str): Path to the input JSONL file
+        output_path (str): Path to the output JSONL file (also the checkpoint)
+        clients (Mapping): Async client registry from create_async_clients
+        default_provider (str): Provider used when a row doesn't name one
+        default_model (str): Model used when a row doesn't name one
+        workers (int): Default number of concurrent requests per provider
+        provider_workers (dict): Per-provider overrides of the worker count
+        router (Router): Picks the backend of auto/ models; without one, their
+            rows fail
+
+    Returns:
+        tuple: (succeeded, failed, skipped) counts for this run
+    """
+    provider_workers = provider_workers or {}
+    completed = load_completed_ids(output_path)
+    writer = BatchWriter(output_path)
+    tasks = []
+    skipped = 0
+
+    routes = {}  # Logical model -> backend, fixed for the whole run
+
+    def resolve(request):
+        if "error" in request or request["provider"] != AUTO_PROVIDER:
+            return request
+        model = request["model"]
+        if model not in routes:
+            routes[model] = router.choose(model, clients) if router else None
+        backend = routes[model]
+        if backend is None:
+            return {
+                "id": request["id"],
+                "provider": AUTO_PROVIDER,
+                "model": model,
+                "error": f"No available provider serves {model}",
+            }
+        return dict(request, provider=backend.provider, model=backend.model)
+
+    def requests():
+        for request in iter_requests(input_path, default_provider, default_model):
+            yield resolve(request)
+
+    def pending(request):
+        return "error" not in request and request["id"] not in completed
+
+    async def feed(provider):
+        count = provider_workers.get(provider, workers)
+        queue = asyncio.Queue(maxsize=count * 2)
+        pool = [
+            asyncio.ensure_future(_worker(queue, clients, writer)) for _ in range(count)
+        ]
+        tasks.extend(pool)
+        for i, request in enumerate(requests()):
+            if request.get("provider") == provider and pending(request):
+                await queue.put(request)
+            elif i % 1000 == 0:
+                await asyncio.sleep(0)  # Let the other feeders and workers run
+        for _ in range(count):
+            await queue.put(None)
+        await asyncio.gather(*pool)
+
+    try:
+        providers = []
+        for request in requests():
+            if "error" in request:
+                writer.write(request)
+            elif not pending(request):
+                skipped += 1
+            elif request["provider"] not in providers:
+                providers.append(request["provider"])
+
+        feeders = [asyncio.ensure_future(feed(provider)) for provider in providers]
+        tasks.extend(feeders)
+        await asyncio.gather(*feeders)
+    finally:
+        for task in tasks:
+            task.cancel()
+        writer.close()
+
+    return writer.succeeded, writer.failed, skipped
+
+
+def main(argv=None):
+    """Entry point for ``lmci batch``."""
+    config = load_config()
+    parser = argparse.ArgumentParser(
+        prog="lmci batch",
+        description="Run JSONL conversations concurrently and write JSONL results.",
+    )
+    parser.add_argument("input", help="Input JSONL file of conversations")
+    parser.add_argument("output", help="Output JSONL file (appended to, resumable)")
+    parser.add_argument("--provider", default=config.get("default_provider", "openai"))
+    parser.add_argument("--model", default=config.get("default_model", "gpt-4o"))
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="Concurrent requests per provider (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--provider-workers",
+        action="append",
+        metavar="PROVIDER=N",
+        help="Override the worker pool size for one provider",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        provider_workers = parse_worker_overrides(args.provider_workers)
+    except ValueError as e:
+        parser.error(str(e))
+
+    configure_transport(config.get("http"))
+    clients = create_async_clients(initialize())
+    start = time.time()
+    succeeded, failed, skipped = asyncio.run(
+        run_batch(
+            args.input,
+            args.output,
+            clients,
+            args.provider,
+            args.model,
+            workers=args.workers,
+            provider_workers=provider_workers,
+            router=create_router(config),
+        )
+    )
+    print(
+        f"Batch finished in {time.time() - start:.1f}s: {succeeded} succeeded, "
+        f"{failed} failed, {skipped} skipped (already complete)",
+        file=sys.stderr,
+    )
+    return 1 if failed else 0
@@ -0,0 +1,228 @@
+"""
+On-disk, content-addressed caching for LLM responses
+"""
+
+import hashlib
+import json
+import os
+import time
+
+from .config import CONFIG_FOLDER
+from .providers import STREAM_RESTART
+
+CACHE_DIR = CONFIG_FOLDER / "cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_TTL = 7 * 24 * 60 * 60  # One week, in seconds
+
+
+def request_key(*parts):
+    """
+    Build a stable cache key from JSON-serializable request parts.
+
+    Args:
+        *parts: Values identifying the request (provider, model, messages...)
+
+    Returns:
+        str: Hex SHA-256 digest of the canonical JSON encoding of the parts
+    """
+    payload = json.dumps(
+        parts, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """
+    Size-bounded key/value store of JSON entries, one file per key.
+
+    Entries expire after ``ttl`` seconds. When the total size exceeds
+    ``max_bytes`` the least recently used entries (by file mtime, refreshed on
+    every hit) are evicted.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._size = None  # Computed lazily on the first write
+
+    def _path(self, key):
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _entries(self):
+        if not self.directory.exists():
+            return
+        for shard in self.directory.iterdir():
+            if shard.is_dir():
+                for path in shard.glob("*.json"):
+                    try:
+                        yield path, path.stat()
+                    except FileNotFoundError:
+                        continue
+
+    def get(self, key):
+        """Return the cached value for key, or None if missing or expired."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        if self.ttl and time.time() - entry.get("created", 0) > self.ttl:
+            self._remove(path)
+            return None
+
+        os.utime(path)  # Mark as recently used for LRU eviction
+        return entry.get("value")
+
+    def set(self, key, value):
+        """Store value under key, evicting old entries if over the size bound."""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps({"created": time.time(), "value": value}, ensure_ascii=False)
+
+        if self._size is None:
+            self._size = self.size()
+        try:
+            self._size -= path.stat().st_size
+        except FileNotFoundError:
+            pass
+
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._size += path.stat().st_size
+
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def _remove(self, path):
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return
+        if self._size is not None:
+            self._size -= size
+
+    def _evict(self):
+        # Evict down to 90% of the bound so we don't rescan on every write
+        target = self.max_bytes * 0.9
+        entries = sorted(self._entries(), key=lambda e: e[1].st_mtime)
+        for path, _ in entries:
+            if self._size <= target:
+                break
+            self._remove(path)
+
+    def size(self):
+        """Return the total size of the cache in bytes."""
+        return sum(stat.st_size for _, stat in self._entries())
+
+    def count(self):
+        """Return the number of entries in the cache."""
+        return sum(1 for _ in self._entries())
+
+    def clear(self):
+        """Remove every entry from the cache."""
+        for path, _ in list(self._entries()):
+            self._remove(path)
+        self._size = 0
+
+
+class ResponseCache(DiskCache):
+    """
+    Cache of streamed chat responses keyed by (provider, model, messages).
+
+    Hits are replayed chunk by chunk through a generator, so callers consume a
+    cached response exactly like a live stream.
+    """
+
+    def __init__(
+        self, directory=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL
+    ):
+        super().__init__(directory, max_bytes=max_bytes, ttl=ttl)
+        self.stats_file = directory / "stats.json"
+        self.session_hits = 0
+        self.session_misses = 0
+
+    def stream(self, provider, model, messages, fetch):
+        """
+        Return a chunk stream for the request, from the cache when possible.
+
+        Args:
+            provider (str): The provider name
+            model (str): The model name
+            messages (list): The conversation history being sent
+            fetch (callable): Returns the live chunk stream on a cache miss
+
+        Returns:
+            generator: Response text chunks
+        """
+        key = request_key(provider, model, messages)
+        chunks = self.get(key)
+        if chunks is not None:
+            self._record(hit=True)
+            return iter(chunks)
+        self._record(hit=False)
+        return self._fill(key, fetch())
+
+    def _fill(self, key, live_chunks):
+        chunks = []
+        for chunk in live_chunks:
+            if chunk is STREAM_RESTART:
+                chunks = []  # The stream restarted; drop the partial response
+            elif chunk:
+                chunks.append(chunk)
+            yield chunk
+        # Only cache responses that streamed to completion
+        if chunks and getattr(live_chunks, "error", None) is None:
+            self.set(key, chunks)
+
+    def _record(self, hit):
+        if hit:
+            self.session_hits += 1
+        else:
+            self.session_misses += 1
+        stats = self.lifetime_stats()
+        stats["hits" if hit else "misses"] += 1
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.stats_file, "w") as f:
+            json.dump(stats, f)
+
+    def lifetime_stats(self):
+        """Return the persisted hit and miss counts across all sessions."""
+        try:
+            with open(self.stats_file, "r") as f:
+                stats = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            stats = {}
+        return {"hits": stats.get("hits", 0), "misses": stats.get("misses", 0)}
+
+    def clear(self):
+        super().clear()
+        try:
+            self.stats_file.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def create_response_cache(config):
+    """
+    Create the response cache if it is enabled in the configuration.
+
+    Args:
+        config (dict): The loaded configuration
+
+    Returns:
+        ResponseCache or None: The cache, or None when caching is off
+    """
+    if not config.get("response_cache"):
+        return None
+    return ResponseCache(
+        max_bytes=int(config.get("cache_max_mb", DEFAULT_MAX_BYTES // (1024 * 1024)))
+        * 1024
+        * 1024,
+        ttl=config.get("cache_ttl", DEFAULT_TTL),
+    )
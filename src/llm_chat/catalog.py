@@ -0,0 +1,272 @@
+"""
+Model catalog: provider model lists fetched in the background, with fast search
+
+A provider's models endpoint is fetched on a background thread when it
+becomes the active provider and its cached list is older than the TTL, so
+startup never waits on the network and only the active provider's SDK is
+loaded: the catalog starts from the built-in list plus whatever the cache
+holds, and picks up fresh lists as they arrive. A trigram index over every model name
+keeps completion instant with thousands of entries.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+
+from prompt_toolkit.completion import Completer, Completion
+
+from .config import CONFIG_FOLDER
+from .providers import get_adapter
+
+CATALOG_FILE = CONFIG_FOLDER / "models.json"
+DEFAULT_TTL = 24 * 3600  # Seconds before a provider's list is fetched again
+MAX_COMPLETIONS = 50
+
+# Models that can't be used for chat (embeddings, speech, images, moderation)
+NON_CHAT_MODELS = re.compile(
+    r"embed|tts|whisper|dall-e|moderation|transcribe|audio|image|guard",
+    re.IGNORECASE,
+)
+_SEPARATORS = re.compile(r"[-_./:\s]+")
+
+
+def normalize(name):
+    """Lowercase a model name and turn separators into single spaces."""
+    return _SEPARATORS.sub(" ", name.lower()).strip()
+
+
+def trigrams(text):
+    """Return the set of padded character trigrams of normalized text."""
+    padded = f" {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class FuzzyIndex:
+    """
+    Trigram index over (model, provider) entries.
+
+    Built once per catalog update; a query only scores the entries that
+    share a trigram with it, so lookups stay fast as the catalog grows.
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+        self._names = [normalize(name) for name, _ in entries]
+        self._postings = defaultdict(list)
+        for i, name in enumerate(self._names):
+            for gram in trigrams(name):
+                self._postings[gram].append(i)
+
+    def search(self, query, limit=MAX_COMPLETIONS):
+        """
+        Return the entries best matching query, best first.
+
+        Exact substrings rank first (prefixes and word starts above the
+        rest), then entries sharing most of the query's trigrams, which
+        tolerates typos and reordered words.
+        """
+        query = normalize(query)
+        if not query:
+            return self.entries[:limit]
+        grams = trigrams(query)
+        if len(query) < 3:
+            candidates = [i for i, name in enumerate(self._names) if query in name]
+            shared = {}
+        else:
+            shared = Counter()
+            for gram in grams:
+                shared.update(self._postings.get(gram, ()))
+            candidates = [i for i, count in shared.items() if count / len(grams) >= 0.5]
+        scored = []
+        for i in candidates:
+            name = self._names[i]
+            score = shared.get(i, 0) / len(grams)
+            if query in name:
+                score += 1.0
+                if name.startswith(query) or f" {query}" in name:
+                    score += 0.5
+            scored.append((-score, len(name), i))
+        scored.sort()
+        return [self.entries[i] for _, _, i in scored[:limit]]
+
+
+class CatalogCompleter(Completer):
+    """prompt_toolkit completer backed by the catalog's current index."""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+
+    def get_completions(self, document, complete_event):
+        text = document.text_before_cursor
+        for name, provider in self.catalog.search(text):
+            yield Completion(name, start_position=-len(text), display_meta=provider)
+
+
+class ModelCatalog(Mapping):
+    """
+    Read-only mapping of provider name to its list of models.
+
+    Starts from the built-in lists and the disk cache; refresh_in_background
+    fetches stale providers' lists and swaps them in when they arrive.
+    """
+
+    def __init__(self, builtin, clients, path=CATALOG_FILE, ttl=DEFAULT_TTL):
+        self.builtin = {p: list(models) for p, models in builtin.items()}
+        self.clients = clients
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._fetching = set()  # Providers being refreshed in the background
+        self._cache = self._load()
+        self._rebuild()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f).get("providers", {})
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"providers": self._cache}, f)
+        os.replace(tmp, self.path)
+
+    def _rebuild(self):
+        models = {}
+        for provider, names in self.builtin.items():
+            fetched = self._cache.get(provider, {}).get("models", [])
+            models[provider] = list(dict.fromkeys(names + fetched))
+        for provider, entry in self._cache.items():
+            if provider not in models and provider in self.clients:
+                models[provider] = list(entry.get("models", []))
+        index = FuzzyIndex([(m, p) for p, names in models.items() for m in names])
+        # Readers get either the old or the new lists and index, never a mix
+        self._models, self._index = models, index
+
+    def __getitem__(self, provider):
+        return self._models[provider]
+
+    def __iter__(self):
+        return iter(self._models)
+
+    def __len__(self):
+        return len(self._models)
+
+    def search(self, query, limit=MAX_COMPLETIONS):
+        """Return up to limit (model, provider) pairs matching query."""
+        return self._index.search(query, limit)
+
+    def completer(self):
+        """Return a prompt_toolkit completer over the catalog."""
+        return CatalogCompleter(self)
+
+    def stale_providers(self, providers=None):
+        """
+        Return the configured providers whose cached list is missing or expired.
+
+        Args:
+            providers (list): Providers to check (default: every configured one)
+        """
+        now = time.time()
+        return [
+            provider
+            for provider in (self.clients if providers is None else providers)
+            if provider in self.clients
+            and now - self._cache.get(provider, {}).get("fetched_at", 0) > self.ttl
+        ]
+
+    def refresh(self, providers=None):
+        """
+        Fetch model lists now, concurrently, and update the cache and index.
+
+        Providers whose endpoint fails or isn't supported keep their cached
+        list. Fetching a provider's list builds its client, which imports its
+        SDK.
+
+        Args:
+            providers (list): Providers to fetch (default: every stale one)
+
+        Returns:
+            dict: Provider -> number of models fetched
+        """
+        providers = self.stale_providers() if providers is None else providers
+        if not providers:
+            return {}
+
+        def fetch(provider):
+            try:
+                names = get_adapter(provider).list_models(self.clients[provider])
+            except Exception:
+                return provider, None
+            return provider, sorted(n for n in names if not NON_CHAT_MODELS.search(n))
+
+        with ThreadPoolExecutor(max_workers=len(providers)) as pool:
+            results = [r for r in pool.map(fetch, providers) if r[1] is not None]
+        if results:
+            with self._lock:
+                for provider, names in results:
+                    self._cache[provider] = {"fetched_at": time.time(), "models": names}
+                self._rebuild()
+                try:
+                    self._save()
+                except OSError:
+                    pass
+        return {provider: len(names) for provider, names in results}
+
+    def refresh_in_background(self, providers):
+        """
+        Start refreshing the stale ones of providers on a daemon thread.
+
+        Args:
+            providers (list): Providers about to be used, typically the active one
+
+        Returns:
+            threading.Thread: The refresh thread, or None if none is stale
+        """
+        with self._lock:
+            stale = [
+                p for p in self.stale_providers(providers) if p not in self._fetching
+            ]
+            if not stale:
+                return None
+            self._fetching.update(stale)
+
+        def refresh():
+            try:
+                self.refresh(stale)
+            finally:
+                with self._lock:
+                    self._fetching.difference_update(stale)
+
+        thread = threading.Thread(target=refresh, daemon=True)
+        thread.start()
+        return thread
+
+
+def create_model_catalog(builtin, clients, config, providers):
+    """
+    Create the catalog and start refreshing the active providers' model lists.
+
+    Other providers' lists are refreshed when they become active, so startup
+    only imports the SDKs of the providers about to be used.
+
+    Args:
+        builtin (dict): Provider -> built-in model names
+        clients (Mapping): Provider clients; only these providers are fetched
+        config (dict): The loaded config; "models_ttl" overrides the cache TTL
+        providers (list): The providers the next request may go to
+
+    Returns:
+        ModelCatalog: The catalog, usable immediately
+    """
+    catalog = ModelCatalog(builtin, clients, ttl=config.get("models_ttl", DEFAULT_TTL))
+    catalog.refresh_in_background(providers)
+    return catalog
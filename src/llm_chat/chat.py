@@ -2,8 +2,93 @@
 Core chat functionality for interacting with LLM providers
 """
 
+import time
 
-def chat_with_ai(client, provider, model, messages, stream=False):
+from .providers import (
+    STREAM_RESTART,
+    FinishReason,
+    TextDelta,
+    ToolCall,
+    Usage,
+    get_adapter,
+)
+from .providers.replay import get_recorder
+from .resilience import (
+    acall_with_retries,
+    aresilient_stream,
+    call_with_retries,
+    resilient_stream,
+)
+
+
+class ChatStream:
+    """
+    Iterator over the text of a streamed response.
+
+    Yields plain text chunks, like the original generator API, while keeping
+    the typed metadata the provider sent: after iteration finishes,
+    ``usage``, ``finish_reason`` and ``tool_calls`` are populated. If a broken
+    stream is restarted, STREAM_RESTART is passed through so the consumer can
+    drop the partial text.
+    """
+
+    def __init__(self, chunks, provider):
+        self._chunks = chunks
+        self.provider = provider
+        self.usage = None
+        self.finish_reason = None
+        self.tool_calls = []
+        self.error = None
+
+    def __iter__(self):
+        try:
+            for chunk in self._chunks:
+                if isinstance(chunk, TextDelta):
+                    yield chunk.text
+                elif chunk is STREAM_RESTART:
+                    self.tool_calls = []
+                    yield chunk
+                elif isinstance(chunk, Usage):
+                    self.usage = chunk
+                elif isinstance(chunk, FinishReason):
+                    self.finish_reason = chunk.reason
+                elif isinstance(chunk, ToolCall):
+                    self.tool_calls.append(chunk)
+        except Exception as e:
+            self.error = e
+            print(f"Error occurred while communicating with {self.provider}: {str(e)}")
+
+
+def stream_chunks(client, provider, model, messages, **options):
+    """
+    Stream typed chunks (TextDelta, ToolCall, Usage, FinishReason) from a provider.
+
+    Transient failures are retried with backoff behind the provider's circuit
+    breaker. Unlike chat_with_ai, errors that persist are raised to the caller.
+
+    Args:
+        client: The initialized client instance for the provider
+        provider (str): The name of the provider ('groq', 'openai', etc.)
+        model (str): The model name to use
+        messages (list): List of message dictionaries containing the conversation history
+        **options: Extra request parameters passed to the provider (e.g. tools)
+
+    Returns:
+        iterator: The typed chunk stream
+    """
+    adapter = get_adapter(provider)
+    recorder = get_recorder()
+
+    def open_stream():
+        chunks = adapter.stream(client, model, messages, **options)
+        if recorder is not None and provider != "replay":
+            chunks = recorder.record(chunks, provider, model, messages)
+        return chunks
+
+    return resilient_stream(open_stream, provider, probe=lambda: adapter.probe(client))
+
+
+def chat_with_ai(client, provider, model, messages, stream=False, tools=None):
     """
     Handle chat interactions with different AI providers.
 
@@ -13,72 +98,86 @@ def chat_with_ai(client, provider, model, messages, stream=False):
         model (str): The model name to use
         messages (list): List of message dictionaries containing the conversation history
         stream (bool): Whether to stream the response (default: False)
+        tools (list): Provider-neutral tool specs the model may call; only
+            used when streaming, with the requested calls on ChatStream.tool_calls
 
     Returns:
-        str or generator: The AI's response text or a stream of response chunks
+        str or ChatStream: The AI's response text (None on error), or an
+        iterator of response text chunks when streaming
     """
+    if stream:
+        options = get_adapter(provider).tool_options(tools) if tools else {}
+        return ChatStream(
+            stream_chunks(client, provider, model, messages, **options), provider
+        )
+
+    adapter = get_adapter(provider)
+    recorder = get_recorder()
     try:
-        if provider == "groq":
-            response = client.chat.completions.create(
-                messages=messages,
-                model=model,
-                stream=stream,  # Ensure we pass the stream flag
-            )
-            if stream:
-                # For streaming, yield chunks as they arrive
-                for chunk in response:
-                    yield chunk.choices[0].delta.content or ""
-            else:
-                return response.choices[0].message.content
-
-        elif provider == "openai":
-            response = client.chat.completions.create(
-                model=model,
-                messages=messages,
-                stream=stream,  # Ensure we pass the stream flag
-            )
-            if stream:
-                # If streaming, yield chunks
-                for chunk in response:
-                    yield chunk.choices[0].delta.content or ""
-            else:
-                return response.choices[0].message.content
-
-        elif provider == "anthropic":
-            if stream:
-                with client.messages.stream(
-                    max_tokens=4096, messages=messages, model=model
-                ) as stream_response:
-                    for delta in stream_response.text_stream:
-                        yield delta
-            else:
-                response = client.messages.create(
-                    model=model, messages=messages, max_tokens=4096, stream=False
-                )
-                return response.content[0].text
-
-        elif provider == "cerebras":
-            response = client.chat.completions.create(
-                model=model, messages=messages, stream=stream
-            )
-            if stream:
-                # For streaming, yield chunks as they arrive
-                for chunk in response:
-                    yield chunk.choices[0].delta.content or ""
-            else:
-                return response.choices[0].message.content
-
-        elif provider == "openrouter":
-            response = client.chat.completions.create(
-                model=model, messages=messages, stream=stream
+        start = time.perf_counter()
+        completion = call_with_retries(
+            lambda: adapter.complete(client, model, messages),
+            provider,
+            probe=lambda: adapter.probe(client),
+        )
+        if recorder is not None and provider != "replay":
+            recorder.record_completion(
+                completion, provider, model, messages, time.perf_counter() - start
             )
-            if stream:
-                # For streaming, yield chunks as they arrive
-                for chunk in response:
-                    yield chunk.choices[0].delta.content or ""
-            else:
-                return response.choices[0].message.content
+        return completion.text
+    except Exception as e:
+        print(f"Error occurred while communicating with {provider}: {str(e)}")
+        return None
+
+
+async def achat_with_ai(client, provider, model, messages):
+    """
+    Asynchronously get a complete response from an AI provider.
+
+    Args:
+        client: The initialized async client instance for the provider
+        provider (str): The name of the provider ('groq', 'openai', etc.)
+        model (str): The model name to use
+        messages (list): List of message dictionaries containing the conversation history
 
+    Returns:
+        str: The AI's response text, or None if the request failed
+    """
+    adapter = get_adapter(provider)
+    try:
+        completion = await acall_with_retries(
+            lambda: adapter.acomplete(client, model, messages), provider
+        )
+        return completion.text
     except Exception as e:
         print(f"Error occurred while communicating with {provider}: {str(e)}")
         return None
+
+
+async def astream_chat_with_ai(client, provider, model, messages):
+    """
+    Asynchronously stream a response from an AI provider.
+
+    Yields the same text chunks as chat_with_ai(..., stream=True), so the two
+    paths can be used interchangeably.
+
+    Args:
+        client: The initialized async client instance for the provider
+        provider (str): The name of the provider ('groq', 'openai', etc.)
+        model (str): The model name to use
+        messages (list): List of message dictionaries containing the conversation history
+
+    Yields:
+        str: Response text chunks as they arrive
+    """
+    adapter = get_adapter(provider)
+    try:
+        async for chunk in aresilient_stream(
+            lambda: adapter.astream(client, model, messages), provider
+        ):
+            if isinstance(chunk, TextDelta):
+                yield chunk.text
+            elif chunk is STREAM_RESTART:
+                yield chunk
+    except Exception as e:
+        print(f"Error occurred while communicating with {provider}: {str(e)}")
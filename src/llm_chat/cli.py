@@ -1,6 +1,11 @@
+import os
+import re
 import sys
+import time
+import uuid
+from contextlib import nullcontext
+from datetime import datetime
 from prompt_toolkit import prompt
-from prompt_toolkit.completion import WordCompleter
 from .utils import print_available_models
 from termcolor import colored
 from .config import (
@@ -9,10 +14,80 @@ from .config import (
     save_config,
 )  # Import the necessary functions from config
 from .clients import create_clients
+from .transport import configure_transport
 from .chat import chat_with_ai
-from .utils import count_tokens, create_typing_animation, stream_with_markdown_chunks
+from .utils import create_typing_animation, stream_with_markdown_chunks
 from .setup import setup
-from .tools import execute_terminal_command
+from .tools import (
+    DEFAULT_COMMAND_TIMEOUT,
+    display_search_results,
+    execute_terminal_command,
+    format_command_context,
+    web_search_many,
+)
+from .cache import ResponseCache, create_response_cache
+from .tokens import TokenLedger, count_tokens
+from .context import ContextManager
+from .metrics import RequestMetrics, SessionStats, TimedStream, TraceWriter
+from .routing import AUTO_PROVIDER, POLICIES, create_router
+from .sessions import create_session_store
+from .grounding import DEFAULT_TOKEN_BUDGET, format_context, ground
+from .agent import MAX_TOOL_STEPS, default_tools, run_tool_calls
+from .providers import get_adapter
+from .providers.replay import REPLAY_MODELS, ReplayAdapter, start_recording
+from .index import ProjectIndex, format_passages
+from .catalog import create_model_catalog
+from .prewarm import create_connection_warmer
+from .profiling import TurnProfiler, print_turn_report, profile_startup
+
+
+class CliState:
+    """Optional services shared by the chat loop and command handlers."""
+
+    def __init__(self, config, trace_file=None, profile=False):
+        self.response_cache = create_response_cache(config)
+        self.token_ledger = TokenLedger()
+        self.context = ContextManager(self.token_ledger)
+        self.stats = SessionStats()
+        trace_file = trace_file or config.get("trace_file")
+        self.tracer = TraceWriter(trace_file) if trace_file else None
+        self.router = create_router(config)
+        self.sessions = create_session_store(config)
+        # Web page passages to send along with the next message
+        self.ground_search = config.get("ground_search", True)
+        self.ground_tokens = config.get("ground_tokens", DEFAULT_TOKEN_BUDGET)
+        self.pending_context = None
+        self.exec_timeout = config.get("exec_timeout", DEFAULT_COMMAND_TIMEOUT)
+        self.last_command = None  # (command, result) of the latest exec
+        # Tools the model may call (off by default; toggled with 'tools on|off')
+        self.tools_enabled = config.get("model_tools", False)
+        self.tools = default_tools(os.environ.get("SERPER_API_KEY"), self.exec_timeout)
+        # Project directory searched for relevant excerpts on every turn
+        self.project_index = None
+        self.index_tokens = config.get("index_tokens", 1500)
+        # cProfile/tracemalloc capture of each turn ('profile on|off')
+        self.profiler = TurnProfiler() if profile else None
+        # Anthropic needs explicit cache breakpoints; OpenAI caches prefixes itself
+        get_adapter("anthropic").prompt_caching = config.get("prompt_caching", True)
+        # Keeps a connection to the active provider open (set up in main)
+        self.warmer = None
+        self.new_session()
+
+    def new_session(self):
+        """Start a new persisted session and return its id."""
+        self.session_id = uuid.uuid4().hex[:12]
+        return self.session_id
+
+    def add_pending_context(self, text):
+        """Stage context to be sent along with the next message."""
+        if self.pending_context:
+            text = f"{self.pending_context}\n\n{text}"
+        self.pending_context = text
+
+    def save_message(self, role, content, provider=None, model=None):
+        """Append a message to the current session, if sessions are saved."""
+        if self.sessions is not None:
+            self.sessions.append(self.session_id, role, content, provider, model)
 
 
 def print_help_menu():
@@ -25,10 +100,86 @@ def print_help_menu():
     print(colored("  'clear history' - Clear the conversation history", "yellow"))
     print(colored("  'quit' or 'exit' - End the conversation", "yellow"))
     print(colored("  'default' - Set a default model", "yellow"))
+    print(
+        colored(
+            "  'cache on|off|stats|clear' - Manage the local response cache", "yellow"
+        )
+    )
+    print(colored("  'stats' - Show latency and throughput per model", "yellow"))
+    print(
+        colored(
+            "  'route [fastest|cheapest]' - Show or set how auto/ models pick a provider",
+            "yellow",
+        )
+    )
+    print(
+        colored(
+            "  '/web <query>[; <query>...]' - Search the web and use the top pages "
+            "in your next message",
+            "yellow",
+        )
+    )
+    print(
+        colored("  'exec <command>' or '! <command>' - Run a shell command", "yellow")
+    )
+    print(
+        colored(
+            "  'attach' - Send the last command's output with your next message",
+            "yellow",
+        )
+    )
+    print(
+        colored(
+            "  'tools on|off' - Let the model search the web and run commands",
+            "yellow",
+        )
+    )
+    print(
+        colored(
+            "  'index <dir>|off' - Index a project and include relevant files in each message",
+            "yellow",
+        )
+    )
+    print(
+        colored(
+            "  'profile on|off' - Profile each turn (time and memory by phase)",
+            "yellow",
+        )
+    )
+    print(colored("  'sessions' - List recent saved conversations", "yellow"))
+    print(colored("  'resume <id>' - Continue a saved conversation", "yellow"))
+    print(colored("  '/search <words>' - Search all saved conversations", "yellow"))
     print(colored("  'help' - Show menu options", "yellow"))
     print(colored("\n Use --- for a multi-line prompt", "yellow"))
 
 
+# `resume` with a session id or id prefix (ids are 12 hex characters)
+RESUME_COMMAND = re.compile(r"resume\s+([0-9a-f]{4,12})", re.IGNORECASE)
+
+
+def command_args(user_input, name, choices=()):
+    """
+    Match user input against a command's exact forms.
+
+    Only the command word alone or followed by one of its arguments counts,
+    so a prompt that merely starts with the same word is still sent.
+
+    Args:
+        user_input (str): The line the user entered
+        name (str): The command word
+        choices (tuple): The arguments the command accepts
+
+    Returns:
+        list: The argument words (possibly empty), or None if it's not the command
+    """
+    words = user_input.lower().split()
+    if words[:1] != [name] or len(words) > 2:
+        return None
+    if len(words) == 2 and words[1] not in choices:
+        return None
+    return words[1:]
+
+
 def handle_commands(
     user_input,
     models,
@@ -38,6 +189,7 @@ def handle_commands(
     model,
     default_provider,
     default_model,
+    state=None,
 ):
     """
     Handle CLI commands and their execution.
@@ -132,17 +284,94 @@ def handle_commands(
         return True, provider, model, default_provider, default_model
 
     if user_input.lower() == "token count":
-        total_tokens = sum(
-            count_tokens(m["content"], model) for m in conversation_history
-        )
+        ledger = state.token_ledger if state is not None else TokenLedger()
+        total_tokens = ledger.total(conversation_history, model)
         print(colored(f"Current conversation token count: {total_tokens}", "cyan"))
         return True, provider, model, default_provider, default_model
 
+    args = command_args(user_input, "cache", ("on", "off", "stats", "clear"))
+    if args is not None and state is not None:
+        handle_cache_command(args, state)
+        return True, provider, model, default_provider, default_model
+
+    if user_input.lower() == "stats" and state is not None:
+        print_stats(state.stats, state.warmer)
+        return True, provider, model, default_provider, default_model
+
+    args = command_args(user_input, "route", POLICIES)
+    if args is not None and state is not None:
+        handle_route_command(args, state)
+        return True, provider, model, default_provider, default_model
+
+    if user_input.lower() == "sessions" and state is not None:
+        print_sessions(state)
+        return True, provider, model, default_provider, default_model
+
+    resume = RESUME_COMMAND.fullmatch(user_input.strip())
+    if resume and state is not None:
+        provider, model = resume_session(
+            resume.group(1).lower(), conversation_history, state, provider, model
+        )
+        return True, provider, model, default_provider, default_model
+
+    if user_input.lower().split()[:1] == ["/search"] and state is not None:
+        print_search_results(user_input[len("/search") :].strip(), state)
+        return True, provider, model, default_provider, default_model
+
     if user_input.lower() == "clear history":
         conversation_history.clear()
+        if state is not None:
+            state.context.reset()
+            state.new_session()
         print(colored("Conversation history cleared.", "cyan"))
         return True, provider, model, default_provider, default_model
 
+    if user_input.lower().startswith("/web "):
+        queries = user_input[len("/web ") :].split(";")
+        results = web_search_many(queries, os.environ.get("SERPER_API_KEY"))
+        display_search_results(results)
+        if results and state is not None and state.ground_search:
+            attach_search_context(queries, results, model, state)
+        return True, provider, model, default_provider, default_model
+
+    args = command_args(user_input, "tools", ("on", "off"))
+    if args is not None and state is not None:
+        if args:
+            state.tools_enabled = args[0] == "on"
+            save_config({"model_tools": state.tools_enabled})
+        names = ", ".join(tool.name for tool in state.tools)
+        status = "on" if state.tools_enabled else "off"
+        print(colored(f"Model tool calling is {status} (tools: {names}).", "cyan"))
+        return True, provider, model, default_provider, default_model
+
+    args = command_args(user_input, "profile", ("on", "off"))
+    if args is not None and state is not None:
+        if args and args[0] == "on" and state.profiler is None:
+            state.profiler = TurnProfiler()
+        elif args and args[0] == "off":
+            state.profiler = None
+        status = "on" if state.profiler is not None else "off"
+        print(colored(f"Per-turn profiling is {status}.", "cyan"))
+        return True, provider, model, default_provider, default_model
+
+    if is_index_command(user_input) and state is not None:
+        handle_index_command(user_input.split(maxsplit=1)[1:], state)
+        return True, provider, model, default_provider, default_model
+
+    if user_input.lower() == "attach" and state is not None:
+        if state.last_command is None:
+            print(colored("No command output to attach; run 'exec' first.", "yellow"))
+        else:
+            state.add_pending_context(format_command_context(*state.last_command))
+            print(
+                colored(
+                    f"Output of '{state.last_command[0]}' will be sent with your "
+                    "next message.",
+                    "cyan",
+                )
+            )
+        return True, provider, model, default_provider, default_model
+
     # Handle terminal command execution
     if user_input.lower().startswith("exec ") or user_input.startswith("! "):
         # Extract the command to execute
@@ -153,7 +382,22 @@ def handle_commands(
 
         if command:
             # Execute the command
-            execute_terminal_command(command)
+            timeout = state.exec_timeout if state is not None else None
+            if state is not None and state.tracer is not None:
+                with state.tracer.span("exec", command=command) as span:
+                    result = execute_terminal_command(command, timeout=timeout)
+                    span["return_code"] = result.get("return_code")
+                    span["timed_out"] = result.get("timed_out", False)
+            else:
+                result = execute_terminal_command(command, timeout=timeout)
+            if state is not None:
+                state.last_command = (command, result)
+                print(
+                    colored(
+                        "Type 'attach' to send this output with your next message.",
+                        "cyan",
+                    )
+                )
         else:
             print(
                 colored(
@@ -166,17 +410,550 @@ def handle_commands(
     return False, provider, model, default_provider, default_model
 
 
+def handle_cache_command(args, state):
+    """
+    Handle the 'cache' command.
+
+    Args:
+        args (list): Subcommand words after 'cache'
+        state (CliState): The CLI state holding the response cache
+    """
+    action = args[0] if args else "stats"
+    if action == "on":
+        if state.response_cache is None:
+            state.response_cache = ResponseCache()
+        save_config({"response_cache": True})
+        print(colored("Response cache enabled.", "cyan"))
+    elif action == "off":
+        state.response_cache = None
+        save_config({"response_cache": False})
+        print(colored("Response cache disabled.", "cyan"))
+    elif action == "clear":
+        (state.response_cache or ResponseCache()).clear()
+        print(colored("Response cache cleared.", "cyan"))
+    elif action == "stats":
+        cache = state.response_cache or ResponseCache()
+        lifetime = cache.lifetime_stats()
+        lookups = lifetime["hits"] + lifetime["misses"]
+        hit_rate = lifetime["hits"] / lookups * 100 if lookups else 0.0
+        status = "on" if state.response_cache is not None else "off"
+        print(colored(f"Response cache: {status}", "cyan"))
+        print(
+            colored(
+                f"  Session: {cache.session_hits} hits, {cache.session_misses} misses",
+                "cyan",
+            )
+        )
+        print(
+            colored(
+                f"  Lifetime: {lifetime['hits']} hits, {lifetime['misses']} misses "
+                f"({hit_rate:.1f}% hit rate)",
+                "cyan",
+            )
+        )
+        print(
+            colored(
+                f"  Size: {cache.count()} entries, {cache.size() / (1024 * 1024):.2f} MB "
+                f"of {cache.max_bytes / (1024 * 1024):.0f} MB",
+                "cyan",
+            )
+        )
+    else:
+        print(colored("Usage: cache on|off|stats|clear", "red"))
+
+
+def handle_route_command(args, state):
+    """
+    Handle the 'route' command.
+
+    Args:
+        args (list): Optional policy name after 'route'
+        state (CliState): The CLI state holding the router
+    """
+    router = state.router
+    if args:
+        if args[0] not in POLICIES:
+            print(colored(f"Usage: route [{'|'.join(POLICIES)}]", "red"))
+            return
+        router.policy = args[0]
+        save_config({"routing_policy": router.policy})
+    print(colored(f"Routing policy: {router.policy}", "cyan"))
+    for logical_model, backend, stats in router.table():
+        rate = stats.tokens_per_sec
+        print(
+            colored(
+                f"  {logical_model} -> {backend.model} ({backend.provider}): "
+                f"TTFT {_format_seconds(stats.ttft)}, "
+                f"{'-' if rate is None else f'{rate:.1f}'} tokens/s, "
+                f"{stats.error_rate * 100:.0f}% errors, {stats.samples} samples",
+                "yellow",
+            )
+        )
+
+
+def is_index_command(user_input):
+    """
+    Return True if user_input is the 'index' command.
+
+    Only 'index', 'index off' and 'index <existing directory>' count, so a
+    question like "index of the largest element?" is still sent.
+    """
+    words = user_input.split(maxsplit=1)
+    if not words or words[0].lower() != "index":
+        return False
+    if len(words) == 1:
+        return True
+    target = words[1].strip()
+    return target.lower() == "off" or os.path.isdir(os.path.expanduser(target))
+
+
+def handle_index_command(args, state):
+    """
+    Handle the 'index' command.
+
+    'index <dir>' builds or incrementally updates the index of a directory and
+    turns on per-turn retrieval from it; 'index off' turns retrieval off and
+    'index' alone shows the current index.
+
+    Args:
+        args (list): The rest of the command, if any
+        state (CliState): The CLI state holding the project index
+    """
+    target = args[0].strip() if args else ""
+    if not target:
+        if state.project_index is None:
+            print(colored("No project is indexed. Use 'index <dir>'.", "yellow"))
+        else:
+            files, chunks = state.project_index.stats()
+            print(
+                colored(
+                    f"Using the index of {state.project_index.root} "
+                    f"({files} files, {chunks} passages).",
+                    "cyan",
+                )
+            )
+        return
+    if target.lower() == "off":
+        if state.project_index is not None:
+            state.project_index.close()
+        state.project_index = None
+        print(colored("Project retrieval turned off.", "cyan"))
+        return
+
+    directory = os.path.expanduser(target)
+    if not os.path.isdir(directory):
+        print(colored(f"Not a directory: {directory}", "red"))
+        return
+    if state.project_index is not None:
+        state.project_index.close()
+    start = time.perf_counter()
+    print(colored(f"Indexing {directory}...", "cyan"))
+    state.project_index = ProjectIndex(directory)
+    counts = state.project_index.update()
+    print(
+        colored(
+            f"Indexed {counts['indexed']} changed files, {counts['unchanged']} unchanged, "
+            f"{counts['removed']} removed in {time.perf_counter() - start:.1f}s. "
+            "Relevant excerpts will be sent with each message.",
+            "cyan",
+        )
+    )
+
+
+def with_project_context(messages, query, model, state):
+    """
+    Add the project passages most relevant to query to the outgoing request.
+
+    The excerpts are prepended to the last user message of the request only,
+    so they don't accumulate in the conversation history.
+
+    Returns:
+        list: The messages to send
+    """
+    passages, tokens = state.project_index.retrieve(
+        query, model, budget_tokens=state.index_tokens
+    )
+    if not passages:
+        return messages
+    print(
+        colored(
+            f"(Including {len(passages)} project excerpts, {tokens} tokens)", "cyan"
+        )
+    )
+    context = format_passages(state.project_index.root, passages)
+    last = messages[-1]
+    return messages[:-1] + [dict(last, content=f"{context}\n{last['content']}")]
+
+
+def attach_search_context(queries, results, model, state):
+    """
+    Read the top result pages and stage the most relevant passages.
+
+    The passages are sent with the next message, within the configured
+    token budget.
+
+    Args:
+        queries (list): The search queries
+        results (list): The merged search results
+        model (str): The current model, used to count tokens
+        state (CliState): The CLI state holding the pending context
+    """
+    query = "; ".join(q.strip() for q in queries if q.strip())
+    print(colored("Reading the top results...", "cyan"))
+    passages, tokens, pages = ground(
+        query, results, model, budget_tokens=state.ground_tokens
+    )
+    if not passages:
+        print(colored("No readable page content found for the results.", "yellow"))
+        return
+    state.add_pending_context(format_context(query, passages))
+    print(
+        colored(
+            f"Added {len(passages)} passages ({tokens} tokens) from {pages} pages; "
+            "they will be sent with your next message.",
+            "cyan",
+        )
+    )
+
+
+def _format_time(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M")
+
+
+def print_sessions(state, limit=20):
+    """
+    Print the most recently updated saved sessions.
+
+    Args:
+        state (CliState): The CLI state holding the session store
+        limit (int): Maximum number of sessions to list
+    """
+    if state.sessions is None:
+        print(colored("Session history is disabled.", "yellow"))
+        return
+    state.sessions.flush()
+    sessions = state.sessions.list_sessions(limit)
+    if not sessions:
+        print(colored("No saved sessions yet.", "yellow"))
+        return
+    print(colored("Recent sessions:", "cyan"))
+    for session in sessions:
+        current = " (current)" if session["id"] == state.session_id else ""
+        print(
+            colored(
+                f"  {session['id']}  {_format_time(session['updated'])}  "
+                f"{session['model'] or '-'}  {session['message_count']} messages{current}",
+                "yellow",
+            )
+        )
+        print(colored(f"      {session['title'] or ''}", "cyan"))
+
+
+def resume_session(session_id, conversation_history, state, provider, model):
+    """
+    Replace the conversation with a saved session and continue it.
+
+    Args:
+        session_id (str): The session id (or a unique prefix of it)
+        conversation_history (list): The history to replace, in place
+        state (CliState): The CLI state holding the session store
+        provider (str): The current provider
+        model (str): The current model
+
+    Returns:
+        tuple: (provider, model) to use for the resumed session
+    """
+    if state.sessions is None:
+        print(colored("Session history is disabled.", "yellow"))
+        return provider, model
+    state.sessions.flush()
+    session = state.sessions.find_session(session_id)
+    if session is None:
+        print(colored(f"No unique session matches '{session_id}'.", "red"))
+        return provider, model
+
+    conversation_history[:] = state.sessions.load_messages(session["id"])
+    state.context.reset()
+    state.session_id = session["id"]
+    provider = session["provider"] or provider
+    model = session["model"] or model
+    print(
+        colored(
+            f"Resumed session {session['id']} ({len(conversation_history)} messages) "
+            f"with {model} (Provider: {provider})",
+            "cyan",
+        )
+    )
+    return provider, model
+
+
+def print_search_results(query, state, limit=20):
+    """
+    Print saved messages matching a full-text query, best matches first.
+
+    Args:
+        query (str): Words to search for
+        state (CliState): The CLI state holding the session store
+        limit (int): Maximum number of results
+    """
+    if state.sessions is None:
+        print(colored("Session history is disabled.", "yellow"))
+        return
+    if not query:
+        print(colored("Usage: /search <words>", "red"))
+        return
+    if not state.sessions.fts:
+        print(colored("Full-text search needs SQLite with FTS5.", "red"))
+        return
+    state.sessions.flush()
+    results = state.sessions.search(query, limit)
+    if not results:
+        print(colored(f"No saved messages match '{query}'.", "yellow"))
+        return
+    for result in results:
+        print(
+            colored(
+                f"  {result['session_id']}  {_format_time(result['created'])}  "
+                f"{result['role']}: {result['snippet']}",
+                "yellow",
+            )
+        )
+
+
+def _format_seconds(value, scale=1000, unit="ms"):
+    return "-" if value is None else f"{value * scale:.0f}{unit}"
+
+
+def print_stats(stats, warmer=None):
+    """
+    Print per-model latency and throughput for the session.
+
+    Args:
+        stats (SessionStats): The recorded request metrics
+        warmer (ConnectionWarmer): The connection warmer, if any
+    """
+    rows = stats.summary()
+    if not rows:
+        print(colored("No requests recorded yet.", "yellow"))
+        return
+    print(colored("Session stats:", "cyan"))
+    if warmer is not None and warmer.warmups:
+        print(
+            colored(
+                f"  Connection warm-ups: {warmer.warmups} "
+                f"({warmer.failures} failed)",
+                "yellow",
+            )
+        )
+    for row in rows:
+        rate = row["tokens_per_sec"]
+        print(
+            colored(
+                f"  {row['model']} ({row['provider']}): {row['requests']} requests, "
+                f"{row['errors']} errors, {row['cached']} cached",
+                "yellow",
+            )
+        )
+        print(
+            colored(
+                f"    TTFT avg {_format_seconds(row['ttft_avg'])}, "
+                f"p50 {_format_seconds(row['ttft_p50'])} | "
+                f"{'-' if rate is None else f'{rate:.1f}'} tokens/s | "
+                f"total avg {_format_seconds(row['duration_avg'])}, "
+                f"render avg {_format_seconds(row['render_avg'])}",
+                "cyan",
+            )
+        )
+        print(
+            colored(
+                f"    Inter-token latency p50 <= {row['inter_token_p50_ms']}ms, "
+                f"p95 <= {row['inter_token_p95_ms']}ms",
+                "cyan",
+            )
+        )
+        if row["warm_requests"] or row["cold_requests"]:
+            print(
+                colored(
+                    f"    Connections: {row['warm_requests']} warm "
+                    f"(TTFT avg {_format_seconds(row['ttft_warm_avg'])}), "
+                    f"{row['cold_requests']} cold "
+                    f"(TTFT avg {_format_seconds(row['ttft_cold_avg'])})",
+                    "cyan",
+                )
+            )
+        if row["cached_input_tokens"]:
+            print(
+                colored(
+                    f"    Prompt cache: {row['cached_input_tokens']:,} of "
+                    f"{row['input_tokens']:,} input tokens cached "
+                    f"({row['cached_input_tokens'] / row['input_tokens']:.0%})",
+                    "cyan",
+                )
+            )
+
+
+def warm_targets(state, clients, provider, model):
+    """
+    Return the providers the next request to a model is expected to go to.
+
+    Args:
+        state (CliState): The CLI state (for the router)
+        clients (Mapping): The available provider clients
+        provider (str): The selected provider, possibly the routing one
+        model (str): The selected model
+
+    Returns:
+        list: Provider names whose connections are worth keeping open
+    """
+    if provider == AUTO_PROVIDER:
+        backend = state.router.choose(model, clients)
+        return [backend.provider] if backend is not None else []
+    return [provider] if provider in clients else []
+
+
+def print_prompt_cache(usage):
+    """
+    Print how much of a request's prompt the provider served from its cache.
+
+    Args:
+        usage (Usage): The usage the provider reported for the request
+    """
+    read = usage.cached_input_tokens or 0
+    written = usage.cache_write_tokens or 0
+    if not (read or written) or not usage.input_tokens:
+        return
+    line = f"Prompt cache: {read:,} of {usage.input_tokens:,} input tokens cached"
+    if written:
+        line += f" ({written:,} written)"
+    print(colored(line, "cyan"))
+
+
+def stream_response(state, client, provider, model, messages, backend, tools=None):
+    """
+    Send one request, render the streamed reply and record its metrics.
+
+    Args:
+        state (CliState): The CLI state (cache, stats, router, tracer)
+        client: The provider client
+        provider (str): The provider the request goes to
+        model (str): The model the request goes to
+        messages (list): The messages to send
+        backend (Backend): The routing backend, if the model was routed
+        tools (list): Tool specs to offer, or None
+
+    Returns:
+        tuple: (response text, ChatStream, whether the request failed)
+    """
+    metrics = RequestMetrics(provider, model)
+    # Nothing is sent until the stream is iterated, so this is free on a cache hit
+    chat_stream = chat_with_ai(
+        client, provider, model, messages, stream=True, tools=tools
+    )
+    # Tool calls aren't cached, so only cache plain requests; replays must
+    # consume their cassette in order, so they bypass the cache too
+    if state.response_cache is not None and not tools and provider != "replay":
+        hits = state.response_cache.session_hits
+        response = state.response_cache.stream(
+            provider, model, messages, lambda: chat_stream
+        )
+        metrics.cached = state.response_cache.session_hits > hits
+    else:
+        response = chat_stream
+    response = TimedStream(response, metrics)
+
+    # Stream the response with special handling for code blocks
+    in_progress = state.warmer.request(provider) if state.warmer else nullcontext()
+    with in_progress as warm:
+        render_start = time.perf_counter()
+        text = stream_with_markdown_chunks(response)
+    # Everything not spent waiting on the provider went to rendering
+    metrics.render_time = time.perf_counter() - render_start - metrics.network_wait
+    if not metrics.cached and get_adapter(provider).sdk_package:
+        metrics.warm = warm
+
+    failed = not metrics.cached and chat_stream.error is not None
+    if failed:
+        metrics.error = str(chat_stream.error)
+    usage = chat_stream.usage
+    if usage is not None and usage.output_tokens:
+        metrics.output_tokens = usage.output_tokens
+    else:
+        metrics.output_tokens = count_tokens(text, model)
+    if usage is not None and not metrics.cached:
+        metrics.input_tokens = usage.input_tokens
+        metrics.cached_input_tokens = usage.cached_input_tokens
+        metrics.cache_write_tokens = usage.cache_write_tokens
+        print_prompt_cache(usage)
+    state.stats.add(metrics)
+    if state.profiler is not None:
+        state.profiler.add("network wait", metrics.network_wait)
+        state.profiler.add("rendering", metrics.render_time)
+    if backend is not None:
+        state.router.record(backend, metrics)
+    if state.tracer is not None:
+        state.tracer.write(metrics.to_span())
+    return text, chat_stream, failed
+
+
+def confirm_tool_call(name, arguments):
+    """Ask the user whether the model may run a command."""
+    command = arguments.get("command", "")
+    answer = prompt(f"\nAllow the model to run `{command}`? [y/N] ").strip().lower()
+    return answer in ("y", "yes")
+
+
+def _option_value(argv, flag):
+    """Return the value following flag in argv, or None if it isn't present."""
+    if flag in argv:
+        index = argv.index(flag)
+        if index + 1 < len(argv):
+            return argv[index + 1]
+    return None
+
+
 def main():
     """Main CLI entry point."""
     if len(sys.argv) > 1 and sys.argv[1] == "setup":
         setup()
         return
 
+    if "--profile-startup" in sys.argv:
+        profile_startup()
+        return
+
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        from .batch import main as batch_main
+
+        sys.exit(batch_main(sys.argv[2:]))
+
     api_keys = initialize()  # Load API keys using the initialize function from config
+    # One pooled, keep-alive HTTP transport shared by every provider client
+    configure_transport(load_config().get("http"))
+    record_path = _option_value(sys.argv, "--record")
+    if record_path:
+        start_recording(record_path)
+        print(colored(f"Recording responses to {record_path}", "yellow"))
+    replay_path = _option_value(sys.argv, "--replay")
+    if replay_path:
+        if not os.path.exists(replay_path):
+            print(colored(f"Error: Cassette {replay_path} not found.", "red"))
+            sys.exit(1)
+        # The replay provider's "API key" is the cassette to serve
+        api_keys = dict(api_keys, **{ReplayAdapter.env_var: replay_path})
     clients = create_clients(api_keys)
     print(colored("Initialization Successful.", "green"))
 
+    # Load saved configuration using the load_config function from config
+    config = load_config()
+    state = CliState(
+        config,
+        trace_file=_option_value(sys.argv, "--trace"),
+        profile="--profile" in sys.argv,
+    )
+
     models = {
+        # Logical models routed to the best provider serving them
+        AUTO_PROVIDER: list(state.router.routes),
         "groq": [
             "llama-3.1-70b-versatile",
             "mixtral-8x7b-32768",
@@ -190,27 +967,33 @@ def main():
         ],
         "cerebras": ["llama3.1-8b", "llama-3.3-70b"],
         "openrouter": ["google/gemini-2.5-pro", "x-ai/grok-3", "x-ai/grok-4", "custom"],
+        # Recorded responses, at the recorded cadence, unthrottled or sped up
+        "replay": REPLAY_MODELS,
     }
 
     print(colored("Welcome to the Multi-Model AI Chat CLI!", "cyan", attrs=["bold"]))
     print_help_menu()
 
-    all_models = [
-        model for provider_models in models.values() for model in provider_models
-    ]
-    model_completer = WordCompleter(all_models, ignore_case=True)
-
-    # Load saved configuration using the load_config function from config
-    config = load_config()
     default_provider = config.get(
         "default_provider", "openai"
     )  # Default provider if not in config
     default_model = config.get(
         "default_model", "gpt-4o"
     )  # Default model if not in config
+    if replay_path:
+        default_provider, default_model = "replay", REPLAY_MODELS[0]
     provider = default_provider  # Set to default provider
     model = default_model  # Set to default model
     conversation_history = []
+    targets = warm_targets(state, clients, provider, model)
+    # Built-in lists plus the providers' models endpoints, fetched in the
+    # background when a provider is used and cached on disk; completion
+    # searches all of them
+    models = create_model_catalog(models, clients, config, targets)
+    model_completer = models.completer()
+    # Open a connection to the active provider while the user types
+    state.warmer = create_connection_warmer(clients, config)
+    state.warmer.keep_warm(targets)
 
     while True:
         user_input = prompt("\nYou: ").strip()
@@ -226,6 +1009,8 @@ def main():
         print("\n" + "–" * 70)
 
         if user_input.lower() in ["quit", "exit"]:
+            if state.sessions is not None:
+                state.sessions.close()
             print(colored("\nGoodbye!", "cyan"))
             break
 
@@ -238,15 +1023,15 @@ def main():
             model,
             default_provider,
             default_model,
+            state,
         )
 
         if handled:
-            continue
-
-        conversation_history.append({"role": "user", "content": user_input})
-
-        if provider not in clients:
-            print(colored(f"Error: No API key available for {provider}.", "red"))
+            # The model may have changed; warm whichever provider it uses now
+            # and fetch its model list if that is stale
+            targets = warm_targets(state, clients, provider, model)
+            state.warmer.keep_warm(targets)
+            models.refresh_in_background(targets)
             continue
 
         # Use the default model if no model is currently selected
@@ -254,24 +1039,99 @@ def main():
             model = default_model
             provider = default_provider
 
-        # Show thinking animation before getting response
-        create_typing_animation(f"Getting response from {model}")
+        # Resolve a logical model to the best backend for this request
+        backend = None
+        request_provider, request_model = provider, model
+        if provider == AUTO_PROVIDER:
+            backend = state.router.choose(model, clients)
+            if backend is None:
+                print(colored(f"Error: No available provider serves {model}.", "red"))
+                continue
+            request_provider, request_model = backend.provider, backend.model
 
-        response = chat_with_ai(
-            clients[provider], provider, model, conversation_history, stream=True
-        )
+        if request_provider not in clients:
+            print(
+                colored(f"Error: No API key available for {request_provider}.", "red")
+            )
+            continue
+
+        # Only turns that are sent go into the history and the session store
+        query = user_input
+        if state.pending_context:
+            user_input = f"{state.pending_context}\n\n{user_input}"
+            state.pending_context = None
+        conversation_history.append({"role": "user", "content": user_input})
+        state.save_message("user", user_input, provider, model)
 
-        if response:
-            print(colored(f"\n{model}:", "green", attrs=["bold"]))
+        # Show thinking animation before getting response; it ends as soon as
+        # the provider's connection is open rather than delaying the request
+        ready = state.warmer.warm(request_provider)
+        create_typing_animation(f"Getting response from {model}", until=ready)
 
-            # Stream the response with special handling for code blocks
-            full_response = stream_with_markdown_chunks(response)
+        client = clients[request_provider]
+        profiler = state.profiler
+        if profiler is not None:
+            profiler.start()
+        # Only send what fits in the model's context window
+        messages = state.context.prepare(conversation_history, request_model)
+        if state.project_index is not None:
+            messages = with_project_context(messages, query, request_model, state)
+        tools = [tool.spec() for tool in state.tools] if state.tools_enabled else None
+
+        label = model if backend is None else f"{model} (via {request_provider})"
+        print(colored(f"\n{label}:", "green", attrs=["bold"]))
+
+        # Each step is one model round trip; tool calls requested in a step run
+        # in parallel and their results are sent back in the next one
+        parts = []
+        for step in range(MAX_TOOL_STEPS):
+            text, chat_stream, failed = stream_response(
+                state, client, request_provider, request_model, messages, backend, tools
+            )
+            if failed:
+                break
+            if text:
+                parts.append(text)
+            if not tools or not chat_stream.tool_calls:
+                break
+            if step == MAX_TOOL_STEPS - 1:
+                print(
+                    colored(
+                        f"\nStopped after {MAX_TOOL_STEPS} rounds of tool calls.",
+                        "yellow",
+                    )
+                )
+                break
+            with profiler.phase("tool execution") if profiler else nullcontext():
+                results = run_tool_calls(
+                    chat_stream.tool_calls,
+                    state.tools,
+                    confirm=confirm_tool_call,
+                    tracer=state.tracer,
+                )
+            # Tool turns go only to the provider, not into the saved history
+            messages = messages + get_adapter(request_provider).tool_messages(
+                text, chat_stream.tool_calls, results
+            )
+        full_response = "\n\n".join(parts)
 
-            print("\n" + "–" * 70)
+        print("\n" + "–" * 70)
+        if not failed:
             # Store the actual complete response in conversation history
             conversation_history.append({"role": "assistant", "content": full_response})
+            state.save_message("assistant", full_response)
+            # Summarize older turns in the background if nearing the context limit
+            state.context.maybe_compact(
+                conversation_history,
+                request_model,
+                lambda msgs, c=client, p=request_provider, m=request_model: chat_with_ai(
+                    c, p, m, msgs
+                ),
+            )
         else:
             print(colored(f"Failed to get a response from {model}.", "red"))
+        if profiler is not None:
+            print_turn_report(profiler.stop())
 
 
 if __name__ == "__main__":
@@ -1,38 +1,109 @@
 """
 Client management for different LLM providers and tools
+
+Provider SDKs are imported lazily: nothing is imported or constructed until a
+client is first requested, so a session only pays for the provider it uses.
 """
 
-from groq import Groq
-from openai import OpenAI
-from anthropic import Anthropic
-from cerebras.cloud.sdk import Cerebras
-
-
-def create_clients(api_keys):
-    clients = {}
-    api_key_mapping = {
-        "groq": "GROQ_API_KEY",
-        "openai": "OPENAI_API_KEY",
-        "anthropic": "ANTHROPIC_API_KEY",
-        "cerebras": "CEREBRAS_API_KEY",
-        "serper": "SERPER_API_KEY",  # For web search
-        "openrouter": "OPENROUTER_API_KEY",
-    }
-
-    for provider, env_var in api_key_mapping.items():
-        key = api_keys.get(env_var)
-        if key:
-            if provider == "groq":
-                clients[provider] = Groq(api_key=key)
-            elif provider == "openai":
-                clients[provider] = OpenAI(api_key=key)
-            elif provider == "anthropic":
-                clients[provider] = Anthropic(api_key=key)
-            elif provider == "openrouter":
-                clients[provider] = OpenAI(
-                    api_key=key, base_url="https://openrouter.ai/api/v1"
-                )
-            elif provider == "cerebras":
-                clients[provider] = Cerebras(api_key=key)
-
-    return clients
+import threading
+from collections.abc import Mapping
+
+from .providers import get_adapter, provider_names
+from .transport import Transport, get_transport
+
+# Config keys of API keys for tools rather than chat providers
+TOOL_API_KEYS = {
+    "serper": "SERPER_API_KEY",  # For web search
+}
+
+
+class ClientRegistry(Mapping):
+    """
+    Read-only mapping of provider name to client that builds clients on demand.
+
+    Membership checks only look at which API keys are configured; the SDK for a
+    provider is imported and its client constructed on first lookup, then cached.
+    Every client is built on the registry's shared HTTP transport.
+    """
+
+    def __init__(self, api_keys, use_async=False, transport=None):
+        self._use_async = use_async
+        self.transport = transport or get_transport()
+        self._keys = {}
+        for provider in provider_names():
+            key = api_keys.get(get_adapter(provider).env_var)
+            if key:
+                self._keys[provider] = key
+        self._clients = {}
+        # Clients may be first requested from background threads (pre-warming)
+        self._lock = threading.Lock()
+
+    def __getitem__(self, provider):
+        with self._lock:
+            return self._get(provider)
+
+    def _get(self, provider):
+        client = self._clients.get(provider)
+        if client is None:
+            if provider not in self._keys:
+                raise KeyError(provider)
+            adapter = get_adapter(provider)
+            http_client = None
+            if self._use_async:
+                if adapter.sdk_package:  # Pseudo-providers (replay) have no SDK
+                    http_client = self.transport.sdk_async_client(adapter.sdk_package)
+                client = adapter.create_async_client(self._keys[provider], http_client)
+            else:
+                if adapter.sdk_package:
+                    http_client = self.transport.sdk_client(adapter.sdk_package)
+                client = adapter.create_client(self._keys[provider], http_client)
+            self._clients[provider] = client
+        return client
+
+    def __contains__(self, provider):
+        return provider in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def is_loaded(self, provider):
+        """Return True if the client for provider has already been constructed."""
+        return provider in self._clients
+
+
+def create_clients(api_keys, transport=None):
+    """
+    Create the client registry for all providers with a configured API key.
+
+    Args:
+        api_keys (dict): Dictionary of API keys loaded from the config file
+        transport (Transport): HTTP transport to share (default: the global one)
+
+    Returns:
+        ClientRegistry: Mapping of provider name to (lazily built) client
+    """
+    return ClientRegistry(api_keys, transport=transport)
+
+
+def create_async_clients(api_keys, transport=None):
+    """
+    Create the registry of asyncio clients for all providers with a configured API key.
+
+    Async HTTP clients are bound to the event loop they are first used in, so
+    by default each async registry gets its own transport.
+
+    Args:
+        api_keys (dict): Dictionary of API keys loaded from the config file
+        transport (Transport): HTTP transport to share (default: a new one)
+
+    Returns:
+        ClientRegistry: Mapping of provider name to (lazily built) async client
+    """
+    return ClientRegistry(
+        api_keys,
+        use_async=True,
+        transport=transport or Transport(get_transport().settings),
+    )
@@ -24,9 +24,10 @@ def initialize():
     with open(CONFIG_FILE, "r") as f:
         api_keys = json.load(f)
 
-    # Load API keys into environment variables
+    # Load API keys into environment variables (other settings share the file)
     for provider, key in api_keys.items():
-        os.environ[provider] = key
+        if isinstance(key, str):
+            os.environ[provider] = key
 
     return api_keys
 
@@ -52,11 +53,20 @@ def save_config(config):
     """
     Save the configuration, including the default model and provider.
 
+    The values are merged into the existing file so API keys and other
+    settings stored alongside them are preserved.
+
     Args:
-        config (dict): The configuration dictionary to be saved
+        config (dict): The configuration values to be saved
     """
     # Ensure the .llm_cli folder exists
     CONFIG_FOLDER.mkdir(parents=True, exist_ok=True)
 
+    existing = {}
+    if CONFIG_FILE.exists():
+        with open(CONFIG_FILE, "r") as f:
+            existing = json.load(f)
+    existing.update(config)
+
     with open(CONFIG_FILE, "w") as f:
-        json.dump(config, f, indent=4)
+        json.dump(existing, f, indent=4)
@@ -0,0 +1,208 @@
+"""
+Context-window management: token budgets, truncation and background compaction
+"""
+
+import threading
+from functools import lru_cache
+
+from .tokens import count_tokens
+
+# Model name prefixes mapped to their context window, in tokens. The first
+# matching prefix wins, so more specific prefixes come first.
+CONTEXT_WINDOWS = (
+    ("gpt-4.1", 1047576),
+    ("gpt-4o", 128000),
+    ("gpt-4", 8192),
+    ("o1", 200000),
+    ("o3", 200000),
+    ("o4", 200000),
+    ("claude", 200000),
+    ("llama3.1-8b", 8192),
+    ("llama-3.1", 128000),
+    ("llama-3.3", 128000),
+    ("mixtral-8x7b", 32768),
+    ("gemini-2.5", 1048576),
+    ("grok-4", 256000),
+    ("grok-3", 131072),
+)
+DEFAULT_CONTEXT_WINDOW = 8192
+RESPONSE_RESERVE = 4096  # Tokens left free for the reply
+
+SUMMARY_PROMPT = (
+    "Summarize the conversation so far in a compact form that preserves facts, "
+    "decisions, code, names and open questions needed to continue it. "
+    "Reply with the summary only."
+)
+SUMMARY_ACK = "Understood, I'll continue from that summary."
+
+_count_text = lru_cache(maxsize=32)(count_tokens)
+
+
+def context_window(model):
+    """
+    Look up the context window of a model.
+
+    Args:
+        model (str): The model name, optionally prefixed like "x-ai/grok-4"
+
+    Returns:
+        int: The context window in tokens
+    """
+    name = (model or "").rsplit("/", 1)[-1].lower()
+    for prefix, window in CONTEXT_WINDOWS:
+        if name.startswith(prefix):
+            return window
+    return DEFAULT_CONTEXT_WINDOW
+
+
+class ContextManager:
+    """
+    Keep the messages sent to the provider within the model's context budget.
+
+    The full conversation history is never modified. ``prepare`` builds the
+    outgoing view: a summary of older turns (when one exists) followed by the
+    recent turns, with the oldest turns dropped if the view still exceeds the
+    budget. ``maybe_compact`` runs after a turn and, once the history nears the
+    budget, summarizes older turns on a background thread so the next request
+    never waits on it.
+    """
+
+    def __init__(self, ledger, budget_ratio=0.9, compact_ratio=0.75, keep_recent=6):
+        self.ledger = ledger
+        self.budget_ratio = budget_ratio
+        self.compact_ratio = compact_ratio
+        self.keep_recent = keep_recent
+        self._lock = threading.Lock()
+        self._summary = None  # (summary text, number of history messages covered)
+        self._summary_anchor = None  # Last message covered, to detect cleared history
+        self._worker = None
+
+    def budget(self, model):
+        """Return the prompt token budget for a model."""
+        window = context_window(model)
+        return max(int(window * self.budget_ratio) - RESPONSE_RESERVE, window // 4)
+
+    def reset(self):
+        """Forget any summary, e.g. after the history is cleared."""
+        with self._lock:
+            self._summary = None
+            self._summary_anchor = None
+
+    def _current_summary(self, history):
+        with self._lock:
+            if self._summary is None:
+                return None, 0
+            text, covered = self._summary
+            if (
+                covered > len(history)
+                or history[covered - 1] is not self._summary_anchor
+            ):
+                # History was cleared or rewritten since the summary was made
+                self._summary = None
+                self._summary_anchor = None
+                return None, 0
+            return text, covered
+
+    def prepare(self, history, model):
+        """
+        Build the list of messages to send for the next request.
+
+        Args:
+            history (list): The full conversation history
+            model (str): The model the request is for
+
+        Returns:
+            list: Messages that fit within the model's context budget
+        """
+        counts = self.ledger.counts(history, model)
+        summary, covered = self._current_summary(history)
+
+        prefix = []
+        prefix_tokens = 0
+        if summary:
+            prefix = summary_messages(summary)
+            prefix_tokens = sum(_count_text(m["content"], model) for m in prefix)
+
+        budget = self.budget(model)
+        start = covered
+        used = prefix_tokens + sum(counts[start:])
+        # Drop the oldest turns until the view fits, always keeping the last
+        # message and starting on a user turn
+        while used > budget and start < len(history) - 1:
+            used -= counts[start]
+            start += 1
+            while start < len(history) - 1 and history[start].get("role") != "user":
+                used -= counts[start]
+                start += 1
+
+        if start == covered and not prefix:
+            return history
+        return prefix + history[start:]
+
+    def maybe_compact(self, history, model, summarize):
+        """
+        Start summarizing older turns in the background if history is near the budget.
+
+        Args:
+            history (list): The full conversation history
+            model (str): The model in use
+            summarize (callable): Takes a message list and returns summary text
+                (or None on failure); called on a background thread
+        """
+        if self._worker is not None and self._worker.is_alive():
+            return
+
+        summary, covered = self._current_summary(history)
+        counts = self.ledger.counts(history, model)
+        used = sum(counts[covered:])
+        if summary:
+            used += _count_text(summary, model)
+        if used < self.budget(model) * self.compact_ratio:
+            return
+
+        # Summarize up to a user turn, leaving the most recent turns verbatim,
+        # and no more than fits in a single summarization request
+        limit = self.budget(model) - (used - sum(counts[covered:]))
+        cut = covered
+        total = counts[covered] if covered < len(history) else 0
+        for i in range(covered + 1, len(history) - self.keep_recent + 1):
+            if total > limit:
+                break
+            if history[i].get("role") == "user":
+                cut = i
+            total += counts[i]
+        if cut <= covered:
+            return
+
+        to_summarize = (summary_messages(summary) if summary else []) + history[
+            covered:cut
+        ]
+        anchor = history[cut - 1]
+        self._worker = threading.Thread(
+            target=self._compact,
+            args=(to_summarize, cut, anchor, summarize),
+            daemon=True,
+        )
+        self._worker.start()
+
+    def _compact(self, messages, cut, anchor, summarize):
+        request = messages + [{"role": "user", "content": SUMMARY_PROMPT}]
+        try:
+            text = summarize(request)
+        except Exception:
+            return
+        if text:
+            with self._lock:
+                self._summary = (text.strip(), cut)
+                self._summary_anchor = anchor
+
+
+def summary_messages(summary):
+    """Return the user/assistant message pair that carries a summary."""
+    return [
+        {
+            "role": "user",
+            "content": f"Summary of our earlier conversation:\n\n{summary}",
+        },
+        {"role": "assistant", "content": SUMMARY_ACK},
+    ]
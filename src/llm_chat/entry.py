@@ -0,0 +1,47 @@
+"""
+Entry point of the lmci command
+
+Chooses the mode before anything heavy is imported: single-shot runs load
+only the request path, and the interactive CLI (prompt_toolkit, rich and the
+rest) is imported only when it is going to be used.
+"""
+
+import sys
+
+# Flags that select single-shot mode (so does piped stdin)
+SINGLE_SHOT_FLAGS = ("-p", "--prompt", "--json")
+
+
+def is_single_shot(argv, stdin):
+    """
+    Decide whether a command line asks for single-shot mode.
+
+    Args:
+        argv (list): Command-line arguments, without the program name
+        stdin: The standard input stream (None if closed)
+
+    Returns:
+        bool: True for single-shot mode, False for the interactive CLI
+    """
+    if argv and argv[0] in ("setup", "batch"):
+        return False
+    if "--profile-startup" in argv:
+        return False
+    for arg in argv:
+        if arg in SINGLE_SHOT_FLAGS or arg.startswith("--prompt="):
+            return True
+        if arg.startswith("-p") and not arg.startswith("--"):
+            return True  # -pTEXT
+    return stdin is not None and not stdin.isatty()
+
+
+def main():
+    """Run single-shot mode or the interactive CLI, depending on the arguments."""
+    if is_single_shot(sys.argv[1:], sys.stdin):
+        from .oneshot import main as single_shot_main
+
+        sys.exit(single_shot_main())
+
+    from .cli import main as cli_main
+
+    cli_main()
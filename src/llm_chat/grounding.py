@@ -0,0 +1,352 @@
+"""
+Ground answers in web pages: fetch search results, extract and rank passages
+
+The top result pages are fetched concurrently (bounded per host, with a hard
+deadline so one slow site never holds up the rest), their readable text is
+extracted while the body streams in, up to a byte cap, and the text is split
+into passages ranked against the query with BM25. The best passages that fit
+in a token budget are returned as context for the next request.
+"""
+
+import codecs
+import math
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+from .tokens import count_tokens
+from .transport import default_http_module, get_transport
+
+FETCH_TIMEOUT = 8.0  # Seconds for all pages together
+MAX_PAGE_BYTES = 512 * 1024
+MAX_PAGES = 5
+PER_HOST_LIMIT = 2
+PASSAGE_WORDS = 120
+DEFAULT_TOKEN_BUDGET = 2000
+USER_AGENT = "Mozilla/5.0 (compatible; llm-chat-cli)"
+
+SKIPPED_TAGS = set(
+    "script style noscript svg template nav header footer form aside".split()
+)
+BLOCK_TAGS = set(
+    "p div br li tr section article main blockquote pre h1 h2 h3 h4 h5 h6 dd dt".split()
+)
+STOPWORDS = set(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were what when where which who why will with how do does".split()
+)
+
+
+class TextExtractor(HTMLParser):
+    """
+    Incremental HTML to text converter.
+
+    Feed it decoded HTML as it arrives; ``paragraphs`` holds the readable text
+    split at block-level elements, with scripts, styles and page chrome
+    (navigation, headers, footers, forms) left out.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.paragraphs = []
+        self.title = ""
+        self._current = []
+        self._skip_depth = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag in BLOCK_TAGS:
+            self._break()
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+        elif tag == "title":
+            self._in_title = False
+        elif tag in BLOCK_TAGS:
+            self._break()
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip_depth:
+            self._current.append(data)
+
+    def _break(self):
+        text = " ".join("".join(self._current).split())
+        if text:
+            self.paragraphs.append(text)
+        self._current = []
+
+    def close(self):
+        super().close()
+        self._break()
+
+
+def _charset(content_type):
+    match = re.search(r"charset=([\w-]+)", content_type or "", re.I)
+    if match:
+        try:
+            return codecs.lookup(match.group(1)).name
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+class PageFetcher:
+    """
+    Fetch pages concurrently with per-host limits, a deadline and a byte cap.
+    """
+
+    def __init__(
+        self,
+        max_workers=MAX_PAGES * 2,
+        per_host=PER_HOST_LIMIT,
+        timeout=FETCH_TIMEOUT,
+        max_bytes=MAX_PAGE_BYTES,
+    ):
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.http_module = default_http_module()
+        self._host_limits = {}
+        self._lock = threading.Lock()
+
+    def _host_limit(self, url):
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.Semaphore(self.per_host)
+            return self._host_limits[host]
+
+    def fetch(self, url, deadline):
+        """
+        Fetch one page and extract its text, stopping at the byte cap or deadline.
+
+        Returns:
+            dict or None: {"url", "title", "paragraphs"}, or None on failure
+        """
+        with self._host_limit(url):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            http = get_transport().client(self.http_module)
+            extractor = TextExtractor()
+            try:
+                with http.stream(
+                    "GET",
+                    url,
+                    headers={"User-Agent": USER_AGENT, "Accept": "text/html"},
+                    timeout=remaining,
+                    follow_redirects=True,
+                ) as response:
+                    content_type = response.headers.get("content-type", "")
+                    if response.status_code >= 400 or not (
+                        "html" in content_type or "text/plain" in content_type
+                    ):
+                        return None
+                    decoder = codecs.getincrementaldecoder(_charset(content_type))(
+                        errors="replace"
+                    )
+                    received = 0
+                    for data in response.iter_bytes():
+                        received += len(data)
+                        extractor.feed(decoder.decode(data))
+                        # Stop reading on the byte cap or the shared deadline
+                        if received >= self.max_bytes or time.monotonic() > deadline:
+                            break
+                    extractor.feed(decoder.decode(b"", final=True))
+            except (self.http_module.HTTPError, ValueError):
+                return None
+            extractor.close()
+            return {
+                "url": url,
+                "title": " ".join(extractor.title.split()),
+                "paragraphs": extractor.paragraphs,
+            }
+
+    def fetch_all(self, urls):
+        """
+        Fetch pages concurrently and return those that finish before the deadline.
+
+        Pages still loading at the deadline are abandoned, not waited for.
+
+        Args:
+            urls (list): Page URLs
+
+        Returns:
+            list: Page dicts in the order of urls, without failed pages
+        """
+        if not urls:
+            return []
+        deadline = time.monotonic() + self.timeout
+        pool = ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls)))
+        futures = [pool.submit(self.fetch, url, deadline) for url in urls]
+        wait(futures, timeout=self.timeout)
+        for future in futures:
+            future.cancel()  # Drop fetches still queued behind a slow host
+        pool.shutdown(wait=False)
+        pages = []
+        for future in futures:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                if future.result() is not None:
+                    pages.append(future.result())
+        return pages
+
+
+def terms(text):
+    """Lowercased word tokens without stopwords, for ranking."""
+    return [w for w in re.findall(r"\w+", text.lower()) if w not in STOPWORDS]
+
+
+def chunk_paragraphs(paragraphs, target_words=PASSAGE_WORDS):
+    """
+    Pack consecutive paragraphs into passages of roughly target_words words.
+
+    Paragraphs longer than the target are split on word boundaries.
+
+    Returns:
+        list: Passage strings
+    """
+    passages = []
+    current = []
+    count = 0
+    for paragraph in paragraphs:
+        words = paragraph.split()
+        while len(words) > target_words:
+            if current:
+                passages.append(" ".join(current))
+                current, count = [], 0
+            passages.append(" ".join(words[:target_words]))
+            words = words[target_words:]
+        if count + len(words) > target_words and current:
+            passages.append(" ".join(current))
+            current, count = [], 0
+        current.extend(words)
+        count += len(words)
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+def rank_passages(passages, query, k1=1.2, b=0.75):
+    """
+    Order passages by BM25 relevance to the query, best first.
+
+    Args:
+        passages (list): Candidate dicts with a "text" key
+        query (str): The search query
+
+    Returns:
+        list: Passages with a positive score, each given a "score" key
+    """
+    query_terms = set(terms(query))
+    if not passages or not query_terms:
+        return []
+    docs = [Counter(terms(p["text"])) for p in passages]
+    avg_len = sum(sum(d.values()) for d in docs) / len(docs) or 1
+    frequency = Counter(t for d in docs for t in query_terms if t in d)
+    ranked = []
+    for passage, doc in zip(passages, docs):
+        length = sum(doc.values())
+        score = 0.0
+        for term in query_terms:
+            tf = doc.get(term)
+            if not tf:
+                continue
+            idf = math.log(
+                1 + (len(docs) - frequency[term] + 0.5) / (frequency[term] + 0.5)
+            )
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_len))
+        if score > 0:
+            ranked.append(dict(passage, score=score))
+    ranked.sort(key=lambda p: p["score"], reverse=True)
+    return ranked
+
+
+def select_passages(ranked, model, budget_tokens=DEFAULT_TOKEN_BUDGET):
+    """
+    Take the best passages that fit within the token budget.
+
+    Returns:
+        tuple: (selected passages, tokens used)
+    """
+    selected = []
+    used = 0
+    for passage in ranked:
+        tokens = count_tokens(passage["text"], model)
+        if used + tokens > budget_tokens:
+            continue
+        selected.append(passage)
+        used += tokens
+    return selected, used
+
+
+def format_context(query, passages):
+    """
+    Format selected passages as a block of sources to send with a message.
+
+    Args:
+        query (str): What was searched for
+        passages (list): Passage dicts with title, url and text
+
+    Returns:
+        str: Numbered sources, each with its URL
+    """
+    lines = [f"Web sources retrieved for: {query}", ""]
+    for i, passage in enumerate(passages, 1):
+        lines.append(f"[{i}] {passage['title'] or passage['url']} ({passage['url']})")
+        lines.append(passage["text"])
+        lines.append("")
+    lines.append("Use these sources where relevant and cite them by number.")
+    return "\n".join(lines)
+
+
+def ground(
+    query,
+    results,
+    model,
+    max_pages=MAX_PAGES,
+    budget_tokens=DEFAULT_TOKEN_BUDGET,
+    fetcher=None,
+):
+    """
+    Fetch the top search results and pick the passages most relevant to query.
+
+    Args:
+        query (str): The search query (or queries joined together)
+        results (list): Search result dicts with "link" and "title"
+        model (str): Model the passages are for, used to count tokens
+        max_pages (int): Number of top results to fetch
+        budget_tokens (int): Maximum tokens of passages to return
+        fetcher (PageFetcher): Fetcher to use (default: a new one)
+
+    Returns:
+        tuple: (selected passages, tokens used, number of pages fetched)
+    """
+    fetcher = fetcher or PageFetcher()
+    top = [r for r in results if r.get("link")][:max_pages]
+    titles = {r["link"]: r.get("title", "") for r in top}
+    pages = fetcher.fetch_all([r["link"] for r in top])
+    passages = [
+        {
+            "url": page["url"],
+            "title": page["title"] or titles.get(page["url"]),
+            "text": text,
+        }
+        for page in pages
+        for text in chunk_paragraphs(page["paragraphs"])
+    ]
+    selected, used = select_passages(
+        rank_passages(passages, query), model, budget_tokens
+    )
+    return selected, used, len(pages)
@@ -0,0 +1,345 @@
+"""
+Local, incremental BM25 index of project files for retrieval
+
+``index <dir>`` chunks the text files under a directory into an SQLite FTS5
+index (BM25 ranking, no network or embeddings). Reindexing only reprocesses
+files whose size or mtime changed and whose content hash differs. Each chat
+turn can then retrieve the passages most relevant to the message.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+from collections import Counter
+from pathlib import Path
+
+from .config import CONFIG_FOLDER
+from .tokens import count_tokens
+
+INDEX_DIR = CONFIG_FOLDER / "indexes"
+CHUNK_LINES = 40
+MAX_FILE_BYTES = 1024 * 1024
+DEFAULT_TOKEN_BUDGET = 1500
+# Ranking cost grows with the number of matching chunks, so queries use the
+# rarest terms and stop adding terms once this many postings are covered.
+# Terms in more than COMMON_TERM_RATIO of chunks carry almost no BM25 weight
+# and are dropped outright.
+MAX_POSTINGS = 20000
+COMMON_TERM_RATIO = 0.2
+MAX_QUERY_TERMS = 8
+SKIPPED_DIRS = set(
+    "node_modules __pycache__ venv env dist build target site-packages".split()
+)
+SKIPPED_SUFFIXES = tuple(
+    ".png .jpg .jpeg .gif .ico .pdf .zip .gz .tar .whl .so .dylib .dll .exe .bin "
+    ".pyc .lock .min.js .map .db .sqlite".split()
+)
+STOPWORDS = set(
+    "a an and are as at be by can do does for from has have how i in is it its "
+    "me my of on or should that the this to was what when where which who why "
+    "will with you your".split()
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL,
+    start_line INTEGER NOT NULL,
+    end_line INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_file ON chunks (file_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+    text, content='chunks', content_rowid='id'
+);
+CREATE TABLE IF NOT EXISTS terms (
+    term TEXT PRIMARY KEY,
+    df INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS chunks_insert AFTER INSERT ON chunks BEGIN
+    INSERT INTO chunks_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS chunks_delete AFTER DELETE ON chunks BEGIN
+    INSERT INTO chunks_fts (chunks_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+
+def tokenize(text):
+    """Split text into lowercased terms the way the FTS5 unicode61 tokenizer does."""
+    return re.findall(r"[^\W_]+", text.lower())
+
+
+def index_path_for(root):
+    """Return the database file holding the index of a directory."""
+    digest = hashlib.sha1(str(root).encode("utf-8")).hexdigest()[:16]
+    return INDEX_DIR / f"{Path(root).name or 'root'}-{digest}.db"
+
+
+def iter_files(root):
+    """
+    Yield (relative path, stat) for indexable files under root.
+
+    Hidden entries, dependency and build directories, and known binary
+    suffixes are skipped.
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in SKIPPED_DIRS:
+                        stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    name = entry.name.lower()
+                    if name.endswith(SKIPPED_SUFFIXES):
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                    if stat.st_size <= MAX_FILE_BYTES:
+                        yield os.path.relpath(entry.path, root), stat
+            except OSError:
+                continue
+
+
+def chunk_lines(text, size=CHUNK_LINES):
+    """
+    Split text into chunks of about size lines, preferring blank-line breaks.
+
+    Returns:
+        list: (start line, end line, chunk text) tuples, 1-based and inclusive
+    """
+    lines = text.splitlines()
+    chunks = []
+    start = 0
+    while start < len(lines):
+        end = min(start + size, len(lines))
+        if end < len(lines):
+            # Break at the last blank line in the second half of the window
+            for i in range(end, start + size // 2, -1):
+                if not lines[i - 1].strip():
+                    end = i
+                    break
+        body = "\n".join(lines[start:end])
+        if body.strip():
+            chunks.append((start + 1, end, body))
+        start = end
+    return chunks
+
+
+class ProjectIndex:
+    """Persistent FTS5 index of one directory's text files."""
+
+    def __init__(self, root, path=None):
+        self.root = Path(root).resolve()
+        self.path = path or index_path_for(self.root)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self._chunk_count = None
+
+    def close(self):
+        self.conn.close()
+
+    def update(self):
+        """
+        Bring the index up to date with the directory.
+
+        Unchanged files (same size and mtime) are skipped without being read;
+        files whose content hash is unchanged only get their mtime refreshed.
+
+        Returns:
+            dict: Counts of "scanned", "indexed", "unchanged" and "removed" files
+        """
+        known = {
+            path: (file_id, mtime_ns, size, digest)
+            for file_id, path, mtime_ns, size, digest in self.conn.execute(
+                "SELECT id, path, mtime_ns, size, hash FROM files"
+            )
+        }
+        counts = {"scanned": 0, "indexed": 0, "unchanged": 0, "removed": 0}
+        seen = set()
+        # Document frequencies are kept in our own table, updated by delta,
+        # because fts5vocab computes them by walking each term's postings.
+        df_delta = Counter()
+        with self.conn:
+            for relative, stat in iter_files(self.root):
+                counts["scanned"] += 1
+                seen.add(relative)
+                entry = known.get(relative)
+                if entry and entry[1] == stat.st_mtime_ns and entry[2] == stat.st_size:
+                    counts["unchanged"] += 1
+                    continue
+                try:
+                    data = (self.root / relative).read_bytes()
+                except OSError:
+                    continue
+                if b"\0" in data[:8192]:
+                    seen.discard(relative)  # Binary; drop it if it was indexed
+                    continue
+                digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+                if entry and entry[3] == digest:
+                    self.conn.execute(
+                        "UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?",
+                        (stat.st_mtime_ns, stat.st_size, entry[0]),
+                    )
+                    counts["unchanged"] += 1
+                    continue
+                if entry:
+                    self._delete_chunks(entry[0], df_delta)
+                    self.conn.execute(
+                        "UPDATE files SET mtime_ns = ?, size = ?, hash = ? WHERE id = ?",
+                        (stat.st_mtime_ns, stat.st_size, digest, entry[0]),
+                    )
+                    file_id = entry[0]
+                else:
+                    file_id = self.conn.execute(
+                        "INSERT INTO files (path, mtime_ns, size, hash) VALUES (?, ?, ?, ?)",
+                        (relative, stat.st_mtime_ns, stat.st_size, digest),
+                    ).lastrowid
+                chunks = chunk_lines(data.decode("utf-8", errors="replace"))
+                self.conn.executemany(
+                    "INSERT INTO chunks (file_id, start_line, end_line, text)"
+                    " VALUES (?, ?, ?, ?)",
+                    [(file_id, s, e, body) for s, e, body in chunks],
+                )
+                for _, _, body in chunks:
+                    df_delta.update(set(tokenize(body)))
+                counts["indexed"] += 1
+
+            for relative, entry in known.items():
+                if relative not in seen:
+                    self._delete_chunks(entry[0], df_delta)
+                    self.conn.execute("DELETE FROM files WHERE id = ?", (entry[0],))
+                    counts["removed"] += 1
+
+            self.conn.executemany(
+                "INSERT INTO terms (term, df) VALUES (?, ?)"
+                " ON CONFLICT (term) DO UPDATE SET df = df + excluded.df",
+                [(term, delta) for term, delta in df_delta.items() if delta],
+            )
+            self.conn.execute("DELETE FROM terms WHERE df <= 0")
+        self._chunk_count = None
+        return counts
+
+    def _delete_chunks(self, file_id, df_delta):
+        for (body,) in self.conn.execute(
+            "SELECT text FROM chunks WHERE file_id = ?", (file_id,)
+        ):
+            df_delta.subtract(set(tokenize(body)))
+        self.conn.execute("DELETE FROM chunks WHERE file_id = ?", (file_id,))
+
+    def stats(self):
+        """Return (number of files, number of chunks) in the index."""
+        files = self.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        chunks = self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        return files, chunks
+
+    def _query_terms(self, text):
+        words = [
+            w
+            for w in dict.fromkeys(tokenize(text))
+            if w not in STOPWORDS and len(w) > 1
+        ]
+        if not words:
+            return []
+        placeholders = ",".join("?" * len(words))
+        frequency = dict(
+            self.conn.execute(
+                f"SELECT term, df FROM terms WHERE term IN ({placeholders})",
+                words,
+            )
+        )
+        if self._chunk_count is None:
+            self._chunk_count = self.stats()[1]
+        limit = max(min(self._chunk_count * COMMON_TERM_RATIO, MAX_POSTINGS), 50)
+        terms = []
+        postings = 0
+        # Rarest (most informative) terms first, within the postings budget
+        for df, word in sorted((frequency[w], w) for w in words if w in frequency):
+            if df > limit or len(terms) == MAX_QUERY_TERMS:
+                break
+            if terms and postings + df > MAX_POSTINGS:
+                break
+            terms.append(word)
+            postings += df
+        return terms
+
+    def search(self, text, limit=20):
+        """
+        Return the chunks most relevant to text, best first.
+
+        Args:
+            text (str): Free text, e.g. the user's message
+            limit (int): Maximum number of chunks
+
+        Returns:
+            list: Dicts with path, start_line, end_line, text and score
+        """
+        terms = self._query_terms(text)
+        if not terms:
+            return []
+        query = " OR ".join(f'"{term}"' for term in terms)
+        rows = self.conn.execute(
+            "SELECT f.path, c.start_line, c.end_line, c.text, r.score FROM"
+            " (SELECT rowid, bm25(chunks_fts) AS score FROM chunks_fts"
+            "  WHERE chunks_fts MATCH ? ORDER BY score LIMIT ?) r"
+            " JOIN chunks c ON c.id = r.rowid JOIN files f ON f.id = c.file_id"
+            " ORDER BY r.score",
+            (query, limit),
+        ).fetchall()
+        keys = ("path", "start_line", "end_line", "text", "score")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def retrieve(self, text, model, budget_tokens=DEFAULT_TOKEN_BUDGET):
+        """
+        Return the best passages for text that fit within a token budget.
+
+        Returns:
+            tuple: (passages, tokens used)
+        """
+        selected = []
+        used = 0
+        for passage in self.search(text):
+            tokens = count_tokens(passage["text"], model)
+            if used + tokens > budget_tokens:
+                continue
+            selected.append(passage)
+            used += tokens
+        return selected, used
+
+
+def format_passages(root, passages):
+    """
+    Format retrieved passages as context for a message.
+
+    Args:
+        root (Path): The indexed directory
+        passages (list): Passages from ProjectIndex.retrieve
+
+    Returns:
+        str: Each passage as a fenced block labelled with its file and lines
+    """
+    lines = [f"Relevant excerpts from the project at {root}:", ""]
+    for passage in passages:
+        lines.append(
+            f"{passage['path']} (lines {passage['start_line']}-{passage['end_line']}):"
+        )
+        lines.append(f"```\n{passage['text']}\n```")
+        lines.append("")
+    return "\n".join(lines)
@@ -0,0 +1,260 @@
+"""
+Per-request latency and throughput instrumentation with JSONL trace export
+"""
+
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Upper bounds, in milliseconds, of the inter-token latency histogram buckets
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+def new_histogram():
+    """Return an empty latency histogram (one slot per bucket plus overflow)."""
+    return [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+
+def histogram_add(histogram, value_ms):
+    """Add a latency sample, in milliseconds, to a histogram."""
+    for i, bound in enumerate(LATENCY_BUCKETS_MS):
+        if value_ms <= bound:
+            histogram[i] += 1
+            return
+    histogram[-1] += 1
+
+
+def histogram_percentile(histogram, fraction):
+    """Return the bucket upper bound containing the given percentile, in ms."""
+    total = sum(histogram)
+    if not total:
+        return None
+    threshold = total * fraction
+    seen = 0
+    for i, count in enumerate(histogram):
+        seen += count
+        if seen >= threshold:
+            return (
+                LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else float("inf")
+            )
+    return float("inf")
+
+
+class RequestMetrics:
+    """Timings recorded for a single chat request."""
+
+    def __init__(self, provider, model):
+        self.id = uuid.uuid4().hex[:12]
+        self.provider = provider
+        self.model = model
+        self.started_at = time.time()
+        self.start = None  # perf_counter when the request was first polled
+        self.ttft = None  # Seconds from request start to first non-empty chunk
+        self.duration = None  # Seconds from request start to end of stream
+        self.network_wait = 0.0  # Seconds spent waiting on the provider
+        self.render_time = 0.0  # Seconds spent consuming (rendering) chunks
+        self.chunks = 0
+        self.chars = 0
+        self.output_tokens = None
+        self.input_tokens = None
+        self.cached_input_tokens = None  # Prompt tokens read from the provider cache
+        self.cache_write_tokens = None  # Prompt tokens written to the provider cache
+        self.inter_token = new_histogram()
+        self.warm = None  # Whether the request started on a pre-opened connection
+        self.cached = False
+        self.error = None
+
+    @property
+    def tokens_per_sec(self):
+        """Output tokens per second after the first token, or None if unknown."""
+        if not self.output_tokens or self.duration is None or self.ttft is None:
+            return None
+        generation = self.duration - self.ttft
+        if generation <= 0:
+            return None
+        return self.output_tokens / generation
+
+    def to_span(self):
+        """Return the request as a JSON-serializable trace span."""
+        return {
+            "type": "request",
+            "id": self.id,
+            "provider": self.provider,
+            "model": self.model,
+            "start": self.started_at,
+            "duration": self.duration,
+            "ttft": self.ttft,
+            "network_wait": self.network_wait,
+            "render_time": self.render_time,
+            "chunks": self.chunks,
+            "chars": self.chars,
+            "output_tokens": self.output_tokens,
+            "input_tokens": self.input_tokens,
+            "cached_input_tokens": self.cached_input_tokens,
+            "cache_write_tokens": self.cache_write_tokens,
+            "tokens_per_sec": self.tokens_per_sec,
+            "inter_token_ms": dict(
+                zip([str(b) for b in LATENCY_BUCKETS_MS] + ["inf"], self.inter_token)
+            ),
+            "warm_connection": self.warm,
+            "cached": self.cached,
+            "error": self.error,
+        }
+
+
+class TimedStream:
+    """
+    Iterator wrapper that times a chunk stream as it is consumed.
+
+    Time spent inside the wrapped iterator's ``next`` is network wait; time
+    between chunks being handed out and the next one being requested is time
+    the consumer (the renderer) spent on the previous chunk.
+    """
+
+    def __init__(self, chunks, metrics):
+        self._chunks = iter(chunks)
+        self.metrics = metrics
+        self._returned_at = None
+        self._last_chunk_at = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        m = self.metrics
+        now = time.perf_counter()
+        if m.start is None:
+            m.start = now
+        elif self._returned_at is not None:
+            m.render_time += now - self._returned_at
+
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            end = time.perf_counter()
+            m.network_wait += end - now
+            m.duration = end - m.start
+            self._returned_at = None
+            raise
+        except Exception as e:
+            m.error = str(e)
+            m.duration = time.perf_counter() - m.start
+            raise
+
+        received = time.perf_counter()
+        m.network_wait += received - now
+        if chunk:
+            if m.ttft is None:
+                m.ttft = received - m.start
+            else:
+                histogram_add(m.inter_token, (received - self._last_chunk_at) * 1000)
+            self._last_chunk_at = received
+            m.chunks += 1
+            m.chars += len(chunk)
+        self._returned_at = received
+        return chunk
+
+
+class SessionStats:
+    """Aggregated request metrics for the current session."""
+
+    def __init__(self):
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def add(self, metrics):
+        with self._lock:
+            self.requests.append(metrics)
+
+    def summary(self):
+        """
+        Summarize recorded requests per (provider, model).
+
+        Returns:
+            list: One dict per (provider, model) with averaged timings
+        """
+        groups = {}
+        with self._lock:
+            requests = list(self.requests)
+        for m in requests:
+            groups.setdefault((m.provider, m.model), []).append(m)
+
+        rows = []
+        for (provider, model), items in groups.items():
+            completed = [m for m in items if m.duration is not None and not m.error]
+            ttfts = sorted(m.ttft for m in completed if m.ttft is not None)
+            rates = [m.tokens_per_sec for m in completed if m.tokens_per_sec]
+            histogram = new_histogram()
+            for m in completed:
+                histogram = [a + b for a, b in zip(histogram, m.inter_token)]
+            rows.append(
+                {
+                    "provider": provider,
+                    "model": model,
+                    "requests": len(items),
+                    "errors": sum(1 for m in items if m.error),
+                    "cached": sum(1 for m in items if m.cached),
+                    "ttft_avg": sum(ttfts) / len(ttfts) if ttfts else None,
+                    "ttft_p50": ttfts[len(ttfts) // 2] if ttfts else None,
+                    "tokens_per_sec": sum(rates) / len(rates) if rates else None,
+                    "duration_avg": _mean([m.duration for m in completed]),
+                    "render_avg": _mean([m.render_time for m in completed]),
+                    "inter_token_p50_ms": histogram_percentile(histogram, 0.5),
+                    "inter_token_p95_ms": histogram_percentile(histogram, 0.95),
+                    "input_tokens": sum(m.input_tokens or 0 for m in completed),
+                    "cached_input_tokens": sum(
+                        m.cached_input_tokens or 0 for m in completed
+                    ),
+                    "warm_requests": sum(1 for m in completed if m.warm),
+                    "cold_requests": sum(1 for m in completed if m.warm is False),
+                    "ttft_warm_avg": _mean(
+                        [m.ttft for m in completed if m.warm and m.ttft is not None]
+                    ),
+                    "ttft_cold_avg": _mean(
+                        [
+                            m.ttft
+                            for m in completed
+                            if m.warm is False and m.ttft is not None
+                        ]
+                    ),
+                }
+            )
+        return rows
+
+
+def _mean(values):
+    return sum(values) / len(values) if values else None
+
+
+class TraceWriter:
+    """Append request and tool-call spans to a JSONL trace file."""
+
+    def __init__(self, path, session_id=None):
+        self.path = path
+        self.session_id = session_id or uuid.uuid4().hex[:12]
+        self._lock = threading.Lock()
+
+    def write(self, span):
+        span = dict(span, session=self.session_id)
+        line = json.dumps(span, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Record the wrapped block as a span, e.g. a tool call."""
+        started_at = time.time()
+        start = time.perf_counter()
+        span = {"type": "tool", "name": name, "start": started_at}
+        span.update(attributes)
+        try:
+            yield span
+        except Exception as e:
+            span["error"] = str(e)
+            raise
+        finally:
+            span["duration"] = time.perf_counter() - start
+            self.write(span)
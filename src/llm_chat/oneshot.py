@@ -0,0 +1,253 @@
+"""
+Single-shot mode: one prompt in, the response streamed to stdout
+
+``lmci -p "question"`` or ``git diff | lmci -p "review this"`` sends a single
+message (piped stdin first, then the prompt) and streams the raw response
+text to stdout, or with ``--json`` one NDJSON event per line, then exits with
+a status code. Only the request path is imported: no prompt_toolkit, rich or
+tokenizer, and no SDK but the one provider used.
+"""
+
+import argparse
+import json
+import sys
+import time
+from dataclasses import asdict
+
+from .chat import stream_chunks
+from .clients import create_clients
+from .config import CONFIG_FILE, initialize, load_config
+from .metrics import RequestMetrics
+from .providers import STREAM_RESTART, FinishReason, TextDelta, Usage, provider_names
+from .routing import AUTO_PROVIDER, create_router
+from .transport import configure_transport
+
+EXIT_OK = 0
+EXIT_ERROR = 1  # The request failed
+EXIT_USAGE = 2  # Bad arguments, no prompt, unknown provider or missing API key
+EXIT_INTERRUPTED = 130
+
+
+def parse_args(argv):
+    """Parse single-shot command-line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="lmci",
+        description="Send one prompt and stream the response to stdout. Piped "
+        "input is sent along with the prompt, ahead of it.",
+    )
+    parser.add_argument(
+        "-p", "--prompt", nargs="?", const="", default="", help="The prompt text"
+    )
+    parser.add_argument(
+        "-m",
+        "--model",
+        help="Model to use, as provider/model or a model of the default provider "
+        "(default: the configured default model)",
+    )
+    parser.add_argument("--provider", help="Provider of the model")
+    parser.add_argument("-s", "--system", help="System prompt")
+    parser.add_argument(
+        "--json", action="store_true", help="Write NDJSON events instead of raw text"
+    )
+    return parser.parse_args(argv)
+
+
+def read_prompt(prompt, stdin):
+    """
+    Build the message text from the prompt and piped stdin.
+
+    Args:
+        prompt (str): The -p text (may be empty)
+        stdin: The standard input stream; read only if it isn't a terminal
+
+    Returns:
+        str: The message, empty if there is nothing to send
+    """
+    parts = []
+    if stdin is not None and not stdin.isatty():
+        piped = stdin.read()
+        if piped.strip():
+            parts.append(piped.rstrip("\n"))
+    if prompt.strip():
+        parts.append(prompt.strip())
+    return "\n\n".join(parts)
+
+
+def resolve_model(provider, model, config):
+    """
+    Work out which provider and model a request goes to.
+
+    Args:
+        provider (str): The --provider value, or None
+        model (str): The --model value, or None
+        config (dict): The loaded config, for the defaults
+
+    Returns:
+        tuple: (provider, model); provider is AUTO_PROVIDER for routed models
+
+    Raises:
+        ValueError: If the provider is unknown
+    """
+    if model is None:
+        model = config.get("default_model", "gpt-4o")
+        provider = provider or config.get("default_provider", "openai")
+    elif provider is None:
+        prefix, _, rest = model.partition("/")
+        if prefix == AUTO_PROVIDER:
+            provider = AUTO_PROVIDER  # Routed models keep their auto/ name
+        elif rest and prefix in provider_names():
+            provider, model = prefix, rest
+        else:
+            provider = config.get("default_provider", "openai")
+    if provider != AUTO_PROVIDER and provider not in provider_names():
+        raise ValueError(f"Unknown provider '{provider}'")
+    return provider, model
+
+
+class _Output:
+    """Writes the response as raw text or as NDJSON events."""
+
+    def __init__(self, stdout, stderr, as_json):
+        self.stdout = stdout
+        self.stderr = stderr
+        self.as_json = as_json
+        self.ends_with_newline = True
+
+    def event(self, kind, **fields):
+        if self.as_json:
+            self.stdout.write(json.dumps(dict(type=kind, **fields)) + "\n")
+            self.stdout.flush()
+
+    def text(self, text):
+        if self.as_json:
+            self.event("text", text=text)
+            return
+        self.stdout.write(text)
+        self.stdout.flush()
+        self.ends_with_newline = text.endswith("\n")
+
+    def restart(self):
+        if self.as_json:
+            self.event("restart")
+            return
+        # Raw text can't be taken back; mark where the retried response starts
+        self.stderr.write("\n[connection lost, restarting the response]\n")
+        self.text("\n")
+
+    def error(self, message):
+        if self.as_json:
+            self.event("error", message=message)
+        else:
+            self.stderr.write(f"Error: {message}\n")
+
+    def finish(self):
+        if not self.as_json and not self.ends_with_newline:
+            self.text("\n")
+
+
+def run(argv=None, stdin=None, stdout=None, stderr=None):
+    """
+    Run one single-shot request.
+
+    Args:
+        argv (list): Command-line arguments (default: sys.argv[1:])
+        stdin: Input stream (default: sys.stdin)
+        stdout: Output stream for the response (default: sys.stdout)
+        stderr: Output stream for errors (default: sys.stderr)
+
+    Returns:
+        int: The exit code
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    stdin = sys.stdin if stdin is None else stdin
+    stdout = sys.stdout if stdout is None else stdout
+    stderr = sys.stderr if stderr is None else stderr
+
+    args = parse_args(argv)
+    out = _Output(stdout, stderr, args.json)
+    config = load_config()
+    try:
+        provider, model = resolve_model(args.provider, args.model, config)
+    except ValueError as e:
+        out.error(str(e))
+        return EXIT_USAGE
+    text = read_prompt(args.prompt, stdin)
+    if not text:
+        out.error("No prompt given; pass -p TEXT or pipe input to lmci")
+        return EXIT_USAGE
+    if not CONFIG_FILE.exists():
+        out.error("API keys not found. Please run 'lmci setup' first.")
+        return EXIT_USAGE
+
+    configure_transport(config.get("http"))
+    clients = create_clients(initialize())
+    router = backend = None
+    if provider == AUTO_PROVIDER:
+        router = create_router(config)
+        backend = router.choose(model, clients)
+        if backend is None:
+            out.error(f"No available provider serves {model}")
+            return EXIT_USAGE
+        provider, model = backend.provider, backend.model
+    if provider not in clients:
+        out.error(f"No API key available for {provider}")
+        return EXIT_USAGE
+
+    messages = [{"role": "user", "content": text}]
+    if args.system:
+        messages.insert(0, {"role": "system", "content": args.system})
+    client = clients[provider]  # Imports the SDK; not part of the request time
+    metrics = RequestMetrics(provider, model)
+    usage = finish_reason = None
+    out.event("start", provider=provider, model=model)
+    start = time.perf_counter()
+    try:
+        for chunk in stream_chunks(client, provider, model, messages):
+            if isinstance(chunk, TextDelta):
+                if chunk.text:
+                    if metrics.ttft is None:
+                        metrics.ttft = time.perf_counter() - start
+                    out.text(chunk.text)
+            elif chunk is STREAM_RESTART:
+                out.restart()
+            elif isinstance(chunk, Usage):
+                usage = chunk
+            elif isinstance(chunk, FinishReason):
+                finish_reason = chunk.reason
+    except KeyboardInterrupt:
+        out.finish()
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        metrics.error = str(e)
+        out.finish()
+        out.error(f"{provider}: {e}")
+    metrics.duration = time.perf_counter() - start
+    if usage is not None:
+        metrics.output_tokens = usage.output_tokens
+    if backend is not None:
+        router.record(backend, metrics)
+    if metrics.error:
+        return EXIT_ERROR
+
+    out.finish()
+    out.event(
+        "done",
+        finish_reason=finish_reason,
+        usage=asdict(usage) if usage is not None else None,
+        ttft=metrics.ttft,
+        duration=metrics.duration,
+    )
+    return EXIT_OK
+
+
+def main(argv=None):
+    """Entry point for single-shot mode."""
+    try:
+        return run(argv)
+    except BrokenPipeError:
+        # The reader went away (e.g. `| head`); don't let the interpreter
+        # complain again when it flushes stdout on exit
+        import os
+
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return EXIT_ERROR
@@ -0,0 +1,185 @@
+"""
+Connection pre-warming: keep a live connection to the active provider open
+
+A new connection costs a DNS lookup and TCP and TLS handshakes before the
+first byte of a request goes out. The warmer opens one in the background at
+startup, when the model changes and when a message is submitted, and
+refreshes it while the prompt waits for input, so requests start on an
+already open socket of the shared transport. Refreshing stops once the user
+has been inactive for a while, so an idle session doesn't keep sending
+requests.
+"""
+
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from .providers import get_adapter
+
+DEFAULT_INTERVAL = 20.0  # Seconds a connection may sit idle before a refresh
+DEFAULT_ACTIVE_WINDOW = 600.0  # Refreshing stops this long after the last activity
+WARMUP_TIMEOUT = 5.0
+
+
+class ConnectionWarmer:
+    """
+    Opens and refreshes provider connections on background threads.
+
+    A provider counts as warm if its connection was used (by a request or a
+    warm-up) within twice the refresh interval; idle connections are
+    refreshed once per interval, well inside typical server keep-alive
+    timeouts. Refreshing stops active_window seconds after the user's last
+    activity (a keep_warm call or a request) and resumes with the next one.
+    Use is tracked even when warming is disabled, so warm and cold request
+    latency can be compared either way.
+    """
+
+    def __init__(
+        self,
+        clients,
+        interval=DEFAULT_INTERVAL,
+        enabled=True,
+        active_window=DEFAULT_ACTIVE_WINDOW,
+    ):
+        self.clients = clients
+        self.interval = interval
+        self.enabled = enabled
+        self.active_window = active_window
+        self._last_activity = time.monotonic()
+        self.providers = ()  # Providers kept warm while the prompt waits
+        self.warmups = 0
+        self.failures = 0
+        self._last_used = {}  # Provider -> monotonic time its connection was used
+        self._in_flight = {}  # Provider -> Event set when its warm-up ends
+        self._busy = Counter()  # Provider -> requests in progress
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _idle(self, provider):
+        last = self._last_used.get(provider)
+        return float("inf") if last is None else time.monotonic() - last
+
+    def is_warm(self, provider):
+        """Return True if provider's connection was used recently enough to be open."""
+        return self._idle(provider) < 2 * self.interval
+
+    def warm(self, provider):
+        """
+        Start opening a connection to provider in the background.
+
+        Nothing is done if warming is disabled, the connection was used
+        within the refresh interval, or a request to the provider is in
+        progress.
+
+        Args:
+            provider (str): The provider to connect to
+
+        Returns:
+            threading.Event: Set once the warm-up has finished
+        """
+        with self._lock:
+            done = self._in_flight.get(provider)
+            if done is not None:
+                return done
+            done = threading.Event()
+            if (
+                not self.enabled
+                or provider not in self.clients
+                or not get_adapter(provider).sdk_package  # No network (replay)
+                or self._busy[provider]
+                or self._idle(provider) < self.interval
+            ):
+                done.set()
+                return done
+            self._in_flight[provider] = done
+        threading.Thread(target=self._warm, args=(provider, done), daemon=True).start()
+        return done
+
+    def _warm(self, provider, done):
+        try:
+            adapter = get_adapter(provider)
+            # Building the client also imports the SDK, off the main thread
+            url = adapter.base_url(self.clients[provider])
+            http_client = self.clients.transport.sdk_client(adapter.sdk_package)
+            # Any response will do: the point is the open, pooled connection
+            http_client.head(url, timeout=WARMUP_TIMEOUT)
+            self._last_used[provider] = time.monotonic()
+            self.warmups += 1
+        except Exception:
+            self.failures += 1
+        finally:
+            with self._lock:
+                self._in_flight.pop(provider, None)
+            done.set()
+
+    def keep_warm(self, providers):
+        """
+        Warm providers now and keep refreshing them while the user is active.
+
+        Refreshing continues until active_window seconds pass without a call
+        to keep_warm or a request.
+
+        Args:
+            providers (list): The providers the next request may go to
+        """
+        self.providers = tuple(providers)
+        self._last_activity = time.monotonic()
+        if not self.enabled:
+            return
+        for provider in self.providers:
+            self.warm(provider)
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._refresh, daemon=True)
+                self._thread.start()
+
+    def _refresh(self):
+        while True:
+            time.sleep(self.interval / 4)
+            with self._lock:
+                if time.monotonic() - self._last_activity > self.active_window:
+                    self._thread = None  # The next keep_warm starts a new one
+                    return
+            for provider in self.providers:
+                self.warm(provider)
+
+    @contextmanager
+    def request(self, provider):
+        """
+        Mark a request to provider as in progress.
+
+        Yields:
+            bool: Whether the provider's connection was warm when it started
+        """
+        with self._lock:
+            self._busy[provider] += 1
+        self._last_activity = time.monotonic()
+        try:
+            yield self.is_warm(provider)
+        finally:
+            with self._lock:
+                self._busy[provider] -= 1
+            self._last_used[provider] = time.monotonic()
+
+
+def create_connection_warmer(clients, config):
+    """
+    Create the connection warmer for the configured clients.
+
+    Args:
+        clients (ClientRegistry): The provider clients to warm
+        config (dict): The loaded config; "prewarm" (default true) turns
+            warming on, "prewarm_interval" sets the refresh interval and
+            "prewarm_window" how long after the user's last activity
+            connections are still refreshed
+
+    Returns:
+        ConnectionWarmer: The warmer; nothing is opened until keep_warm or warm
+    """
+    return ConnectionWarmer(
+        clients,
+        interval=config.get("prewarm_interval", DEFAULT_INTERVAL),
+        enabled=config.get("prewarm", True),
+        active_window=config.get("prewarm_window", DEFAULT_ACTIVE_WINDOW),
+    )
@@ -0,0 +1,356 @@
+"""
+Built-in profiling: per-turn cProfile/tracemalloc capture and startup imports
+
+With ``--profile`` (or ``profile on``) each chat turn runs under cProfile and
+tracemalloc. Afterwards the turn's time is broken down into phases (network
+wait, rendering, tokenization, tool execution), its memory growth is
+attributed to the same phases by allocating module, and the raw profile and
+memory snapshot are saved under ~/.llm_cli/profiles for pstats, snakeviz or
+tracemalloc to dig into.
+
+``--profile-startup`` runs ``python -X importtime`` on ``llm_chat.cli`` and the
+lazily imported provider SDKs and reports where import time goes.
+"""
+
+import cProfile
+import os
+import pstats
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+from termcolor import colored
+
+from .config import CONFIG_FOLDER
+
+PROFILE_DIR = CONFIG_FOLDER / "profiles"
+TOP_ENTRIES = 8
+TRACEMALLOC_FRAMES = 1
+
+PHASES = ("network wait", "rendering", "tokenization", "tool execution")
+
+# Functions whose cumulative time counts as tokenization
+TOKENIZATION_FUNCTIONS = (
+    ("tokens.py", "count_tokens"),
+    ("tokens.py", "sync"),
+)
+
+# Path fragments identifying which phase allocated memory, checked in order
+MEMORY_PHASES = (
+    ("tokenization", ("tiktoken", "llm_chat/tokens.py")),
+    ("rendering", ("/rich/", "/pygments/", "llm_chat/utils.py")),
+    (
+        "network wait",
+        (
+            "/httpx",
+            "/httpcore/",
+            "/h11/",
+            "/h2/",
+            "/ssl.py",
+            "/socket.py",
+            "/openai/",
+            "/anthropic/",
+            "/groq/",
+            "/cerebras/",
+            "llm_chat/providers/",
+        ),
+    ),
+    (
+        "tool execution",
+        (
+            "/subprocess.py",
+            "llm_chat/tools.py",
+            "llm_chat/agent.py",
+            "llm_chat/search.py",
+            "llm_chat/grounding.py",
+        ),
+    ),
+)
+
+
+def _memory_phase(filename):
+    filename = filename.replace(os.sep, "/")
+    for phase, fragments in MEMORY_PHASES:
+        if any(fragment in filename for fragment in fragments):
+            return phase
+    return "other"
+
+
+def _format_bytes(size):
+    value, unit = abs(size) / 1024, "KB"
+    if value >= 1024:
+        value, unit = value / 1024, "MB"
+    return f"{'-' if size < 0 else '+'}{value:.1f} {unit}"
+
+
+class TurnProfiler:
+    """
+    Profiles one chat turn at a time.
+
+    Call start() before the turn and stop() after it. Phase time is added by
+    the chat loop (network wait and rendering come from the request metrics)
+    or measured with the phase() context manager; tokenization is read from
+    the profile itself.
+    """
+
+    def __init__(self, output_dir=PROFILE_DIR, top=TOP_ENTRIES):
+        self.output_dir = output_dir
+        self.top = top
+        self.turn = 0
+        self._profile = None
+        self._started_tracing = False
+
+    @property
+    def active(self):
+        """Whether a turn is being profiled."""
+        return self._profile is not None
+
+    def start(self):
+        """Start profiling a turn."""
+        self.turn += 1
+        self.phases = defaultdict(float)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._started_tracing = True
+        if hasattr(tracemalloc, "reset_peak"):  # Python 3.9+
+            tracemalloc.reset_peak()
+        self._baseline = tracemalloc.take_snapshot()
+        self._profile = cProfile.Profile()
+        self._start = time.perf_counter()
+        self._profile.enable()
+
+    def add(self, phase, seconds):
+        """Attribute seconds of the current turn to a phase."""
+        if self.active:
+            self.phases[phase] += seconds
+
+    @contextmanager
+    def phase(self, name):
+        """Attribute the time spent in the block to a phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def stop(self):
+        """
+        Stop profiling the turn, save the raw data and return a report.
+
+        Returns:
+            dict: Wall time, phase times, peak memory, memory growth by phase,
+            top functions and allocation sites, and the saved file paths
+        """
+        self._profile.disable()
+        wall = time.perf_counter() - self._start
+        profile, self._profile = self._profile, None
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            ]
+        )
+        _, peak = tracemalloc.get_traced_memory()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+        stats = pstats.Stats(profile)
+        phases = dict(self.phases)
+        phases["tokenization"] = self._tokenization_time(stats)
+        phases["other"] = max(wall - sum(phases.values()), 0.0)
+
+        memory = defaultdict(int)
+        allocations = snapshot.compare_to(self._baseline, "lineno")
+        for diff in allocations:
+            memory[_memory_phase(diff.traceback[0].filename)] += diff.size_diff
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stem = self.output_dir / f"{datetime.now():%Y%m%d-%H%M%S}-turn{self.turn}"
+        stats.dump_stats(f"{stem}.prof")
+        snapshot.dump(f"{stem}.tracemalloc")
+
+        return {
+            "turn": self.turn,
+            "wall": wall,
+            "phases": phases,
+            "peak_memory": peak,
+            "memory": dict(memory),
+            "functions": self._top_functions(stats),
+            "allocations": [
+                (f"{d.traceback[0].filename}:{d.traceback[0].lineno}", d.size_diff)
+                for d in allocations[: self.top]
+                if d.size_diff > 0
+            ],
+            "profile_file": f"{stem}.prof",
+            "memory_file": f"{stem}.tracemalloc",
+        }
+
+    def _tokenization_time(self, stats):
+        total = 0.0
+        for (filename, _, name), row in stats.stats.items():
+            for suffix, function in TOKENIZATION_FUNCTIONS:
+                if name == function and filename.endswith(suffix):
+                    total += row[3]  # Cumulative time
+        return total
+
+    def _top_functions(self, stats):
+        rows = []
+        for (filename, line, name), row in stats.stats.items():
+            if filename == "~":
+                location = name  # Built-in
+            else:
+                location = f"{os.path.basename(filename)}:{line}({name})"
+            rows.append((row[3], row[2], row[1], location))
+        rows.sort(reverse=True)
+        return [
+            {"cumulative": cum, "own": own, "calls": calls, "function": location}
+            for cum, own, calls, location in rows
+            if "_lsprof.Profiler" not in location  # The profiler's own disable()
+        ][: self.top]
+
+
+def print_turn_report(report):
+    """Print the summary of a profiled turn."""
+    wall = report["wall"] or 1e-9
+    print(
+        colored(
+            f"\nProfile of turn {report['turn']}: {report['wall']:.2f}s, "
+            f"peak traced memory {report['peak_memory'] / 1024 / 1024:.1f} MB",
+            "cyan",
+            attrs=["bold"],
+        )
+    )
+    for phase in PHASES + ("other",):
+        seconds = report["phases"].get(phase, 0.0)
+        memory = report["memory"].get(phase, 0)
+        print(
+            colored(
+                f"  {phase:<15} {seconds:7.3f}s {seconds / wall:5.0%}"
+                f"   memory {_format_bytes(memory)}",
+                "cyan",
+            )
+        )
+    print(colored("  Top functions (cumulative s, own s, calls):", "cyan"))
+    for row in report["functions"]:
+        print(
+            colored(
+                f"    {row['cumulative']:7.3f} {row['own']:7.3f} {row['calls']:7d}  "
+                f"{row['function']}",
+                "cyan",
+            )
+        )
+    if report["allocations"]:
+        print(colored("  Top allocations:", "cyan"))
+        for location, size in report["allocations"]:
+            print(colored(f"    {_format_bytes(size):>10}  {location}", "cyan"))
+    print(
+        colored(f"  Saved {report['profile_file']} and {report['memory_file']}", "cyan")
+    )
+
+
+def parse_importtime(stderr):
+    """
+    Parse ``python -X importtime`` output.
+
+    Returns:
+        tuple: (list of (module, self us, cumulative us, depth) in completion
+        order, dict of top-level import -> list of its modules' rows)
+    """
+    modules = []
+    groups = {}
+    pending = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line.partition(":")[2].split("|", 2)
+        except ValueError:
+            continue
+        # Nesting is shown as two spaces per level after the "| " separator
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        row = (name.strip(), int(self_us), int(cumulative_us), depth)
+        modules.append(row)
+        pending.append(row)
+        if depth <= 0:
+            # Children are reported before their parent, so everything since
+            # the last top-level import belongs to this one
+            groups[row[0]] = pending
+            pending = []
+    return modules, groups
+
+
+def profile_startup(sdk_packages=None, top=20):
+    """
+    Report per-module import time of llm_chat.cli and the provider SDKs.
+
+    Runs a fresh interpreter with ``-X importtime``. SDKs are imported after
+    the CLI, so each is charged only for what it adds on top.
+
+    Args:
+        sdk_packages (list): SDK packages to include (default: every
+            registered provider's SDK that is installed)
+        top (int): Number of slowest modules to list
+    """
+    import importlib.util
+
+    from .providers import get_adapter, provider_names
+
+    if sdk_packages is None:
+        sdk_packages = []
+        for provider in provider_names():
+            package = get_adapter(provider).sdk_package
+            if package and package not in sdk_packages:
+                try:
+                    if importlib.util.find_spec(package) is not None:
+                        sdk_packages.append(package)
+                except ImportError:
+                    continue
+    code = "\n".join(["import llm_chat.cli"] + [f"import {p}" for p in sdk_packages])
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [src_dir, env.get("PYTHONPATH")]))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    modules, groups = parse_importtime(result.stderr)
+    if result.returncode != 0 or not modules:
+        print(colored(f"Error: Import profiling failed: {result.stderr[-500:]}", "red"))
+        return
+
+    print(colored("Startup import time (python -X importtime)", "cyan", attrs=["bold"]))
+    for package in ["llm_chat.cli"] + sdk_packages:
+        # Parents of a dotted package are imported, and reported, first
+        parts = package.split(".")
+        rows = [
+            row
+            for i in range(len(parts))
+            for row in groups.get(".".join(parts[: i + 1]), [])
+        ]
+        total = sum(row[1] for row in rows)
+        label = package if package == "llm_chat.cli" else f"+ {package} (lazy)"
+        print(colored(f"  {label:<32} {total / 1000:8.1f} ms", "cyan"))
+
+    by_package = defaultdict(int)
+    for name, self_us, _, _ in modules:
+        by_package[name.split(".")[0]] += self_us
+    print(colored("\nBy top-level package (self time):", "cyan"))
+    for package, self_us in sorted(by_package.items(), key=lambda i: -i[1])[:top]:
+        print(colored(f"  {package:<32} {self_us / 1000:8.1f} ms", "cyan"))
+
+    print(colored("\nSlowest modules (self time):", "cyan"))
+    for name, self_us, cumulative_us, _ in sorted(modules, key=lambda r: -r[1])[:top]:
+        print(
+            colored(
+                f"  {name:<48} {self_us / 1000:8.1f} ms "
+                f"(cumulative {cumulative_us / 1000:.1f} ms)",
+                "cyan",
+            )
+        )
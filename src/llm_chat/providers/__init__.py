@@ -0,0 +1,71 @@
+"""
+Registry of provider adapters, looked up by provider name.
+
+Adding a provider means writing one module that defines a ProviderAdapter
+subclass decorated with ``@register_provider`` and listing it below.
+"""
+
+from .base import (
+    STREAM_RESTART,
+    Completion,
+    FinishReason,
+    ProviderAdapter,
+    StreamRestart,
+    TextDelta,
+    ToolCall,
+    Usage,
+    collect,
+)
+
+_ADAPTERS = {}
+
+
+def register_provider(adapter_class):
+    """
+    Class decorator that registers an adapter under its ``name``.
+
+    Args:
+        adapter_class (type): A ProviderAdapter subclass
+
+    Returns:
+        type: The same class, so it can be used as a decorator
+    """
+    _ADAPTERS[adapter_class.name] = adapter_class()
+    return adapter_class
+
+
+def get_adapter(provider):
+    """
+    Return the adapter registered for a provider.
+
+    Raises:
+        KeyError: If no adapter is registered under that name
+    """
+    try:
+        return _ADAPTERS[provider]
+    except KeyError:
+        raise KeyError(f"Unknown provider '{provider}'") from None
+
+
+def provider_names():
+    """Return the names of all registered providers."""
+    return list(_ADAPTERS)
+
+
+# Built-in adapters register themselves on import. Keep these imports last.
+from . import groq, openai, anthropic, cerebras, openrouter, replay  # noqa: E402,F401
+
+__all__ = [
+    "STREAM_RESTART",
+    "Completion",
+    "FinishReason",
+    "ProviderAdapter",
+    "StreamRestart",
+    "TextDelta",
+    "ToolCall",
+    "Usage",
+    "collect",
+    "get_adapter",
+    "provider_names",
+    "register_provider",
+]
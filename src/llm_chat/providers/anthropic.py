@@ -0,0 +1,253 @@
+"""
+Anthropic provider adapter
+"""
+
+import json
+
+from . import register_provider
+from .base import Completion, FinishReason, ProviderAdapter, TextDelta, ToolCall, Usage
+
+
+def split_system(messages):
+    """
+    Separate system messages, which Anthropic takes as a top-level parameter.
+
+    Args:
+        messages (list): Conversation messages, possibly including system ones
+
+    Returns:
+        tuple: (system text or None, remaining messages)
+    """
+    system = [m["content"] for m in messages if m.get("role") == "system"]
+    if not system:
+        return None, messages
+    rest = [m for m in messages if m.get("role") != "system"]
+    return "\n\n".join(system), rest
+
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def _with_breakpoint(content):
+    """Return content as blocks with a cache breakpoint on the last one."""
+    if isinstance(content, str):
+        if not content:
+            return content  # Empty text blocks can't carry cache_control
+        return [{"type": "text", "text": content, "cache_control": CACHE_CONTROL}]
+    blocks = [dict(block) for block in content]
+    if blocks:
+        blocks[-1]["cache_control"] = CACHE_CONTROL
+    return blocks
+
+
+def add_cache_breakpoints(system, messages):
+    """
+    Mark the stable prefix of a request for prompt caching.
+
+    Breakpoints go on the system prompt (which also covers the tools, cached
+    ahead of it), on the last message, and on the last user message of the
+    previous request. Each request then reads the prefix the one before it
+    wrote, even though per-turn context is only attached to the newest
+    message. At most 3 of the 4 allowed breakpoints are used, and the
+    caller's messages are not modified.
+
+    Args:
+        system (str): The system prompt, or None
+        messages (list): The conversation messages, without system ones
+
+    Returns:
+        tuple: (system blocks or None, messages with breakpoints)
+    """
+    if system:
+        system = _with_breakpoint(system)
+    marked = set()
+    if messages:
+        marked.add(len(messages) - 1)
+    roles = [m.get("role") for m in messages]
+    if "assistant" in roles:
+        last_reply = len(roles) - 1 - roles[::-1].index("assistant")
+        previous = [i for i in range(last_reply) if roles[i] == "user"]
+        if previous:
+            marked.add(previous[-1])
+    messages = [
+        dict(m, content=_with_breakpoint(m["content"])) if i in marked else m
+        for i, m in enumerate(messages)
+    ]
+    return system, messages
+
+
+@register_provider
+class AnthropicAdapter(ProviderAdapter):
+    name = "anthropic"
+    env_var = "ANTHROPIC_API_KEY"
+    sdk_package = "anthropic"
+    max_tokens = 4096
+    prompt_caching = True  # Send cache_control breakpoints on stable prefixes
+
+    def create_client(self, api_key, http_client=None):
+        from anthropic import Anthropic
+
+        return Anthropic(api_key=api_key, http_client=http_client, max_retries=0)
+
+    def create_async_client(self, api_key, http_client=None):
+        from anthropic import AsyncAnthropic
+
+        return AsyncAnthropic(api_key=api_key, http_client=http_client, max_retries=0)
+
+    def _request(self, model, messages, options):
+        system, messages = split_system(messages)
+        request = dict(options)
+        request.setdefault("max_tokens", self.max_tokens)
+        if self.prompt_caching:
+            system, messages = add_cache_breakpoints(system, messages)
+        if system is not None:
+            request["system"] = system
+        return dict(model=model, messages=messages, **request)
+
+    def tool_options(self, tools):
+        return {
+            "tools": [
+                {
+                    "name": tool["name"],
+                    "description": tool["description"],
+                    "input_schema": tool["parameters"],
+                }
+                for tool in tools
+            ]
+        }
+
+    def tool_messages(self, text, tool_calls, results):
+        content = [{"type": "text", "text": text}] if text else []
+        content += [
+            {
+                "type": "tool_use",
+                "id": call.id,
+                "name": call.name,
+                "input": _parse_arguments(call.arguments),
+            }
+            for call in tool_calls
+        ]
+        # All results go back in a single user turn, one block per call
+        return [
+            {"role": "assistant", "content": content},
+            {
+                "role": "user",
+                "content": [
+                    {"type": "tool_result", "tool_use_id": call.id, "content": result}
+                    for call, result in zip(tool_calls, results)
+                ],
+            },
+        ]
+
+    def stream(self, client, model, messages, **options):
+        events = client.messages.create(
+            stream=True, **self._request(model, messages, options)
+        )
+        state = _StreamState()
+        for event in events:
+            for item in state.feed(event):
+                yield item
+        for item in state.finish():
+            yield item
+
+    def complete(self, client, model, messages, **options):
+        response = client.messages.create(
+            stream=False, **self._request(model, messages, options)
+        )
+        return _completion_from_message(response)
+
+    async def astream(self, client, model, messages, **options):
+        events = await client.messages.create(
+            stream=True, **self._request(model, messages, options)
+        )
+        state = _StreamState()
+        async for event in events:
+            for item in state.feed(event):
+                yield item
+        for item in state.finish():
+            yield item
+
+    async def acomplete(self, client, model, messages, **options):
+        response = await client.messages.create(
+            stream=False, **self._request(model, messages, options)
+        )
+        return _completion_from_message(response)
+
+
+def _parse_arguments(arguments):
+    try:
+        value = json.loads(arguments or "{}")
+    except json.JSONDecodeError:
+        return {}
+    return value if isinstance(value, dict) else {}
+
+
+def _usage(usage):
+    # input_tokens only counts the prompt after the last cache breakpoint;
+    # report the whole prompt, like OpenAI's prompt_tokens
+    read = getattr(usage, "cache_read_input_tokens", None)
+    written = getattr(usage, "cache_creation_input_tokens", None)
+    return Usage(
+        input_tokens=(usage.input_tokens or 0) + (read or 0) + (written or 0),
+        output_tokens=usage.output_tokens,
+        cached_input_tokens=read,
+        cache_write_tokens=written,
+    )
+
+
+class _StreamState:
+    """Turns Anthropic message stream events into typed chunks."""
+
+    def __init__(self):
+        self.usage = Usage()
+        self.stop_reason = None
+        self.tool_calls = {}  # content block index -> [id, name, json parts]
+
+    def feed(self, event):
+        kind = event.type
+        if kind == "message_start":
+            usage = _usage(event.message.usage)
+            self.usage.input_tokens = usage.input_tokens
+            self.usage.cached_input_tokens = usage.cached_input_tokens
+            self.usage.cache_write_tokens = usage.cache_write_tokens
+        elif kind == "content_block_start":
+            block = event.content_block
+            if block.type == "tool_use":
+                self.tool_calls[event.index] = [block.id, block.name, []]
+        elif kind == "content_block_delta":
+            delta = event.delta
+            if delta.type == "text_delta":
+                yield TextDelta(delta.text)
+            elif delta.type == "input_json_delta" and event.index in self.tool_calls:
+                self.tool_calls[event.index][2].append(delta.partial_json)
+        elif kind == "message_delta":
+            self.stop_reason = event.delta.stop_reason
+            if event.usage is not None:
+                self.usage.output_tokens = event.usage.output_tokens
+
+    def finish(self):
+        for index in sorted(self.tool_calls):
+            call_id, name, arguments = self.tool_calls[index]
+            yield ToolCall(id=call_id, name=name, arguments="".join(arguments) or "{}")
+        yield self.usage
+        yield FinishReason(self.stop_reason)
+
+
+def _completion_from_message(message):
+    texts = []
+    tool_calls = []
+    for block in message.content:
+        if block.type == "text":
+            texts.append(block.text)
+        elif block.type == "tool_use":
+            tool_calls.append(
+                ToolCall(
+                    id=block.id, name=block.name, arguments=json.dumps(block.input)
+                )
+            )
+    return Completion(
+        text="".join(texts),
+        usage=_usage(message.usage),
+        finish_reason=message.stop_reason,
+        tool_calls=tool_calls,
+    )
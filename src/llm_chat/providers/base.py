@@ -0,0 +1,191 @@
+"""
+Provider adapter interface and the typed chunks adapters produce
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+
+@dataclass
+class TextDelta:
+    """A piece of response text."""
+
+    text: str
+
+
+@dataclass
+class Usage:
+    """Token usage reported by the provider."""
+
+    input_tokens: Optional[int] = None  # All prompt tokens, cached or not
+    output_tokens: Optional[int] = None
+    cached_input_tokens: Optional[int] = None  # Prompt tokens read from the cache
+    cache_write_tokens: Optional[int] = None  # Prompt tokens written to the cache
+
+
+@dataclass
+class FinishReason:
+    """Why the provider stopped generating ('stop', 'length', 'tool_calls'...)."""
+
+    reason: Optional[str]
+
+
+@dataclass
+class ToolCall:
+    """A complete tool call requested by the model."""
+
+    id: str
+    name: str
+    arguments: str  # JSON-encoded arguments, as sent by the provider
+
+
+class StreamRestart:
+    """
+    Marker that a broken stream is being retried from the beginning.
+
+    Consumers should discard any text received so far. It is falsy so code
+    that skips empty chunks ignores it.
+    """
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return "STREAM_RESTART"
+
+
+STREAM_RESTART = StreamRestart()
+
+
+@dataclass
+class Completion:
+    """The result of a non-streaming request."""
+
+    text: str = ""
+    usage: Optional[Usage] = None
+    finish_reason: Optional[str] = None
+    tool_calls: List[ToolCall] = field(default_factory=list)
+
+
+def collect(chunks):
+    """
+    Fold a chunk stream into a Completion.
+
+    Args:
+        chunks (iterable): Typed chunks from an adapter's stream
+
+    Returns:
+        Completion: The combined result
+    """
+    completion = Completion()
+    parts = []
+    for chunk in chunks:
+        if chunk is STREAM_RESTART:
+            completion = Completion()
+            parts = []
+        elif isinstance(chunk, TextDelta):
+            parts.append(chunk.text)
+        elif isinstance(chunk, Usage):
+            completion.usage = chunk
+        elif isinstance(chunk, FinishReason):
+            completion.finish_reason = chunk.reason
+        elif isinstance(chunk, ToolCall):
+            completion.tool_calls.append(chunk)
+    completion.text = "".join(parts)
+    return completion
+
+
+class ProviderAdapter:
+    """
+    Base class for provider adapters.
+
+    An adapter knows how to build a provider's sync and async clients and how
+    to turn its responses into typed chunks. SDKs must only be imported inside
+    methods, so registering an adapter costs nothing until it is used.
+    """
+
+    name: str = ""
+    env_var: str = ""
+    sdk_package: str = ""  # Package the SDK's HTTP library is detected from
+    max_tokens: Optional[int] = None  # Sent only by providers that require it
+    # SDK clients are built with max_retries=0: retries and backoff are handled
+    # once, by llm_chat.resilience, rather than stacked on top of the SDK's own
+
+    def create_client(self, api_key: str, http_client: Any = None) -> Any:
+        """Build the SDK client, using http_client for connections if given."""
+        raise NotImplementedError
+
+    def create_async_client(self, api_key: str, http_client: Any = None) -> Any:
+        """Build the async SDK client, using http_client for connections if given."""
+        raise NotImplementedError
+
+    def probe(self, client: Any) -> None:
+        """Make a cheap request that raises if the provider is unavailable."""
+        models = getattr(client, "models", None)
+        if models is None:
+            raise NotImplementedError(f"{self.name} has no health check")
+        models.list()
+
+    def base_url(self, client: Any) -> str:
+        """Return the URL of the provider's API, used to open connections early."""
+        return str(client.base_url)
+
+    def list_models(self, client: Any) -> List[str]:
+        """Return the ids of the models the provider serves."""
+        models = getattr(client, "models", None)
+        if models is None:
+            raise NotImplementedError(f"{self.name} has no models endpoint")
+        return [model.id for model in models.list()]
+
+    def tool_options(self, tools: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Build the request options that offer tools to the model.
+
+        Args:
+            tools (list): Provider-neutral tool specs with "name",
+                "description" and a JSON schema under "parameters"
+
+        Returns:
+            dict: Options to pass to stream or complete
+        """
+        raise NotImplementedError(f"{self.name} does not support tool calling")
+
+    def tool_messages(
+        self, text: str, tool_calls: List[ToolCall], results: List[str]
+    ) -> List[Dict[str, Any]]:
+        """
+        Build the messages that record a tool-calling turn.
+
+        Args:
+            text (str): Text the model sent along with the tool calls
+            tool_calls (list): The ToolCalls the model requested
+            results (list): The result text for each call, in the same order
+
+        Returns:
+            list: The assistant message and tool result message(s) to append
+        """
+        raise NotImplementedError(f"{self.name} does not support tool calling")
+
+    def stream(
+        self, client: Any, model: str, messages: List[Dict[str, Any]], **options: Any
+    ) -> Iterator[Any]:
+        """Stream a response as TextDelta, ToolCall, Usage and FinishReason chunks."""
+        raise NotImplementedError
+
+    def complete(
+        self, client: Any, model: str, messages: List[Dict[str, Any]], **options: Any
+    ) -> Completion:
+        """Get a full response in a single non-streaming request."""
+        raise NotImplementedError
+
+    def astream(
+        self, client: Any, model: str, messages: List[Dict[str, Any]], **options: Any
+    ) -> AsyncIterator[Any]:
+        """Async counterpart of stream, for async clients."""
+        raise NotImplementedError
+
+    async def acomplete(
+        self, client: Any, model: str, messages: List[Dict[str, Any]], **options: Any
+    ) -> Completion:
+        """Async counterpart of complete, for async clients."""
+        raise NotImplementedError
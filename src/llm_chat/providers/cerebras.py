@@ -0,0 +1,23 @@
+"""
+Cerebras provider adapter (OpenAI-compatible API)
+"""
+
+from . import register_provider
+from .openai_compat import OpenAICompatibleAdapter
+
+
+@register_provider
+class CerebrasAdapter(OpenAICompatibleAdapter):
+    name = "cerebras"
+    env_var = "CEREBRAS_API_KEY"
+    sdk_package = "cerebras.cloud.sdk"
+
+    def create_client(self, api_key, http_client=None):
+        from cerebras.cloud.sdk import Cerebras
+
+        return Cerebras(api_key=api_key, http_client=http_client, max_retries=0)
+
+    def create_async_client(self, api_key, http_client=None):
+        from cerebras.cloud.sdk import AsyncCerebras
+
+        return AsyncCerebras(api_key=api_key, http_client=http_client, max_retries=0)
@@ -0,0 +1,23 @@
+"""
+Groq provider adapter (OpenAI-compatible API)
+"""
+
+from . import register_provider
+from .openai_compat import OpenAICompatibleAdapter
+
+
+@register_provider
+class GroqAdapter(OpenAICompatibleAdapter):
+    name = "groq"
+    env_var = "GROQ_API_KEY"
+    sdk_package = "groq"
+
+    def create_client(self, api_key, http_client=None):
+        from groq import Groq
+
+        return Groq(api_key=api_key, http_client=http_client, max_retries=0)
+
+    def create_async_client(self, api_key, http_client=None):
+        from groq import AsyncGroq
+
+        return AsyncGroq(api_key=api_key, http_client=http_client, max_retries=0)
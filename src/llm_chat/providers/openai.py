@@ -0,0 +1,24 @@
+"""
+OpenAI provider adapter
+"""
+
+from . import register_provider
+from .openai_compat import OpenAICompatibleAdapter
+
+
+@register_provider
+class OpenAIAdapter(OpenAICompatibleAdapter):
+    name = "openai"
+    env_var = "OPENAI_API_KEY"
+    sdk_package = "openai"
+    stream_usage = True
+
+    def create_client(self, api_key, http_client=None):
+        from openai import OpenAI
+
+        return OpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+
+    def create_async_client(self, api_key, http_client=None):
+        from openai import AsyncOpenAI
+
+        return AsyncOpenAI(api_key=api_key, http_client=http_client, max_retries=0)
@@ -0,0 +1,176 @@
+"""
+Shared adapter for providers that speak the OpenAI chat completions API
+"""
+
+from .base import Completion, FinishReason, ProviderAdapter, TextDelta, ToolCall, Usage
+
+
+class OpenAICompatibleAdapter(ProviderAdapter):
+    """
+    Adapter for OpenAI-style ``chat.completions`` clients.
+
+    Subclasses only need to build their clients; streaming, tool-call
+    reassembly and usage parsing are shared.
+    """
+
+    # Whether the provider accepts stream_options={"include_usage": True}
+    stream_usage = False
+
+    def _request_options(self, options):
+        request = dict(options)
+        if self.max_tokens and "max_tokens" not in request:
+            request["max_tokens"] = self.max_tokens
+        return request
+
+    def _stream_request(self, options):
+        request = self._request_options(options)
+        if self.stream_usage:
+            request.setdefault("stream_options", {"include_usage": True})
+        return request
+
+    def tool_options(self, tools):
+        return {
+            "tools": [
+                {
+                    "type": "function",
+                    "function": {
+                        "name": tool["name"],
+                        "description": tool["description"],
+                        "parameters": tool["parameters"],
+                    },
+                }
+                for tool in tools
+            ]
+        }
+
+    def tool_messages(self, text, tool_calls, results):
+        messages = [
+            {
+                "role": "assistant",
+                "content": text or None,
+                "tool_calls": [
+                    {
+                        "id": call.id,
+                        "type": "function",
+                        "function": {"name": call.name, "arguments": call.arguments},
+                    }
+                    for call in tool_calls
+                ],
+            }
+        ]
+        for call, result in zip(tool_calls, results):
+            messages.append(
+                {"role": "tool", "tool_call_id": call.id, "content": result}
+            )
+        return messages
+
+    def stream(self, client, model, messages, **options):
+        response = client.chat.completions.create(
+            model=model, messages=messages, stream=True, **self._stream_request(options)
+        )
+        state = _StreamState()
+        for chunk in response:
+            for item in state.feed(chunk):
+                yield item
+        for item in state.finish():
+            yield item
+
+    def complete(self, client, model, messages, **options):
+        response = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=False,
+            **self._request_options(options),
+        )
+        return _completion_from_response(response)
+
+    async def astream(self, client, model, messages, **options):
+        response = await client.chat.completions.create(
+            model=model, messages=messages, stream=True, **self._stream_request(options)
+        )
+        state = _StreamState()
+        async for chunk in response:
+            for item in state.feed(chunk):
+                yield item
+        for item in state.finish():
+            yield item
+
+    async def acomplete(self, client, model, messages, **options):
+        response = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=False,
+            **self._request_options(options),
+        )
+        return _completion_from_response(response)
+
+
+def _usage(usage):
+    if usage is None:
+        return None
+    # Prefix caching is automatic; hits are reported as part of prompt_tokens
+    details = getattr(usage, "prompt_tokens_details", None)
+    return Usage(
+        input_tokens=getattr(usage, "prompt_tokens", None),
+        output_tokens=getattr(usage, "completion_tokens", None),
+        cached_input_tokens=getattr(details, "cached_tokens", None),
+    )
+
+
+class _StreamState:
+    """Turns OpenAI-style stream chunks into typed chunks."""
+
+    def __init__(self):
+        self.tool_calls = {}  # index -> [id, name, argument parts]
+        self.finish_reason = None
+        self.usage = None
+
+    def feed(self, chunk):
+        usage = getattr(chunk, "usage", None)
+        if usage is None:
+            # Groq reports usage in an extension field on the last chunk
+            usage = getattr(getattr(chunk, "x_groq", None), "usage", None)
+        if usage is not None:
+            self.usage = _usage(usage)
+
+        if not chunk.choices:
+            return
+        choice = chunk.choices[0]
+        delta = choice.delta
+        if delta is not None:
+            if delta.content:
+                yield TextDelta(delta.content)
+            for call in getattr(delta, "tool_calls", None) or []:
+                entry = self.tool_calls.setdefault(call.index, ["", "", []])
+                if call.id:
+                    entry[0] = call.id
+                if call.function is not None:
+                    if call.function.name:
+                        entry[1] = call.function.name
+                    if call.function.arguments:
+                        entry[2].append(call.function.arguments)
+        if choice.finish_reason:
+            self.finish_reason = choice.finish_reason
+
+    def finish(self):
+        for index in sorted(self.tool_calls):
+            call_id, name, arguments = self.tool_calls[index]
+            yield ToolCall(id=call_id, name=name, arguments="".join(arguments))
+        if self.usage is not None:
+            yield self.usage
+        yield FinishReason(self.finish_reason)
+
+
+def _completion_from_response(response):
+    choice = response.choices[0]
+    message = choice.message
+    tool_calls = [
+        ToolCall(id=call.id, name=call.function.name, arguments=call.function.arguments)
+        for call in getattr(message, "tool_calls", None) or []
+    ]
+    return Completion(
+        text=message.content or "",
+        usage=_usage(getattr(response, "usage", None)),
+        finish_reason=choice.finish_reason,
+        tool_calls=tool_calls,
+    )
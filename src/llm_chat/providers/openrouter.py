@@ -0,0 +1,36 @@
+"""
+OpenRouter provider adapter (OpenAI-compatible API)
+"""
+
+from . import register_provider
+from .openai_compat import OpenAICompatibleAdapter
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+
+
+@register_provider
+class OpenRouterAdapter(OpenAICompatibleAdapter):
+    name = "openrouter"
+    env_var = "OPENROUTER_API_KEY"
+    sdk_package = "openai"
+    stream_usage = True
+
+    def create_client(self, api_key, http_client=None):
+        from openai import OpenAI
+
+        return OpenAI(
+            api_key=api_key,
+            base_url=OPENROUTER_BASE_URL,
+            http_client=http_client,
+            max_retries=0,
+        )
+
+    def create_async_client(self, api_key, http_client=None):
+        from openai import AsyncOpenAI
+
+        return AsyncOpenAI(
+            api_key=api_key,
+            base_url=OPENROUTER_BASE_URL,
+            http_client=http_client,
+            max_retries=0,
+        )
@@ -0,0 +1,250 @@
+"""
+Record/replay pseudo-provider for deterministic offline sessions
+
+While recording (``lmci --record FILE``), every response from a real provider
+is appended to a cassette: one JSON line per response holding each chunk and
+the time the provider took to produce it. The ``replay`` provider serves a
+cassette back (``lmci --replay FILE``), with the original chunk boundaries,
+either at the recorded cadence or as fast as possible, so rendering and the
+chat loop can be reproduced and profiled without a network or API spend.
+
+A cassette line looks like::
+
+    {"provider": "openai", "model": "gpt-4o", "key": "9f2c...",
+     "chunks": [[0.41, "t", "Hello"], [0.012, "t", " world"],
+                [0.0, "u", 12, 2], [0.0, "f", "stop"]]}
+
+where each chunk is [seconds since the previous chunk, kind, *fields] and the
+kinds are t (text), c (tool call: id, name, arguments), u (usage: input and
+output tokens) and f (finish reason).
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+import time
+
+from . import register_provider
+from .base import (
+    FinishReason,
+    ProviderAdapter,
+    TextDelta,
+    ToolCall,
+    Usage,
+    collect,
+)
+
+# Replay models: the recorded cadence, as fast as possible, or "<n>x" speed
+REPLAY_MODELS = ["realtime", "fast", "2x", "10x"]
+
+_recorder = None
+
+
+def request_key(messages):
+    """Return the digest that identifies a request by its messages."""
+    data = json.dumps(messages, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()[:16]
+
+
+def _open(path, mode):
+    path = str(path)
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def encode_chunk(delay, chunk):
+    """Return the cassette form of a chunk, or None for chunks not recorded."""
+    delay = round(delay, 4)
+    if isinstance(chunk, TextDelta):
+        return [delay, "t", chunk.text]
+    if isinstance(chunk, ToolCall):
+        return [delay, "c", chunk.id, chunk.name, chunk.arguments]
+    if isinstance(chunk, Usage):
+        fields = [chunk.input_tokens, chunk.output_tokens]
+        if (
+            chunk.cached_input_tokens is not None
+            or chunk.cache_write_tokens is not None
+        ):
+            fields += [chunk.cached_input_tokens, chunk.cache_write_tokens]
+        return [delay, "u"] + fields
+    if isinstance(chunk, FinishReason):
+        return [delay, "f", chunk.reason]
+    return None
+
+
+def decode_chunk(entry):
+    """Return (delay, chunk) from the cassette form of a chunk."""
+    delay, kind, *fields = entry
+    if kind == "t":
+        return delay, TextDelta(fields[0])
+    if kind == "c":
+        return delay, ToolCall(id=fields[0], name=fields[1], arguments=fields[2])
+    if kind == "u":
+        return delay, Usage(*fields[:4])
+    return delay, FinishReason(fields[0])
+
+
+class Recorder:
+    """Appends the responses of real providers to a cassette file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _write(self, provider, model, messages, chunks):
+        line = json.dumps(
+            {
+                "provider": provider,
+                "model": model,
+                "key": request_key(messages),
+                "chunks": chunks,
+            },
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        with self._lock, _open(self.path, "a") as f:
+            f.write(line + "\n")
+
+    def record(self, chunks, provider, model, messages):
+        """
+        Pass a chunk stream through, saving it once it completes.
+
+        Delays exclude time the consumer spends between chunks (rendering),
+        so they reflect how fast the provider produced them. A stream that
+        fails part way is not saved.
+
+        Yields:
+            The chunks of the stream, unchanged
+        """
+        entries = []
+        last = time.perf_counter()
+        for chunk in chunks:
+            entry = encode_chunk(time.perf_counter() - last, chunk)
+            if entry is not None:
+                entries.append(entry)
+            yield chunk
+            last = time.perf_counter()
+        self._write(provider, model, messages, entries)
+
+    def record_completion(self, completion, provider, model, messages, elapsed):
+        """Save a non-streamed Completion as a one-chunk response."""
+        entries = [[round(elapsed, 4), "t", completion.text]]
+        entries += [encode_chunk(0.0, call) for call in completion.tool_calls]
+        if completion.usage is not None:
+            entries.append(encode_chunk(0.0, completion.usage))
+        entries.append(encode_chunk(0.0, FinishReason(completion.finish_reason)))
+        self._write(provider, model, messages, entries)
+
+
+def start_recording(path):
+    """Record every provider response from now on to the cassette at path."""
+    global _recorder
+    _recorder = Recorder(path)
+    return _recorder
+
+
+def get_recorder():
+    """Return the active Recorder, or None when not recording."""
+    return _recorder
+
+
+class Cassette:
+    """
+    Recorded responses, served in the order they were recorded.
+
+    A request is answered with the first unused response recorded for the
+    same messages, or else the next unused response, so a session can be
+    replayed by typing anything at each prompt.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with _open(path, "r") as f:
+            self.responses = [json.loads(line) for line in f if line.strip()]
+        self._used = [False] * len(self.responses)
+        self._lock = threading.Lock()
+
+    def take(self, messages, exact=False):
+        """
+        Return the chunks of the response for messages, marking it used.
+
+        Args:
+            messages (list): The request's messages
+            exact (bool): Only accept a response recorded for these messages
+
+        Raises:
+            LookupError: If no response is left to serve
+        """
+        key = request_key(messages)
+        with self._lock:
+            unused = [i for i, used in enumerate(self._used) if not used]
+            match = next((i for i in unused if self.responses[i]["key"] == key), None)
+            if match is None and not exact and unused:
+                match = unused[0]
+            if match is None:
+                raise LookupError(f"No recorded response left in {self.path}")
+            self._used[match] = True
+            return [decode_chunk(entry) for entry in self.responses[match]["chunks"]]
+
+
+def replay_speed(model):
+    """Return the playback speed for a replay model (0 means no delays)."""
+    if model == "fast":
+        return 0
+    if model.endswith("x"):
+        try:
+            return float(model[:-1])
+        except ValueError:
+            pass
+    return 1.0
+
+
+@register_provider
+class ReplayAdapter(ProviderAdapter):
+    """Serves responses from a cassette; the "API key" is the cassette path."""
+
+    name = "replay"
+    env_var = "LLM_REPLAY_CASSETTE"
+
+    def create_client(self, api_key, http_client=None):
+        return Cassette(api_key)
+
+    def create_async_client(self, api_key, http_client=None):
+        return Cassette(api_key)
+
+    def probe(self, client):
+        pass
+
+    def tool_options(self, tools):
+        return {}  # Recorded tool calls are replayed whatever is offered
+
+    def tool_messages(self, text, tool_calls, results):
+        from . import get_adapter
+
+        return get_adapter("openai").tool_messages(text, tool_calls, results)
+
+    def stream(self, client, model, messages, **options):
+        speed = replay_speed(model)
+        for delay, chunk in client.take(messages):
+            if speed and delay:
+                time.sleep(delay / speed)
+            yield chunk
+
+    def complete(self, client, model, messages, **options):
+        # Only an exact match, so background requests (e.g. summaries) that
+        # weren't recorded don't consume the responses meant for the chat
+        return collect(chunk for _, chunk in client.take(messages, exact=True))
+
+    async def astream(self, client, model, messages, **options):
+        import asyncio  # Only async callers pay for importing it
+
+        speed = replay_speed(model)
+        for delay, chunk in client.take(messages):
+            if speed and delay:
+                await asyncio.sleep(delay / speed)
+            yield chunk
+
+    async def acomplete(self, client, model, messages, **options):
+        return self.complete(client, model, messages)
@@ -0,0 +1,411 @@
+"""
+Retries with jittered exponential backoff and per-provider circuit breakers
+"""
+
+import random
+import threading
+import time
+
+from .providers import STREAM_RESTART, TextDelta
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 520, 522, 524, 529}
+# Exception class names (SDK and httpx) that mean the connection failed
+RETRYABLE_ERROR_NAMES = (
+    "APIConnectionError",
+    "APITimeoutError",
+    "ConnectError",
+    "ConnectTimeout",
+    "ReadError",
+    "ReadTimeout",
+    "RemoteProtocolError",
+    "PoolTimeout",
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+    def __init__(self, provider, retry_in):
+        super().__init__(
+            f"{provider} is failing; skipping requests for another {retry_in:.0f}s"
+        )
+        self.provider = provider
+        self.retry_in = retry_in
+
+
+def status_code(error):
+    """Return the HTTP status code carried by an SDK error, if any."""
+    code = getattr(error, "status_code", None)
+    if code is None:
+        code = getattr(getattr(error, "response", None), "status_code", None)
+    return code
+
+
+def is_retryable(error):
+    """
+    Decide whether a failed request is worth retrying.
+
+    Rate limits, server errors, timeouts and dropped connections are
+    retryable; bad requests, auth errors and the like are not.
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+    code = status_code(error)
+    if code is not None:
+        return code in RETRYABLE_STATUS_CODES
+    return any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(error).__mro__)
+
+
+def retry_after(error):
+    """
+    Return the delay the provider asked for via Retry-After, in seconds.
+
+    Args:
+        error (Exception): The failed request's exception
+
+    Returns:
+        float or None: Seconds to wait, or None if no usable header was sent
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        import email.utils  # Rare: most providers send seconds
+
+        try:
+            # Returns None for bad dates before Python 3.10, raises after
+            parsed = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if parsed is None:
+            return None
+        return max(parsed.timestamp() - time.time(), 0.0)
+
+
+class RetryPolicy:
+    """How many times to try a request and how long to wait in between."""
+
+    def __init__(
+        self, max_attempts=4, base_delay=0.5, max_delay=20.0, max_retry_after=60.0
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def delay(self, attempt, error):
+        """
+        Return seconds to wait before the next attempt, or None to give up.
+
+        Uses full-jitter exponential backoff, but never waits less than the
+        provider's Retry-After.
+
+        Args:
+            attempt (int): Number of attempts made so far (1 after the first)
+            error (Exception): The error from the last attempt
+        """
+        if attempt >= self.max_attempts or not is_retryable(error):
+            return None
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        requested = retry_after(error)
+        if requested is not None:
+            if requested > self.max_retry_after:
+                return None
+            delay = max(delay, requested)
+        return delay
+
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker.
+
+    After ``failure_threshold`` consecutive retryable failures the circuit
+    opens and requests fail fast with CircuitOpenError. If a probe function is
+    available it is run on a background thread after ``reset_timeout`` (with
+    the timeout doubling after each failed probe) and closes the circuit on
+    success; otherwise the next request after the timeout is let through as a
+    trial. A trial that ends without a recorded result (a non-retryable error,
+    an interrupt, an abandoned stream) reopens the circuit, and a trial with
+    no outcome after ``reset_timeout`` is given up on so another can start.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(
+        self, provider, failure_threshold=5, reset_timeout=30.0, max_reset_timeout=300.0
+    ):
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Raise CircuitOpenError if requests to this provider should fail fast.
+
+        Returns:
+            bool: True if the request is the half-open trial; the caller must
+            then call end_trial() once it is over
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return False
+            if self._trial_allowed():
+                self.state = self.HALF_OPEN  # Let one trial request through
+                self.trial_started_at = time.monotonic()
+                return True
+            waited = time.monotonic() - self.opened_at
+            raise CircuitOpenError(self.provider, max(self.reset_timeout - waited, 0))
+
+    def _trial_allowed(self):
+        now = time.monotonic()
+        if self.state == self.HALF_OPEN:
+            # The previous trial never reported back
+            return now - self.trial_started_at >= self.reset_timeout
+        return now - self.opened_at >= self.reset_timeout and not self._probing
+
+    def available(self):
+        """Return whether allow() would currently let a request through."""
+        with self._lock:
+            return self.state == self.CLOSED or self._trial_allowed()
+
+    def end_trial(self):
+        """Reopen the circuit if the trial request ended without a recorded result."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.reset_timeout = self.base_reset_timeout
+
+    def record_failure(self, probe=None):
+        """
+        Count a retryable failure, opening the circuit at the threshold.
+
+        Args:
+            probe (callable): Optional cheap health check for this provider,
+                run in the background to decide when to close the circuit
+        """
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN:
+                self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+            elif self.failures < self.failure_threshold or self.state == self.OPEN:
+                return
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            if probe is None or self._probing:
+                return
+            self._probing = True
+        threading.Thread(target=self._probe_loop, args=(probe,), daemon=True).start()
+
+    def _probe_loop(self, probe):
+        while True:
+            time.sleep(self.reset_timeout)
+            try:
+                probe()
+            except NotImplementedError:
+                # No cheap health check; fall back to a half-open trial request
+                with self._lock:
+                    self._probing = False
+                return
+            except Exception:
+                with self._lock:
+                    self.opened_at = time.monotonic()
+                    self.reset_timeout = min(
+                        self.reset_timeout * 2, self.max_reset_timeout
+                    )
+                continue
+            with self._lock:
+                self._probing = False
+            self.record_success()
+            return
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(provider):
+    """Return the process-wide circuit breaker for a provider."""
+    with _breakers_lock:
+        breaker = _breakers.get(provider)
+        if breaker is None:
+            breaker = _breakers[provider] = CircuitBreaker(provider)
+        return breaker
+
+
+DEFAULT_POLICY = RetryPolicy()
+
+
+def call_with_retries(call, provider, policy=DEFAULT_POLICY, probe=None):
+    """
+    Run a non-streaming provider call with retries and the circuit breaker.
+
+    Args:
+        call (callable): Makes the request and returns its result
+        provider (str): The provider name, selecting the circuit breaker
+        policy (RetryPolicy): Retry limits and backoff
+        probe (callable): Optional health check used while the circuit is open
+
+    Returns:
+        The result of call
+    """
+    breaker = get_breaker(provider)
+    attempt = 0
+    while True:
+        trial = breaker.allow()
+        attempt += 1
+        try:
+            result = call()
+        except Exception as e:
+            if is_retryable(e):
+                breaker.record_failure(probe)
+            elif status_code(e) is not None:
+                breaker.record_success()  # The provider answered; it's healthy
+            delay = policy.delay(attempt, e)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            continue
+        else:
+            breaker.record_success()
+            return result
+        finally:
+            if trial:
+                breaker.end_trial()
+
+
+def resilient_stream(open_stream, provider, policy=DEFAULT_POLICY, probe=None):
+    """
+    Stream typed chunks with retries and the circuit breaker.
+
+    Failures before any text arrives are retried transparently. If the
+    stream breaks after text was emitted, the request is restarted from the
+    beginning and STREAM_RESTART is yielded first, so consumers can discard
+    the partial response instead of keeping a truncated message.
+
+    Args:
+        open_stream (callable): Starts the request and returns its chunk iterator
+        provider (str): The provider name, selecting the circuit breaker
+        policy (RetryPolicy): Retry limits and backoff
+        probe (callable): Optional health check used while the circuit is open
+
+    Yields:
+        Typed chunks from the provider adapter, plus STREAM_RESTART markers
+    """
+    breaker = get_breaker(provider)
+    attempt = 0
+    while True:
+        trial = breaker.allow()
+        attempt += 1
+        emitted = False
+        try:
+            for chunk in open_stream():
+                if isinstance(chunk, TextDelta):
+                    emitted = True
+                yield chunk
+        except Exception as e:
+            if is_retryable(e):
+                breaker.record_failure(probe)
+            elif status_code(e) is not None:
+                breaker.record_success()  # The provider answered; it's healthy
+            delay = policy.delay(attempt, e)
+            if delay is None:
+                raise
+            if emitted:
+                yield STREAM_RESTART
+            time.sleep(delay)
+            continue
+        else:
+            breaker.record_success()
+            return
+        finally:
+            if trial:
+                breaker.end_trial()
+
+
+async def acall_with_retries(call, provider, policy=DEFAULT_POLICY):
+    """Async counterpart of call_with_retries; call returns an awaitable."""
+    import asyncio  # Only async callers pay for importing it
+
+    breaker = get_breaker(provider)
+    attempt = 0
+    while True:
+        trial = breaker.allow()
+        attempt += 1
+        try:
+            result = await call()
+        except Exception as e:
+            if is_retryable(e):
+                breaker.record_failure()
+            elif status_code(e) is not None:
+                breaker.record_success()  # The provider answered; it's healthy
+            delay = policy.delay(attempt, e)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            continue
+        else:
+            breaker.record_success()
+            return result
+        finally:
+            if trial:
+                breaker.end_trial()
+
+
+async def aresilient_stream(open_stream, provider, policy=DEFAULT_POLICY):
+    """Async counterpart of resilient_stream; open_stream returns an async iterator."""
+    import asyncio
+
+    breaker = get_breaker(provider)
+    attempt = 0
+    while True:
+        trial = breaker.allow()
+        attempt += 1
+        emitted = False
+        try:
+            async for chunk in open_stream():
+                if isinstance(chunk, TextDelta):
+                    emitted = True
+                yield chunk
+        except Exception as e:
+            if is_retryable(e):
+                breaker.record_failure()
+            elif status_code(e) is not None:
+                breaker.record_success()  # The provider answered; it's healthy
+            delay = policy.delay(attempt, e)
+            if delay is None:
+                raise
+            if emitted:
+                yield STREAM_RESTART
+            await asyncio.sleep(delay)
+            continue
+        else:
+            breaker.record_success()
+            return
+        finally:
+            if trial:
+                breaker.end_trial()
@@ -0,0 +1,262 @@
+"""
+Latency-aware routing of logical models across providers
+
+The same open-weight models are served by several providers. A logical model
+(e.g. "auto/llama-3.3-70b") maps to a list of (provider, model id) backends,
+and each request is sent to the best healthy backend under the current
+policy, using rolling TTFT, throughput and error-rate statistics.
+"""
+
+import json
+import threading
+import time
+
+from .config import CONFIG_FOLDER
+from .resilience import get_breaker
+
+ROUTING_STATS_FILE = CONFIG_FOLDER / "routing_stats.json"
+AUTO_PROVIDER = "auto"
+POLICIES = ("fastest", "cheapest")
+
+# Approximate list prices in USD per million (input, output) tokens; override
+# them with the "routes" section of config.json when they change.
+DEFAULT_ROUTES = {
+    "auto/llama-3.3-70b": [
+        {"provider": "cerebras", "model": "llama-3.3-70b", "price": [0.85, 1.20]},
+        {"provider": "groq", "model": "llama-3.3-70b-versatile", "price": [0.59, 0.79]},
+        {
+            "provider": "openrouter",
+            "model": "meta-llama/llama-3.3-70b-instruct",
+            "price": [0.13, 0.40],
+        },
+    ],
+    "auto/llama-3.1-8b": [
+        {"provider": "cerebras", "model": "llama3.1-8b", "price": [0.10, 0.10]},
+        {"provider": "groq", "model": "llama-3.1-8b-instant", "price": [0.05, 0.08]},
+        {
+            "provider": "openrouter",
+            "model": "meta-llama/llama-3.1-8b-instruct",
+            "price": [0.02, 0.05],
+        },
+    ],
+}
+
+# Output length used to weigh TTFT against throughput when ranking backends
+TYPICAL_OUTPUT_TOKENS = 400
+# Backends failing more often than this are skipped while others are healthy
+MAX_ERROR_RATE = 0.5
+# Seconds for an unrefreshed error rate to halve, so a backend excluded for
+# failing (and therefore getting no requests) is tried again after a while
+ERROR_RATE_HALF_LIFE = 600.0
+
+
+class Backend:
+    """One (provider, model id) serving a logical model."""
+
+    def __init__(self, provider, model, price=None):
+        self.provider = provider
+        self.model = model
+        self.price = tuple(price) if price else None
+
+    @property
+    def key(self):
+        return f"{self.provider}:{self.model}"
+
+    @property
+    def blended_price(self):
+        """Price per million tokens, weighting output 3:1 over input."""
+        if self.price is None:
+            return float("inf")
+        return (self.price[0] + 3 * self.price[1]) / 4
+
+
+class BackendStats:
+    """
+    Exponentially weighted moving averages of a backend's performance.
+
+    The error rate also decays towards zero with time since the last update
+    (see ERROR_RATE_HALF_LIFE), so old failures stop counting against a
+    backend that hasn't been sent anything since.
+    """
+
+    def __init__(
+        self, ttft=None, tokens_per_sec=None, error_rate=0.0, samples=0, updated_at=0.0
+    ):
+        self.ttft = ttft
+        self.tokens_per_sec = tokens_per_sec
+        self._error_rate = error_rate
+        self.samples = samples
+        self.updated_at = updated_at  # Wall time of the last update
+
+    @property
+    def error_rate(self):
+        """The failure rate, decayed by the time since the last update."""
+        idle = max(time.time() - self.updated_at, 0.0)
+        return self._error_rate * 0.5 ** (idle / ERROR_RATE_HALF_LIFE)
+
+    def update(self, metrics, alpha):
+        """
+        Fold one request's metrics into the averages.
+
+        Args:
+            metrics (RequestMetrics): The finished request
+            alpha (float): Weight of the new sample, 0-1
+        """
+        self.samples += 1
+        failed = 1.0 if metrics.error else 0.0
+        self._error_rate = _ewma(self.error_rate, failed, alpha)
+        self.updated_at = time.time()
+        if metrics.error:
+            return
+        if metrics.ttft is not None:
+            self.ttft = _ewma(self.ttft, metrics.ttft, alpha)
+        if metrics.tokens_per_sec:
+            self.tokens_per_sec = _ewma(
+                self.tokens_per_sec, metrics.tokens_per_sec, alpha
+            )
+
+    def expected_latency(self):
+        """Estimated seconds for a typical response, or None if unmeasured."""
+        if self.ttft is None:
+            return None
+        latency = self.ttft
+        if self.tokens_per_sec:
+            latency += TYPICAL_OUTPUT_TOKENS / self.tokens_per_sec
+        # Every failure costs a retry, so inflate by the failure rate
+        return latency / max(1.0 - self.error_rate, 0.05)
+
+    def to_dict(self):
+        return {
+            "ttft": self.ttft,
+            "tokens_per_sec": self.tokens_per_sec,
+            "error_rate": self._error_rate,
+            "samples": self.samples,
+            "updated_at": self.updated_at,
+        }
+
+
+def _ewma(current, value, alpha):
+    return value if current is None else alpha * value + (1 - alpha) * current
+
+
+class Router:
+    """
+    Pick a backend for each request to a logical model.
+
+    Policies:
+        fastest: lowest expected latency (TTFT plus generation time at the
+            measured throughput); backends without measurements are tried
+            first so every backend gets sampled.
+        cheapest: lowest price, with expected latency as the tie breaker.
+    """
+
+    def __init__(
+        self, routes=None, policy="fastest", alpha=0.3, stats_file=ROUTING_STATS_FILE
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown routing policy '{policy}'")
+        self.routes = {
+            name: [Backend(b["provider"], b["model"], b.get("price")) for b in backends]
+            for name, backends in (routes or DEFAULT_ROUTES).items()
+        }
+        self.policy = policy
+        self.alpha = alpha
+        self.stats_file = stats_file
+        self.stats = self._load_stats()
+        self._lock = threading.Lock()
+
+    def is_logical(self, model):
+        return model in self.routes
+
+    def candidates(self, logical_model, available_providers):
+        """
+        Rank the usable backends for a logical model, best first.
+
+        Args:
+            logical_model (str): A key of the routing table
+            available_providers (Container): Providers with an API key configured
+
+        Returns:
+            list: Backends ordered by the current policy
+        """
+        backends = [
+            b
+            for b in self.routes.get(logical_model, [])
+            if b.provider in available_providers and get_breaker(b.provider).available()
+        ]
+        healthy = [
+            b for b in backends if self._stats(b).error_rate <= MAX_ERROR_RATE
+        ] or backends
+
+        def latency(backend):
+            expected = self._stats(backend).expected_latency()
+            # Unmeasured backends sort first so they get explored
+            return -1.0 if expected is None else expected
+
+        if self.policy == "cheapest":
+            return sorted(healthy, key=lambda b: (b.blended_price, latency(b)))
+        return sorted(healthy, key=latency)
+
+    def choose(self, logical_model, available_providers):
+        """Return the best backend for a logical model, or None if none is usable."""
+        ranked = self.candidates(logical_model, available_providers)
+        return ranked[0] if ranked else None
+
+    def record(self, backend, metrics):
+        """Update a backend's rolling stats with a finished request."""
+        if metrics.cached:
+            return  # Cache hits say nothing about the provider
+        with self._lock:
+            self._stats(backend).update(metrics, self.alpha)
+            self._save_stats()
+
+    def _stats(self, backend):
+        stats = self.stats.get(backend.key)
+        if stats is None:
+            stats = self.stats[backend.key] = BackendStats()
+        return stats
+
+    def _load_stats(self):
+        try:
+            with open(self.stats_file, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        return {key: BackendStats(**values) for key, values in data.items()}
+
+    def _save_stats(self):
+        self.stats_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.stats_file, "w") as f:
+            json.dump({k: s.to_dict() for k, s in self.stats.items()}, f, indent=2)
+
+    def table(self, logical_model=None):
+        """
+        Return the routing table with current stats, for display.
+
+        Returns:
+            list: (logical model, backend, BackendStats) tuples
+        """
+        rows = []
+        for name, backends in self.routes.items():
+            if logical_model and name != logical_model:
+                continue
+            for backend in backends:
+                rows.append((name, backend, self._stats(backend)))
+        return rows
+
+
+def create_router(config):
+    """
+    Create the router from the configuration.
+
+    Args:
+        config (dict): The loaded configuration; "routes" overrides the default
+            routing table and "routing_policy" selects fastest or cheapest
+
+    Returns:
+        Router: The router
+    """
+    policy = config.get("routing_policy", "fastest")
+    if policy not in POLICIES:
+        policy = "fastest"
+    return Router(routes=config.get("routes"), policy=policy)
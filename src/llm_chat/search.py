@@ -0,0 +1,177 @@
+"""
+Concurrent, cached web search over the Serper API
+
+A SearchEngine fans several queries out at once over the shared HTTP
+transport, caches each (query, result count) on disk for a while, and merges
+the results into one list with duplicate links removed.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit
+
+from .cache import DiskCache, request_key
+from .config import CONFIG_FOLDER
+from .transport import default_http_module, get_transport
+
+SERPER_API_URL = "https://google.serper.dev/search"
+SEARCH_CACHE_DIR = CONFIG_FOLDER / "search_cache"
+SEARCH_CACHE_TTL = 24 * 60 * 60  # One day, in seconds
+SEARCH_CACHE_MAX_BYTES = 32 * 1024 * 1024
+MAX_CONCURRENT_QUERIES = 8
+
+
+def normalize_link(link):
+    """
+    Normalize a URL so trivially different links to one page compare equal.
+
+    Lowercases the scheme and host, drops the fragment, a leading "www." and
+    a trailing slash.
+    """
+    parts = urlsplit(link.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    path = parts.path.rstrip("/")
+    return urlunsplit((parts.scheme.lower(), host, path, parts.query, ""))
+
+
+def merge_results(results_by_query):
+    """
+    Merge per-query results into one list without duplicate links.
+
+    Results are interleaved by rank (every query's first result, then every
+    second result...) so each query is represented near the top.
+
+    Args:
+        results_by_query (dict): Mapping of query to its ordered result list
+
+    Returns:
+        list: Result dicts, each tagged with the query that found it
+    """
+    merged = []
+    seen = set()
+    lists = list(results_by_query.items())
+    depth = max((len(results) for _, results in lists), default=0)
+    for rank in range(depth):
+        for query, results in lists:
+            if rank >= len(results):
+                continue
+            result = results[rank]
+            key = normalize_link(result.get("link", ""))
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            merged.append(dict(result, query=query))
+    return merged
+
+
+class SearchEngine:
+    """
+    Serper web search with a disk cache and concurrent multi-query support.
+
+    The endpoint defaults to the SERPER_API_URL environment variable or the
+    public Serper API, so tests and benchmarks can point it at a local
+    stand-in that speaks the same JSON protocol. Pass ``cache=False`` to
+    always query live.
+    """
+
+    def __init__(
+        self,
+        api_key,
+        endpoint=None,
+        cache=None,
+        max_workers=MAX_CONCURRENT_QUERIES,
+    ):
+        self.api_key = api_key
+        self.endpoint = endpoint or os.environ.get("SERPER_API_URL", SERPER_API_URL)
+        if cache is None:
+            cache = DiskCache(
+                SEARCH_CACHE_DIR, max_bytes=SEARCH_CACHE_MAX_BYTES, ttl=SEARCH_CACHE_TTL
+            )
+        self.cache = cache
+        self.max_workers = max_workers
+        self.http_module = default_http_module()
+        # Failures of one query, reported per query rather than raised:
+        # transport/HTTP errors, bad endpoint URLs and non-JSON responses
+        self.query_errors = (
+            self.http_module.HTTPError,
+            self.http_module.InvalidURL,
+            ValueError,
+        )
+        self._cache_lock = threading.Lock()
+
+    def search(self, query, result_count):
+        """
+        Search for one query, using the cache when possible.
+
+        Args:
+            query (str): The search query
+            result_count (int): Number of results to request
+
+        Returns:
+            list: Result dicts with title, link, snippet and position
+
+        Raises:
+            httpx.HTTPError: If the request fails
+            httpx.InvalidURL: If the endpoint is not a valid URL
+            ValueError: If the response is not a JSON object
+        """
+        key = request_key("serper", self.endpoint, query, result_count)
+        if self.cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        http = get_transport().client(self.http_module)
+        response = http.post(
+            self.endpoint,
+            headers={"X-API-KEY": self.api_key, "Content-Type": "application/json"},
+            json={"q": query, "num": result_count},
+        )
+        response.raise_for_status()
+        data = response.json()
+        if not isinstance(data, dict):
+            raise ValueError("Unexpected search response")
+        results = [
+            {
+                "title": result.get("title", ""),
+                "link": result.get("link", ""),
+                "snippet": result.get("snippet", ""),
+                "position": result.get("position", 0),
+            }
+            for result in data.get("organic", [])
+        ]
+        if self.cache:
+            with self._cache_lock:  # Queries run on several threads
+                self.cache.set(key, results)
+        return results
+
+    def search_many(self, queries, result_count):
+        """
+        Run several queries concurrently and merge their results.
+
+        Args:
+            queries (list): Search queries; duplicates are searched once
+            result_count (int): Number of results to request per query
+
+        Returns:
+            tuple: (merged deduplicated results, dict of query to error)
+        """
+        queries = list(dict.fromkeys(q.strip() for q in queries if q.strip()))
+        results, errors = {}, {}
+        if not queries:
+            return [], errors
+        workers = min(self.max_workers, len(queries))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                query: pool.submit(self.search, query, result_count)
+                for query in queries
+            }
+            for query, future in futures.items():
+                try:
+                    results[query] = future.result()
+                except self.query_errors as e:
+                    errors[query] = e
+        return merge_results(results), errors
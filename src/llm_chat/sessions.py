@@ -0,0 +1,301 @@
+"""
+Persistent conversation sessions in a local SQLite database
+
+Turns are appended as they happen by a background writer thread, so saving
+never blocks the response stream. The database runs in WAL mode so the
+interactive reads (``sessions``, ``resume``, ``/search``) don't wait on writes.
+Long messages are stored zlib-compressed, and a contentless FTS5 table
+indexes the text for full-text search without storing it twice.
+"""
+
+import queue
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+from .config import CONFIG_FOLDER
+
+SESSIONS_DB = CONFIG_FOLDER / "sessions.db"
+COMPRESS_THRESHOLD = 1024  # Bytes; shorter messages are stored as plain text
+TITLE_LENGTH = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    provider TEXT,
+    model TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated DESC);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL REFERENCES sessions (id),
+    role TEXT NOT NULL,
+    content BLOB NOT NULL,
+    compressed INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_session ON messages (session_id, id);
+"""
+FTS_SCHEMA = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(content, content='')"
+)
+
+
+def encode_content(text, threshold=COMPRESS_THRESHOLD):
+    """
+    Encode message text for storage, compressing it if it is long.
+
+    Args:
+        text (str): The message text
+        threshold (int): Size in bytes above which the text is compressed
+
+    Returns:
+        tuple: (stored value, compressed flag)
+    """
+    data = text.encode("utf-8")
+    if len(data) > threshold:
+        packed = zlib.compress(data, 6)
+        if len(packed) < len(data):
+            return packed, 1
+    return text, 0
+
+
+def decode_content(value, compressed):
+    """Return the text of a stored message."""
+    if compressed:
+        return zlib.decompress(value).decode("utf-8")
+    return value
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query matching all of its words."""
+    words = re.findall(r"\w+", text)
+    return " ".join(f'"{word}"' for word in words)
+
+
+def snippet(text, query, width=80):
+    """Return a single-line excerpt of text around the first query word."""
+    flat = " ".join(text.split())
+    lowered = flat.lower()
+    positions = [lowered.find(w.lower()) for w in re.findall(r"\w+", query)]
+    positions = [p for p in positions if p >= 0]
+    start = max(min(positions) - width // 4, 0) if positions else 0
+    excerpt = flat[start : start + width]
+    prefix = "..." if start > 0 else ""
+    suffix = "..." if start + width < len(flat) else ""
+    return f"{prefix}{excerpt}{suffix}"
+
+
+class SessionStore:
+    """
+    Append-only store of chat sessions.
+
+    Writes go through a queue to a single writer thread that owns its own
+    connection; reads use a separate connection on the calling thread.
+    """
+
+    def __init__(self, path=SESSIONS_DB, compress_threshold=COMPRESS_THRESHOLD):
+        self.path = path
+        self.compress_threshold = compress_threshold
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._reader = self._connect()
+        self._reader.executescript(SCHEMA)
+        try:
+            self._reader.execute(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False  # SQLite built without FTS5
+        self._reader.commit()
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def append(self, session_id, role, content, provider=None, model=None):
+        """
+        Queue a message to be appended to a session.
+
+        The session is created on its first message, titled after the first
+        user message.
+
+        Args:
+            session_id (str): The session to append to
+            role (str): "user" or "assistant"
+            content (str): The message text
+            provider (str): The provider in use, recorded on the session
+            model (str): The model in use, recorded on the session
+        """
+        self._queue.put((session_id, role, content, provider, model, time.time()))
+
+    def flush(self):
+        """Block until every queued message has been written."""
+        self._queue.join()
+
+    def close(self):
+        """Write any queued messages and stop the writer thread."""
+        self._queue.put(None)
+        self._writer.join()
+        self._reader.close()
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                conn.close()
+                return
+            batch = [item]
+            # Group whatever else is already queued into the same transaction
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    self._queue.task_done()
+                    break
+                batch.append(item)
+            try:
+                with conn:
+                    for entry in batch:
+                        self._insert(conn, *entry)
+            except sqlite3.Error as e:
+                print(f"Error saving session: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _insert(self, conn, session_id, role, content, provider, model, created):
+        title = None
+        if role == "user":
+            title = (content.strip().splitlines() or [""])[0][:TITLE_LENGTH]
+        conn.execute(
+            "INSERT OR IGNORE INTO sessions (id, title, provider, model, created, updated)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (session_id, title, provider, model, created, created),
+        )
+        conn.execute(
+            "UPDATE sessions SET updated = ?, message_count = message_count + 1,"
+            " title = COALESCE(title, ?), provider = COALESCE(?, provider),"
+            " model = COALESCE(?, model) WHERE id = ?",
+            (created, title, provider, model, session_id),
+        )
+        value, compressed = encode_content(content, self.compress_threshold)
+        cursor = conn.execute(
+            "INSERT INTO messages (session_id, role, content, compressed, created)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (session_id, role, value, compressed, created),
+        )
+        if self.fts:
+            conn.execute(
+                "INSERT INTO messages_fts (rowid, content) VALUES (?, ?)",
+                (cursor.lastrowid, content),
+            )
+
+    def list_sessions(self, limit=20):
+        """
+        Return the most recently updated sessions.
+
+        Returns:
+            list: Dicts with id, title, provider, model, updated and message_count
+        """
+        rows = self._reader.execute(
+            "SELECT id, title, provider, model, updated, message_count FROM sessions"
+            " ORDER BY updated DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+        keys = ("id", "title", "provider", "model", "updated", "message_count")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def find_session(self, prefix):
+        """
+        Resolve a session id or unique id prefix.
+
+        Returns:
+            dict or None: The session, or None if no session (or several) match
+        """
+        rows = self._reader.execute(
+            "SELECT id, title, provider, model FROM sessions"
+            " WHERE id >= ? AND id < ? LIMIT 2",
+            (prefix, prefix + "\uffff"),
+        ).fetchall()
+        if len(rows) != 1:
+            return None
+        return dict(zip(("id", "title", "provider", "model"), rows[0]))
+
+    def load_messages(self, session_id):
+        """Return a session's messages as a conversation history list."""
+        rows = self._reader.execute(
+            "SELECT role, content, compressed FROM messages"
+            " WHERE session_id = ? ORDER BY id",
+            (session_id,),
+        )
+        return [
+            {"role": role, "content": decode_content(content, compressed)}
+            for role, content, compressed in rows
+        ]
+
+    def search(self, text, limit=20):
+        """
+        Full-text search over every stored message, best matches first.
+
+        Args:
+            text (str): Words to search for
+            limit (int): Maximum number of results
+
+        Returns:
+            list: Dicts with session_id, title, role, created and snippet
+        """
+        query = fts_query(text)
+        if not query or not self.fts:
+            return []
+        rows = self._reader.execute(
+            "SELECT m.session_id, s.title, m.role, m.created, m.content, m.compressed"
+            " FROM messages_fts f JOIN messages m ON m.id = f.rowid"
+            " JOIN sessions s ON s.id = m.session_id"
+            " WHERE messages_fts MATCH ? ORDER BY f.rank LIMIT ?",
+            (query, limit),
+        ).fetchall()
+        return [
+            {
+                "session_id": session_id,
+                "title": title,
+                "role": role,
+                "created": created,
+                "snippet": snippet(decode_content(content, compressed), text),
+            }
+            for session_id, title, role, created, content, compressed in rows
+        ]
+
+
+def create_session_store(config):
+    """
+    Create the session store unless it is disabled in the configuration.
+
+    Args:
+        config (dict): The loaded configuration ("save_sessions": false
+            turns persistence off)
+
+    Returns:
+        SessionStore or None: The store, or None when disabled or unavailable
+    """
+    if not config.get("save_sessions", True):
+        return None
+    try:
+        return SessionStore()
+    except sqlite3.Error as e:
+        print(f"Session history unavailable: {e}")
+        return None
@@ -0,0 +1,318 @@
+"""
+Tokenizer selection and incremental token accounting for conversation history
+"""
+
+import hashlib
+import json
+import os
+import sys
+from functools import lru_cache
+from pathlib import Path
+
+from termcolor import colored
+
+from .config import CONFIG_FOLDER
+
+# Encodings shipped inside the package; the release build fills it with
+# `python -m llm_chat.tokens --bundle` before `python -m build`
+BUNDLED_ENCODINGS_DIR = Path(__file__).parent / "data" / "tiktoken"
+# Fallback location, so an encoding is downloaded at most once per machine
+ENCODINGS_CACHE_DIR = CONFIG_FOLDER / "tiktoken"
+
+DEFAULT_ENCODING = "cl100k_base"
+BUNDLED_ENCODINGS = ("cl100k_base", "o200k_base")
+
+# Where the bundled encodings' rank files are published, and how tiktoken
+# defines them (tiktoken_ext.openai_public). Other encodings are loaded with
+# tiktoken.get_encoding.
+ENCODING_SPECS = {
+    "cl100k_base": {
+        "url": "https://openaipublic.blob.core.windows.net/encodings/cl100k_base.tiktoken",
+        "sha256": "223921b76ee99bde995b7ff738513eef100fb51d18c93597a113bcffe865b2a7",
+        "pat_str": r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}++|\p{N}{1,3}+| ?[^\s\p{L}\p{N}]++[\r\n]*+|\s++$|\s*[\r\n]|\s+(?!\S)|\s""",
+        "special_tokens": {
+            "<|endoftext|>": 100257,
+            "<|fim_prefix|>": 100258,
+            "<|fim_middle|>": 100259,
+            "<|fim_suffix|>": 100260,
+            "<|endofprompt|>": 100276,
+        },
+    },
+    "o200k_base": {
+        "url": "https://openaipublic.blob.core.windows.net/encodings/o200k_base.tiktoken",
+        "sha256": "446a9538cb6c348e3516120d7c08b09f57c36495e2acfffe59a5bf8b0cfb1a2d",
+        "pat_str": "|".join(
+            [
+                r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]*[\p{Ll}\p{Lm}\p{Lo}\p{M}]+(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+                r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]+[\p{Ll}\p{Lm}\p{Lo}\p{M}]*(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+                r"""\p{N}{1,3}""",
+                r""" ?[^\s\p{L}\p{N}]+[\r\n/]*""",
+                r"""\s*[\r\n]+""",
+                r"""\s+(?!\S)""",
+                r"""\s+""",
+            ]
+        ),
+        "special_tokens": {"<|endoftext|>": 199999, "<|endofprompt|>": 200018},
+    },
+}
+
+# Model name prefixes mapped to their tiktoken encoding. Non-OpenAI models
+# (Claude, Llama, Mixtral, Gemini, Grok) have no tiktoken encoding, so they
+# fall back to cl100k_base, which is a close approximation for English text.
+MODEL_ENCODING_PREFIXES = (
+    ("gpt-4o", "o200k_base"),
+    ("gpt-4.1", "o200k_base"),
+    ("gpt-4.5", "o200k_base"),
+    ("gpt-5", "o200k_base"),
+    ("chatgpt-4o", "o200k_base"),
+    ("o1", "o200k_base"),
+    ("o3", "o200k_base"),
+    ("o4", "o200k_base"),
+    ("gpt-4", "cl100k_base"),
+    ("gpt-3.5", "cl100k_base"),
+)
+
+
+def encoding_name_for_model(model):
+    """
+    Pick the tiktoken encoding name to use for a model.
+
+    Args:
+        model (str): The model name, optionally prefixed like "openai/gpt-4o"
+
+    Returns:
+        str: The encoding name
+    """
+    name = (model or "").rsplit("/", 1)[-1].lower()
+    for prefix, encoding in MODEL_ENCODING_PREFIXES:
+        if name.startswith(prefix):
+            return encoding
+    return DEFAULT_ENCODING
+
+
+class _ApproximateEncoding:
+    """Stand-in used when an encoding can't be loaded (e.g. offline, no cache)."""
+
+    name = "approximate"
+
+    def encode_ordinary(self, text):
+        return range((len(text) + 3) // 4)
+
+    def encode_ordinary_batch(self, texts):
+        return [self.encode_ordinary(text) for text in texts]
+
+
+def _encoding_file(name, directories, save_to):
+    """
+    Return the path of an encoding's rank file, downloading it if needed.
+
+    The first of directories holding a ``<name>.tiktoken`` file with the
+    expected hash wins. Otherwise the file is downloaded and, if possible,
+    saved to save_to; a URL is returned if it can't be saved.
+    """
+    from tiktoken.load import read_file
+
+    spec = ENCODING_SPECS[name]
+    filename = f"{name}.tiktoken"
+    for directory in directories:
+        path = directory / filename
+        try:
+            data = path.read_bytes()
+        except OSError:
+            continue
+        if hashlib.sha256(data).hexdigest() == spec["sha256"]:
+            return str(path)
+    if save_to is None:
+        return spec["url"]
+    data = read_file(spec["url"])
+    if hashlib.sha256(data).hexdigest() != spec["sha256"]:
+        raise ValueError(f"Hash mismatch for {spec['url']}")
+    try:
+        save_to.mkdir(parents=True, exist_ok=True)
+        tmp = save_to / f"{filename}.tmp"
+        tmp.write_bytes(data)
+        os.replace(tmp, save_to / filename)
+    except OSError:
+        return spec["url"]  # Read-only location; tiktoken fetches it again
+    return str(save_to / filename)
+
+
+def _load_encoding(name, directories, save_to):
+    """Build a tiktoken encoding from local rank files, downloading them if needed."""
+    import tiktoken
+    from tiktoken.load import load_tiktoken_bpe
+
+    spec = ENCODING_SPECS.get(name)
+    if spec is None:
+        return tiktoken.get_encoding(name)
+    path = _encoding_file(name, directories, save_to)
+    return tiktoken.Encoding(
+        name=name,
+        pat_str=spec["pat_str"],
+        mergeable_ranks=load_tiktoken_bpe(path, expected_hash=spec["sha256"]),
+        special_tokens=spec["special_tokens"],
+    )
+
+
+@lru_cache(maxsize=None)
+def get_encoding(name):
+    """
+    Load a tiktoken encoding once per process.
+
+    Encodings are read from the bundled data directory when present, otherwise
+    from ~/.llm_cli/tiktoken (downloading them there the first time). If none
+    of that works, a character-based approximation is returned instead of
+    failing.
+
+    Args:
+        name (str): The encoding name
+
+    Returns:
+        The encoding object
+    """
+    try:
+        return _load_encoding(
+            name, [BUNDLED_ENCODINGS_DIR, ENCODINGS_CACHE_DIR], ENCODINGS_CACHE_DIR
+        )
+    except Exception as e:
+        print(
+            colored(
+                f"Warning: couldn't load the {name} tokenizer ({e}); token counts "
+                "are estimated from text length.",
+                "yellow",
+            ),
+            file=sys.stderr,
+        )
+        return _ApproximateEncoding()
+
+
+def message_text(message):
+    """Return the text of a message's content for token counting."""
+    content = message.get("content")
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return content
+    return json.dumps(content, ensure_ascii=False)
+
+
+def count_tokens(text, model):
+    """
+    Count tokens in the given text using the model's tokenizer.
+
+    Args:
+        text (str): The text to count tokens for
+        model (str): The model name
+
+    Returns:
+        int: Number of tokens in the text
+    """
+    return len(get_encoding(encoding_name_for_model(model)).encode_ordinary(text))
+
+
+class TokenLedger:
+    """
+    Memoized token counts for a conversation history.
+
+    Each message is tokenized once. On every query the ledger checks, by
+    identity, whether the first and last messages it counted are still in
+    place; if so only the messages appended since are encoded, so a query
+    costs O(new messages). Otherwise (history cleared, truncated, compacted
+    or edited) it finds the first changed message and recounts from there.
+    Messages are assumed not to be mutated in place, or replaced while the
+    first and last counted messages stay, after they are added to the history.
+    """
+
+    def __init__(self):
+        self._encoding_name = None
+        self._messages = []
+        self._counts = []
+        self._total = 0
+
+    def _synced_length(self, messages):
+        known = len(self._messages)
+        if (
+            known
+            and len(messages) >= known
+            and messages[0] is self._messages[0]
+            and messages[known - 1] is self._messages[-1]
+        ):
+            return known  # Only appended to, the common case
+        limit = min(known, len(messages))
+        for i in range(limit):
+            if messages[i] is not self._messages[i]:
+                return i
+        return limit
+
+    def sync(self, messages, model):
+        """
+        Bring the ledger up to date with messages.
+
+        Args:
+            messages (list): The conversation history
+            model (str): The model whose tokenizer should be used
+        """
+        encoding_name = encoding_name_for_model(model)
+        if encoding_name != self._encoding_name:
+            self._encoding_name = encoding_name
+            self._messages, self._counts, self._total = [], [], 0
+
+        synced = self._synced_length(messages)
+        if synced < len(self._messages):
+            self._total -= sum(self._counts[synced:])
+            del self._messages[synced:]
+            del self._counts[synced:]
+
+        new_messages = messages[synced:]
+        if new_messages:
+            encoding = get_encoding(encoding_name)
+            encoded = encoding.encode_ordinary_batch(
+                [message_text(m) for m in new_messages]
+            )
+            counts = [len(tokens) for tokens in encoded]
+            self._messages.extend(new_messages)
+            self._counts.extend(counts)
+            self._total += sum(counts)
+
+    def total(self, messages, model):
+        """
+        Return the total token count of messages.
+
+        Args:
+            messages (list): The conversation history
+            model (str): The model whose tokenizer should be used
+
+        Returns:
+            int: Total number of tokens across all message contents
+        """
+        self.sync(messages, model)
+        return self._total
+
+    def counts(self, messages, model):
+        """
+        Return the per-message token counts of messages.
+
+        Args:
+            messages (list): The conversation history
+            model (str): The model whose tokenizer should be used
+
+        Returns:
+            list: Token count of each message, in order. This is the ledger's
+            own list, not a copy; don't modify it
+        """
+        self.sync(messages, model)
+        return self._counts
+
+
+def bundle_encodings(target=BUNDLED_ENCODINGS_DIR):
+    """Download the common encodings into the package data directory."""
+    for name in BUNDLED_ENCODINGS:
+        _load_encoding(name, [target], target)
+        print(f"Bundled {name} into {target}")
+
+
+if __name__ == "__main__":
+    if "--bundle" in sys.argv:
+        bundle_encodings()
+    else:
+        print("Usage: python -m llm_chat.tokens --bundle")
@@ -2,59 +2,237 @@
 Tool implementations for LLM CLI including web search and terminal execution
 """
 
+import codecs
+import os
+import signal
 import subprocess
-import requests
-from typing import List, Dict, Any
+import sys
+import threading
+from collections import deque
+from typing import List, Dict, Any, Optional
 from termcolor import colored
-from rich.console import Console
 from rich.markdown import Markdown
+from .utils import get_console
+from .search import SERPER_API_URL, SearchEngine  # noqa: F401 (re-exported)
 
 # Constants for web search
 DEFAULT_SEARCH_COUNT = 5
-SERPER_API_URL = "https://google.serper.dev/search"
+
+# Constants for terminal execution
+DEFAULT_COMMAND_TIMEOUT = 600  # Seconds
+DEFAULT_MAX_OUTPUT_CHARS = 64 * 1024  # Kept per stream (head and tail)
+KILL_GRACE_PERIOD = 3  # Seconds between SIGTERM and SIGKILL
+PIPE_READ_SIZE = 8192
+
+_engine = None  # Shared so its cache and pooled connections are reused
+_running = set()  # Commands in progress, so an interrupt can kill them all
+_running_lock = threading.Lock()
+_output_lock = threading.Lock()  # Keeps each captured command's output together
+
+
+class HeadTailBuffer:
+    """
+    Bounded text buffer that keeps the start and end of a long output.
+
+    Up to ``max_chars`` characters are kept: the first ``head_chars`` as they
+    arrive and a rolling window of the most recent text after that. Anything
+    in between is dropped and only counted.
+    """
+
+    def __init__(self, max_chars=DEFAULT_MAX_OUTPUT_CHARS, head_ratio=0.25):
+        self.head_chars = int(max_chars * head_ratio)
+        self.tail_chars = max_chars - self.head_chars
+        self.head = []
+        self.head_size = 0
+        self.tail = deque()
+        self.tail_size = 0
+        self.dropped = 0
+
+    def write(self, text):
+        if self.head_size < self.head_chars:
+            take = text[: self.head_chars - self.head_size]
+            self.head.append(take)
+            self.head_size += len(take)
+            text = text[len(take) :]
+        if not text:
+            return
+        self.tail.append(text)
+        self.tail_size += len(text)
+        while self.tail_size > self.tail_chars:
+            excess = self.tail_size - self.tail_chars
+            first = self.tail[0]
+            if len(first) <= excess:
+                self.tail.popleft()
+                self.tail_size -= len(first)
+                self.dropped += len(first)
+            else:
+                self.tail[0] = first[excess:]
+                self.tail_size -= excess
+                self.dropped += excess
+
+    @property
+    def truncated(self):
+        return self.dropped > 0
+
+    def getvalue(self):
+        head = "".join(self.head)
+        tail = "".join(self.tail)
+        if not self.dropped:
+            return head + tail
+        return f"{head}\n... [{self.dropped} characters omitted] ...\n{tail}"
+
+
+def _kill_process(process):
+    """Terminate a command and its children, escalating to SIGKILL."""
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGTERM)
+        else:
+            process.terminate()
+        process.wait(timeout=KILL_GRACE_PERIOD)
+    except subprocess.TimeoutExpired:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+        process.wait()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def cancel_running_commands():
+    """
+    Kill every command started by execute_terminal_command that is still running.
+
+    Ctrl-C only interrupts the main thread, and commands run in their own
+    process group, so commands waited on by other threads (parallel tool
+    calls) must be killed explicitly. They then end as interrupted.
+    """
+    with _running_lock:
+        processes = list(_running)
+    for process in processes:
+        process.cancelled = True
+        _kill_process(process)
+
+
+def _pump(pipe, buffer, out, lock):
+    """Copy a pipe to out (if set) as it arrives, keeping a bounded copy."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while True:
+        data = pipe.read1(PIPE_READ_SIZE)
+        text = decoder.decode(data, final=not data)
+        if text:
+            buffer.write(text)
+            if out is not None:
+                with lock:
+                    out.write(text)
+                    out.flush()
+        if not data:
+            break
+    pipe.close()
 
 
 def execute_terminal_command(
-    command: str, capture_output: bool = True
+    command: str,
+    capture_output: bool = True,
+    timeout: Optional[float] = DEFAULT_COMMAND_TIMEOUT,
+    max_output_chars: int = DEFAULT_MAX_OUTPUT_CHARS,
+    live: bool = True,
 ) -> Dict[str, Any]:
     """
-    Execute a terminal command and return its output.
+    Execute a terminal command, streaming its output as it runs.
+
+    Output is shown live and at most ``max_output_chars`` of each stream is
+    kept (the beginning and the end), so long-running or chatty commands
+    neither freeze the CLI nor grow memory without bound. Commands run at the
+    same time as others should pass ``live=False``: their output is then
+    shown in one piece when they finish, so it doesn't get mixed up.
 
     Args:
         command (str): The command to execute
         capture_output (bool): Whether to capture and return the output
+        timeout (float): Seconds before the command (and its children) is
+            killed, or None to wait indefinitely
+        max_output_chars (int): Characters of each stream to keep
+        live (bool): Whether to stream the output as it arrives
 
     Returns:
-        dict: A dictionary containing success status, stdout, stderr, and return code
+        dict: A dictionary containing success status, stdout, stderr, return
+        code, and whether the command timed out or its output was truncated
     """
     try:
-        # Print command being executed
-        print(colored(f"\nExecuting: {command}", "cyan"))
-        print("-" * 70)
-
-        # Execute the command
+        if live:
+            _print_command_header(command)
+
+        pipe = subprocess.PIPE if capture_output else None
+        process = subprocess.Popen(
+            command,
+            shell=True,
+            stdout=pipe,
+            stderr=pipe,
+            # Own process group, so a timeout kills the whole pipeline
+            start_new_session=os.name == "posix",
+        )
+        stdout = HeadTailBuffer(max_output_chars)
+        stderr = HeadTailBuffer(max_output_chars)
+        readers = []
         if capture_output:
-            result = subprocess.run(command, shell=True, text=True, capture_output=True)
-            stdout = result.stdout
-            stderr = result.stderr
-            return_code = result.returncode
-        else:
-            # If not capturing output, let it stream to the terminal
-            return_code = subprocess.call(command, shell=True)
-            stdout = None
-            stderr = None
+            lock = threading.Lock()
+            for source, buffer, out in (
+                (process.stdout, stdout, sys.stdout if live else None),
+                (process.stderr, stderr, sys.stderr if live else None),
+            ):
+                reader = threading.Thread(
+                    target=_pump, args=(source, buffer, out, lock), daemon=True
+                )
+                reader.start()
+                readers.append(reader)
+
+        timed_out = interrupted = False
+        with _running_lock:
+            _running.add(process)
+        try:
+            return_code = process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            _kill_process(process)
+            return_code = process.returncode
+        except KeyboardInterrupt:
+            interrupted = True
+            _kill_process(process)
+            return_code = process.returncode
+        finally:
+            with _running_lock:
+                _running.discard(process)
+        interrupted = interrupted or getattr(process, "cancelled", False)
+        for reader in readers:
+            # After a kill, don't wait on orphans that still hold the pipes
+            reader.join(KILL_GRACE_PERIOD if timed_out or interrupted else None)
 
         # Create result dictionary
-        success = return_code == 0
+        success = return_code == 0 and not timed_out
         result_data = {
             "success": success,
-            "stdout": stdout,
-            "stderr": stderr,
+            "stdout": stdout.getvalue() if capture_output else None,
+            "stderr": stderr.getvalue() if capture_output else None,
             "return_code": return_code,
+            "timed_out": timed_out,
+            "interrupted": interrupted,
+            "truncated": stdout.truncated or stderr.truncated,
+            "streamed": live,
         }
+        if timed_out:
+            result_data["error"] = (
+                f"Command timed out after {timeout:g}s and was killed"
+            )
 
         # Display results nicely
-        display_command_results(result_data)
+        if live:
+            display_command_results(result_data)
+        else:
+            with _output_lock:
+                _print_command_header(command)
+                display_command_results(result_data)
 
         return result_data
 
@@ -70,14 +248,21 @@ def execute_terminal_command(
         return error_data
 
 
+def _print_command_header(command):
+    print(colored(f"\nExecuting: {command}", "cyan"))
+    print("-" * 70)
+
+
 def display_command_results(result: Dict[str, Any]) -> None:
     """
     Display command execution results in a formatted way.
 
+    Output that was already streamed to the terminal isn't printed again.
+
     Args:
         result (dict): Command execution result dictionary
     """
-    console = Console()
+    console = get_console()
     print("-" * 70)
 
     # Check if there was an error
@@ -87,10 +272,21 @@ def display_command_results(result: Dict[str, Any]) -> None:
 
     # Display success/failure status
     status = "Success" if result["success"] else "Failed"
+    if result.get("interrupted"):
+        status = "Interrupted"
     status_color = "green" if result["success"] else "red"
     print(
         colored(f"Command {status} (exit code: {result['return_code']})", status_color)
     )
+    if result.get("truncated"):
+        print(
+            colored(
+                "Output was long; only its beginning and end are kept for 'attach'.",
+                "yellow",
+            )
+        )
+    if result.get("streamed"):
+        return
 
     # Display stdout if available
     if result["stdout"]:
@@ -107,6 +303,37 @@ def display_command_results(result: Dict[str, Any]) -> None:
             console.print(Markdown(f"```\n{stderr}\n```"))
 
 
+def format_command_context(command: str, result: Dict[str, Any]) -> str:
+    """
+    Format a command and its (possibly truncated) output as conversation context.
+
+    Args:
+        command (str): The command that was run
+        result (dict): Its execution result dictionary
+
+    Returns:
+        str: Markdown describing the command, exit status and output
+    """
+    status = f"exit code {result.get('return_code')}"
+    if result.get("timed_out"):
+        status = "killed after timing out"
+    lines = [f"I ran `{command}` in my terminal ({status})."]
+    for label, key in (("stdout", "stdout"), ("stderr", "stderr")):
+        output = (result.get(key) or "").strip()
+        if output:
+            lines.append(f"\n{label}:\n```\n{output}\n```")
+    if result.get("error") and not result.get("timed_out"):
+        lines.append(f"\nError: {result['error']}")
+    return "\n".join(lines)
+
+
+def _search_engine(api_key: str):
+    global _engine
+    if _engine is None or _engine.api_key != api_key:
+        _engine = SearchEngine(api_key)
+    return _engine
+
+
 def web_search(
     query: str, api_key: str, result_count: int = DEFAULT_SEARCH_COUNT
 ) -> List[Dict[str, Any]]:
@@ -121,6 +348,26 @@ def web_search(
     Returns:
         list: A list of search result dictionaries
     """
+    return web_search_many([query], api_key, result_count)
+
+
+def web_search_many(
+    queries: List[str], api_key: str, result_count: int = DEFAULT_SEARCH_COUNT
+) -> List[Dict[str, Any]]:
+    """
+    Run several web searches concurrently and merge the results.
+
+    Repeated queries are answered from a local cache, and links found by more
+    than one query are only returned once.
+
+    Args:
+        queries (list): The search queries
+        api_key (str): The Serper API key
+        result_count (int): Number of results to request per query
+
+    Returns:
+        list: A list of search result dictionaries, each with the query that found it
+    """
     if not api_key:
         print(
             colored(
@@ -130,37 +377,11 @@ def web_search(
         )
         return []
 
-    headers = {"X-API-KEY": api_key, "Content-Type": "application/json"}
-
-    payload = {"q": query, "num": result_count}
-
-    try:
-        print(colored(f"\nSearching the web for: {query}", "cyan"))
-        response = requests.post(SERPER_API_URL, headers=headers, json=payload)
-        response.raise_for_status()  # Raise exception for non-200 status codes
-
-        results = response.json()
-
-        # Extract the organic search results
-        organic_results = results.get("organic", [])
-
-        # Transform results into a more usable format
-        transformed_results = []
-        for result in organic_results:
-            transformed_results.append(
-                {
-                    "title": result.get("title", ""),
-                    "link": result.get("link", ""),
-                    "snippet": result.get("snippet", ""),
-                    "position": result.get("position", 0),
-                }
-            )
-
-        return transformed_results
-
-    except requests.exceptions.RequestException as e:
-        print(colored(f"Error performing web search: {str(e)}", "red"))
-        return []
+    print(colored(f"\nSearching the web for: {'; '.join(queries)}", "cyan"))
+    results, errors = _search_engine(api_key).search_many(queries, result_count)
+    for query, error in errors.items():
+        print(colored(f"Error performing web search for '{query}': {error}", "red"))
+    return results
 
 
 def display_search_results(results: List[Dict[str, Any]]) -> None:
@@ -174,7 +395,7 @@ def display_search_results(results: List[Dict[str, Any]]) -> None:
         print(colored("No search results found.", "yellow"))
         return
 
-    console = Console()
+    console = get_console()
 
     print(colored(f"\nFound {len(results)} results:", "green"))
     print("-" * 70)
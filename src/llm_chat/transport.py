@@ -0,0 +1,151 @@
+"""
+Shared, pooled HTTP transport for provider SDKs and tools
+
+Every provider client and the Serper search calls go through one tunable
+connection pool (per HTTP library), so connections are kept alive and reused
+across requests instead of each client paying its own TCP+TLS handshakes.
+"""
+
+import importlib
+import importlib.util
+import threading
+
+DEFAULT_HTTP_SETTINGS = {
+    "http2": True,  # Used only when the optional h2 package is installed
+    "max_connections": 50,
+    "max_keepalive_connections": 20,
+    "keepalive_expiry": 120.0,  # Seconds an idle connection is kept open
+    "connect_timeout": 10.0,
+    "read_timeout": 120.0,
+    "write_timeout": 30.0,
+    "pool_timeout": 30.0,
+}
+
+
+def sdk_http_module(package):
+    """
+    Return the httpx-compatible module a provider SDK is built on.
+
+    Newer Stainless-generated SDKs (openai, anthropic) use ``httpx2`` while
+    others (groq, cerebras) still use ``httpx``; clients from one are rejected
+    by the other.
+
+    Args:
+        package (str): The SDK's top-level package, e.g. "openai"
+
+    Returns:
+        module: ``httpx2`` or ``httpx``
+    """
+    base = importlib.import_module(f"{package}._base_client")
+    return getattr(base, "httpx2", None) or base.httpx
+
+
+def default_http_module():
+    """Return the HTTP library used for tool calls (httpx, else httpx2)."""
+    for name in ("httpx", "httpx2"):
+        if importlib.util.find_spec(name) is not None:
+            return importlib.import_module(name)
+    raise ImportError("No HTTP client library found; install httpx")
+
+
+class Transport:
+    """
+    Lazily built HTTP clients sharing one set of pool and timeout settings.
+
+    One sync and one async client is created per HTTP library and reused by
+    every provider that uses that library.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = dict(DEFAULT_HTTP_SETTINGS)
+        self.settings.update(settings or {})
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def _options(self, module):
+        s = self.settings
+        http2 = bool(s["http2"]) and importlib.util.find_spec("h2") is not None
+        return {
+            "http2": http2,
+            "limits": module.Limits(
+                max_connections=s["max_connections"],
+                max_keepalive_connections=s["max_keepalive_connections"],
+                keepalive_expiry=s["keepalive_expiry"],
+            ),
+            "timeout": module.Timeout(
+                connect=s["connect_timeout"],
+                read=s["read_timeout"],
+                write=s["write_timeout"],
+                pool=s["pool_timeout"],
+            ),
+        }
+
+    def client(self, module=None):
+        """
+        Return the shared sync client for an HTTP library.
+
+        Args:
+            module: ``httpx`` or ``httpx2`` (default: see default_http_module)
+
+        Returns:
+            The shared ``Client`` instance
+        """
+        return self._get(module or default_http_module(), is_async=False)
+
+    def async_client(self, module=None):
+        """Return the shared async client for an HTTP library."""
+        return self._get(module or default_http_module(), is_async=True)
+
+    def _get(self, module, is_async):
+        key = (module.__name__, is_async)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                factory = module.AsyncClient if is_async else module.Client
+                client = factory(**self._options(module))
+                self._clients[key] = client
+            return client
+
+    def sdk_client(self, package):
+        """Return the shared sync client in the flavor a provider SDK expects."""
+        return self.client(sdk_http_module(package))
+
+    def sdk_async_client(self, package):
+        """Return the shared async client in the flavor a provider SDK expects."""
+        return self.async_client(sdk_http_module(package))
+
+    def close(self):
+        """Close the sync clients (async clients are closed by their event loop)."""
+        with self._lock:
+            clients = list(self._clients.items())
+            self._clients.clear()
+        for (_, is_async), client in clients:
+            if not is_async:
+                client.close()
+
+
+_default_transport = None
+
+
+def configure_transport(settings):
+    """
+    Replace the default transport with one using the given settings.
+
+    Args:
+        settings (dict): Overrides of DEFAULT_HTTP_SETTINGS, e.g. from the
+            "http" section of config.json
+
+    Returns:
+        Transport: The new default transport
+    """
+    global _default_transport
+    _default_transport = Transport(settings)
+    return _default_transport
+
+
+def get_transport():
+    """Return the process-wide default transport."""
+    global _default_transport
+    if _default_transport is None:
+        _default_transport = Transport()
+    return _default_transport
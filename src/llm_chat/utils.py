@@ -2,13 +2,24 @@
 Utility functions for LLM Chat
 """
 
-import tiktoken
 import textwrap
 import time
 import sys
 from rich.console import Console
 from rich.markdown import Markdown
 from termcolor import colored
+from . import tokens
+from .providers import STREAM_RESTART
+
+_console = None
+
+
+def get_console():
+    """Return the Console shared by all rendering helpers."""
+    global _console
+    if _console is None:
+        _console = Console()
+    return _console
 
 
 def count_tokens(text, model):
@@ -17,13 +28,12 @@ def count_tokens(text, model):
 
     Args:
         text (str): The text to count tokens for
-        model (str): The model name (currently unused, but kept for future model-specific counting)
+        model (str): The model name, used to pick the matching tokenizer
 
     Returns:
         int: Number of tokens in the text
     """
-    encoding = tiktoken.get_encoding("cl100k_base")
-    return len(encoding.encode(text))
+    return tokens.count_tokens(text, model)
 
 
 def print_wrapped_text(text, width=80, indent="  "):
@@ -49,7 +59,7 @@ def render_markdown(text, stream_mode=False, last_chunk=""):
         stream_mode (bool): Whether to render in stream mode
         last_chunk (str): The last chunk that was rendered (used in stream mode)
     """
-    console = Console()
+    console = get_console()
     md = Markdown(text)
 
     if stream_mode:
@@ -64,168 +74,331 @@ def render_markdown(text, stream_mode=False, last_chunk=""):
         console.print(md)
 
 
-def stream_with_markdown_chunks(chunks, code_blocks=True):
+# Inline markers that mean a prose block should be rendered as markdown
+MARKDOWN_MARKERS = ("#", "**", "*", "_", ">", "- ", "1. ", "![", "[", "|", "`")
+# Text a marker may start with, held back until the next chunk shows whether
+# the marker is complete
+MARKER_PREFIXES = ("1.", "1", "-")
+FENCE = "```"
+CODE_THEME = "monokai"  # Same theme rich.markdown uses for code blocks
+
+
+class MarkdownStreamRenderer:
     """
-    Stream text with special handling for code blocks.
-    Simple implementation: stream normally until ```, then buffer until closing ```.
+    Incremental renderer for streamed markdown.
+
+    A single-pass state machine: every chunk is scanned once, and only the new
+    characters (plus at most two held back from the previous chunk, so
+    markers split across chunks are still found) are examined. Plain prose is
+    written straight to the terminal; from the first markdown marker on, a
+    prose block is buffered until the paragraph ends and rendered once. Fenced
+    code blocks are shown live, syntax-highlighted, as they stream in, and
+    rendered in full when the fence closes. Where blocks start and end depends
+    only on the text, so the output is the same however it is chunked.
     """
-    full_response = ""
-    in_code_block = False
-    buffer = ""
-    showed_generating_message = False
-    console = Console()
-
-    for chunk in chunks:
-        if chunk is None:
-            continue
-
-        full_response += chunk
-        buffer += chunk
-
-        # Keep processing buffer while we have ``` markers
-        while True:
-            if not in_code_block:
-                # Look for opening ```
-                marker_pos = buffer.find("```")
-                if marker_pos == -1:
-                    break  # No more markers
-
-                # Output everything before ```
-                before_marker = buffer[:marker_pos]
-                if before_marker:
-                    sys.stdout.write(before_marker)
-                    sys.stdout.flush()
-
-                # Show generating message
-                sys.stdout.write(colored("\n> Generating code... ", "cyan"))
-                sys.stdout.flush()
-                showed_generating_message = True
-
-                # Switch to code block mode, keeping ``` and everything after
-                in_code_block = True
-                buffer = buffer[marker_pos:]
+
+    TEXT, FENCE_INFO, CODE = range(3)
+
+    def __init__(self, console=None, live_code=True, refresh_per_second=20):
+        self.console = console or get_console()
+        self.live_code = live_code
+        self.min_refresh_interval = 1.0 / refresh_per_second
+        self.parts = []
+        self.state = self.TEXT
+        self.carry = ""  # Trailing backticks that may start a fence
+        # Prose block being buffered because it contains markdown
+        self.pending = []
+        self.pending_len = 0
+        self.pending_has_markdown = False
+        self.prose_carry = ""  # Trailing text that may start a marker
+        self.prose_tail = ""  # Last buffered character, for split "\n\n"
+        # Current code block
+        self.info = []
+        self.language = "text"
+        self.code_lines = []
+        self.line = []
+        self.live = None
+        self.last_refresh = 0.0
+
+    def feed(self, chunk):
+        """Process the next streamed chunk."""
+        if not chunk:
+            return
+        self.parts.append(chunk)
+        data = self.carry + chunk
+        self.carry = ""
+        while data:
+            if self.state == self.TEXT:
+                data = self._feed_text(data)
+            elif self.state == self.FENCE_INFO:
+                data = self._feed_fence_info(data)
             else:
-                # In code block, look for closing ``` (but not at position 0)
-                # We need to find the SECOND occurrence of ```
-                first_marker = buffer.find("```")
-                if first_marker != 0:
-                    # Something went wrong, treat as closing
-                    marker_pos = first_marker
-                else:
-                    # Skip the opening ``` and find the next one
-                    marker_pos = buffer.find("```", 3)
-
-                if marker_pos == -1:
-                    break  # No closing marker yet, keep buffering
-
-                # Include everything up to and including the closing ```
-                code_block = buffer[: marker_pos + 3]
-
-                # Clear generating message
-                if showed_generating_message:
-                    sys.stdout.write("\r" + " " * 30 + "\r")
-                    sys.stdout.flush()
-                    showed_generating_message = False
-
-                # Display the code block with markdown
-                console.print(Markdown(code_block))
-
-                # Switch out of code block mode
-                in_code_block = False
-                buffer = buffer[marker_pos + 3 :]  # Continue with rest
-
-        # If not in code block and buffer doesn't contain ```, handle it
-        if not in_code_block and buffer and "```" not in buffer:
-            # Check if buffer has markdown elements that need rendering
-            markdown_markers = [
-                "#",
-                "**",
-                "*",
-                "_",
-                ">",
-                "- ",
-                "1. ",
-                "![",
-                "[",
-                "|",
-                "`",
-            ]
-            has_markdown = any(marker in buffer for marker in markdown_markers)
-
-            # If it has markdown and looks complete (ends with double newline or is getting long)
-            if has_markdown and (
-                buffer.endswith("\n\n") or (buffer.endswith("\n") and len(buffer) > 200)
-            ):
-                console.print(Markdown(buffer.rstrip()))
-                buffer = ""
-            # If no markdown, stream it directly
-            elif not has_markdown:
-                sys.stdout.write(buffer)
-                sys.stdout.flush()
-                buffer = ""
-            # If single line with newline and no special markdown, stream it
-            elif (
-                buffer.count("\n") == 1
-                and buffer.endswith("\n")
-                and not any(m in buffer for m in ["#", "|", "-", "*", ">"])
-            ):
-                sys.stdout.write(buffer)
-                sys.stdout.flush()
-                buffer = ""
-            # Otherwise keep buffering (has markdown but not complete section yet)
-
-    # Handle any remaining content
-    if buffer:
-        if in_code_block:
-            # Unclosed code block
-            if showed_generating_message:
-                sys.stdout.write("\r" + " " * 30 + "\r")
-                sys.stdout.flush()
-            # Add closing markers and display
-            if not buffer.endswith("```"):
-                buffer += "\n```"
-            console.print(Markdown(buffer))
-        else:
-            # Regular text - check if it needs markdown rendering
-            markdown_markers = [
-                "#",
-                "**",
-                "*",
-                "_",
-                ">",
-                "- ",
-                "1. ",
-                "![",
-                "[",
-                "|",
-                "`",
-            ]
-            has_markdown = any(marker in buffer for marker in markdown_markers)
-
-            if has_markdown:
-                console.print(Markdown(buffer))
+                data = self._feed_code(data)
+        self._refresh_code()
+
+    def restart(self):
+        """Discard the response so far because the stream is being retried."""
+        self.carry = ""
+        if self.state != self.TEXT:
+            self._finish_code()
+        self._flush_prose()
+        self.state = self.TEXT
+        self.parts = []
+        self.console.print(
+            "\n[yellow]Connection interrupted, retrying the response...[/yellow]\n"
+        )
+
+    def close(self):
+        """Flush everything still buffered and return the full response text."""
+        self.stop_live()
+        if self.carry:
+            carry, self.carry = self.carry, ""
+            if self.state == self.TEXT:
+                self._prose(carry)
+            else:
+                self.line.append(carry)
+        if self.state != self.TEXT:
+            # Unclosed code block: render what we have
+            self._finish_code()
+        self._flush_prose()
+        return "".join(self.parts)
+
+    def stop_live(self):
+        """Stop the live code block display, if one is showing."""
+        if self.live is not None:
+            self.live.stop()
+            self.live = None
+
+    def _feed_text(self, data):
+        marker_pos = data.find(FENCE)
+        if marker_pos == -1:
+            # Hold back trailing backticks that might be the start of a fence
+            held = len(data) - len(data.rstrip("`"))
+            if held:
+                self.carry = data[-held:]
+                data = data[:-held]
+            self._prose(data)
+            return ""
+
+        self._prose(data[:marker_pos])
+        self._flush_prose()
+        self.state = self.FENCE_INFO
+        self.info = []
+        return data[marker_pos + len(FENCE) :]
+
+    def _feed_fence_info(self, data):
+        newline = data.find("\n")
+        if newline == -1:
+            self.info.append(data)
+            return ""
+        self.info.append(data[:newline])
+        self.language = "".join(self.info).strip().partition(" ")[0] or "text"
+        self.state = self.CODE
+        self.code_lines = []
+        self.line = []
+        if self.live_code and self.console.is_terminal:
+            from rich.live import Live
+
+            self.live = Live(console=self.console, auto_refresh=False, transient=True)
+            self.live.start()
+        return data[newline + 1 :]
+
+    def _feed_code(self, data):
+        newline = data.find("\n")
+        if newline == -1:
+            self.line.append(data)
+            return ""
+        self.line.append(data[:newline])
+        line = "".join(self.line)
+        self.line = []
+        if line.strip() == FENCE:
+            self._finish_code()
+            self.state = self.TEXT
+            return data[newline:]  # Keep the newline after the fence as prose
+        self.code_lines.append(line)
+        return data[newline + 1 :]
+
+    def _code_view(self, lines):
+        from rich.syntax import Syntax
+
+        return Syntax(
+            "\n".join(lines).rstrip(),
+            self.language,
+            theme=CODE_THEME,
+            word_wrap=True,
+            padding=1,
+        )
+
+    def _refresh_code(self):
+        if self.live is None or self.state != self.CODE:
+            return
+        now = time.monotonic()
+        if now - self.last_refresh < self.min_refresh_interval:
+            return
+        self.last_refresh = now
+        # Only the last screenful is shown live, so each refresh costs O(height)
+        height = max(self.console.size.height - 4, 1)
+        visible = self.code_lines[-height:] + ["".join(self.line)]
+        self.live.update(self._code_view(visible), refresh=True)
+
+    def _finish_code(self):
+        if self.line:
+            partial = "".join(self.line)
+            if partial.strip() != FENCE:
+                self.code_lines.append(partial)
+            self.line = []
+        self.stop_live()
+        if self.state == self.FENCE_INFO:
+            # Fence never got past its info line
+            self.code_lines = ["".join(self.info)]
+        self.console.print(self._code_view(self.code_lines))
+        self.code_lines = []
+        self.info = []
+
+    def _prose(self, text):
+        text = self.prose_carry + text
+        self.prose_carry = ""
+        while text:
+            if not self.pending_has_markdown:
+                start = _find_marker(text)
+                if start == -1:
+                    for prefix in MARKER_PREFIXES:
+                        if text.endswith(prefix):
+                            self.prose_carry = prefix
+                            text = text[: -len(prefix)]
+                            break
+                    self._write(text)
+                    return
+                # Render from the marker on
+                self._write(text[:start])
+                text = text[start:]
+                self.pending_has_markdown = True
+
+            end = self._block_end(text)
+            if end == -1:
+                self.pending.append(text)
+                self.pending_len += len(text)
+                self.prose_tail = text[-1]
+                return
+            self.pending.append(text[:end])
+            self._flush_prose()
+            text = text[end:]
+
+    def _block_end(self, text):
+        """Return where the buffered block ends in text, or -1 if it doesn't."""
+        if self.prose_tail == "\n" and text.startswith("\n"):
+            return 1
+        end = text.find("\n\n")
+        if end != -1:
+            end += 2
+        # Long blocks are rendered at the first line break past 200 characters
+        newline = text.find("\n", max(200 - self.pending_len, 0))
+        if newline != -1 and (end == -1 or newline + 1 < end):
+            end = newline + 1
+        return end
+
+    def _flush_prose(self):
+        if self.prose_carry:
+            # Held back as a possible marker, but the prose ended here
+            carry, self.prose_carry = self.prose_carry, ""
+            if self.pending_has_markdown:
+                self.pending.append(carry)
             else:
-                sys.stdout.write(buffer)
-                sys.stdout.flush()
+                self._write(carry)
+        if not self.pending:
+            return
+        block = "".join(self.pending)
+        self.pending = []
+        self.pending_len = 0
+        self.prose_tail = ""
+        if self.pending_has_markdown:
+            # Markdown drops leading spaces, which may separate this block
+            # from prose already written on the same line
+            indent = len(block) - len(block.lstrip(" "))
+            if indent:
+                self._write(block[:indent])
+            content = block.rstrip()
+            self.console.print(Markdown(content))
+            # print ends the block with one newline; keep any blank line after it
+            newlines = block[len(content) :].count("\n")
+            if newlines > 1:
+                self._write("\n" * (newlines - 1))
+        else:
+            self._write(block)
+        self.pending_has_markdown = False
+
+    def _write(self, text):
+        # Raw prose bypasses rich so it streams with no rendering overhead
+        out = self.console.file
+        out.write(text)
+        out.flush()
+
 
-    return full_response
+def _find_marker(text):
+    """Return the position of the first markdown marker in text, or -1."""
+    positions = [text.find(marker) for marker in MARKDOWN_MARKERS]
+    return min((pos for pos in positions if pos != -1), default=-1)
 
 
-def print_available_models(models):
+def stream_with_markdown_chunks(chunks, code_blocks=True, console=None):
+    """
+    Stream text with special handling for markdown and code blocks.
+
+    Args:
+        chunks (iterable): The streamed response text chunks
+        code_blocks (bool): Whether to show code blocks live while they stream
+        console (Console): Console to render to (default: the shared console)
+
+    Returns:
+        str: The complete response text
+    """
+    renderer = MarkdownStreamRenderer(console=console, live_code=code_blocks)
+    try:
+        for chunk in chunks:
+            if chunk is None:
+                continue
+            if chunk is STREAM_RESTART:
+                renderer.restart()
+                continue
+            renderer.feed(chunk)
+    finally:
+        # Don't leave the terminal in live mode if the stream fails or is
+        # interrupted inside a code block
+        renderer.stop_live()
+    return renderer.close()
+
+
+def print_available_models(models, limit=12):
+    """
+    Print the models of each provider, up to limit per provider.
+
+    Args:
+        models (Mapping): Provider name -> list of model names
+        limit (int): Models shown per provider; the rest are found by typing
+    """
     print(colored("\nAvailable models:", "cyan"))
     for p, m_list in models.items():
         print(colored(f"{p.capitalize()}:", "yellow"))
-        for m in m_list:
+        for m in m_list[:limit]:
             print(colored(f"  - {m}", "green"))
+        if len(m_list) > limit:
+            print(
+                colored(
+                    f"  ... and {len(m_list) - limit} more (start typing to search)",
+                    "green",
+                )
+            )
 
 
-def create_typing_animation(text="Thinking", color="cyan"):
+def create_typing_animation(text="Thinking", color="cyan", until=None):
     """
     Create a typing animation effect.
 
     Args:
         text (str): The text to display before the animation
         color (str): The color to use for the animation
+        until (threading.Event): Stop as soon as this is set rather than
+            after the full animation, so it doesn't delay the request
     """
     animations = ["⣾", "⣽", "⣻", "⢿", "⡿", "⣟", "⣯", "⣷"]
     i = 0
@@ -236,7 +409,10 @@ def create_typing_animation(text="Thinking", color="cyan"):
     while time.time() - start_time < 0.5:  # Reduced animation time to 0.5 seconds
         sys.stdout.write(colored(f"\r{text} {animations[i % len(animations)]}", color))
         sys.stdout.flush()
-        time.sleep(0.05)  # Faster animation updates
+        if until is None:
+            time.sleep(0.05)  # Faster animation updates
+        elif until.wait(0.05):
+            break
         i += 1
 
     sys.stdout.write(colored(f"\r{text}   \n", color))